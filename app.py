@@ -1,18 +1,32 @@
 import os
 import sys
-import requests
+import time
+import multiprocessing
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, 
                             QPushButton, QLabel, QLineEdit, QFileDialog, QComboBox, 
-                            QTextEdit, QProgressBar, QMessageBox, QGroupBox, QCheckBox)
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
+                            QTextEdit, QProgressBar, QMessageBox, QGroupBox, QCheckBox,
+                            QSpinBox, QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView)
+from PyQt5.QtCore import Qt, QThread, QTimer, pyqtSignal
 from PyQt5.QtGui import QIcon
-from fontTools.ttLib import TTFont
-from fontTools.subset import Subsetter, Options
+from converter import (FontConverter, DEFAULT_CHARS_URL, FONT_EXTENSIONS, probe_font, format_font_info,
+                       collect_fonts, get_output_dir)
+from job_queue import JobQueue
+from subset_cache import SubsetCache
+from metrics import format_event
+from charset import CharListFetcher
+from watcher import FileWatcher
+from profiles import SUBSET_PROFILES, DEFAULT_PROFILE
+from instancing import parse_instance_spec
+from outlines import OUTLINE_MODES, DEFAULT_OUTLINE_MODE
+
+# 排队中和处理中的任务不能重复加入队列，也不能从列表中移除
+ACTIVE_JOB_STATES = ("排队中", "处理中")
 
 class FontConverterThread(QThread):
     progress_update = pyqtSignal(int)
     status_update = pyqtSignal(str)
     completed = pyqtSignal(bool, str)
+    stage_event = pyqtSignal(object)
 
     """
     input_font_path: 字体源文件路径
@@ -21,578 +35,69 @@ class FontConverterThread(QThread):
     output_formats: 要输出的格式列表
     """
     
-    def __init__(self, input_font_path, url_text, custom_text, output_formats):
+    def __init__(self, input_font_path, url_text, custom_text, output_formats, output_dir=None,
+                 parallel_encode=False, cache=None, fetcher=None, use_mmap=False, slice_count=0,
+                 incremental=False, lite_preview=False, size_budget=0, auto_refresh=False,
+                 subset_profile=DEFAULT_PROFILE, site_dirs=None, instances=None,
+                 outline_mode=DEFAULT_OUTLINE_MODE):
         super().__init__()
-        self.input_font_path = input_font_path
-        self.url_text = url_text
-        self.custom_text = custom_text
-        self.output_formats = output_formats
+        self.converter = FontConverter(
+            input_font_path,
+            url_text,
+            custom_text,
+            output_formats,
+            status_callback=self.status_update.emit,
+            progress_callback=self.progress_update.emit,
+            output_dir=output_dir,
+            parallel_encode=parallel_encode,
+            cache=cache,
+            fetcher=fetcher,
+            use_mmap=use_mmap,
+            slice_count=slice_count,
+            incremental=incremental,
+            event_callback=self.stage_event.emit,
+            lite_preview=lite_preview,
+            size_budget=size_budget,
+            auto_refresh=auto_refresh,
+            subset_profile=subset_profile,
+            site_dirs=site_dirs,
+            instances=instances,
+            outline_mode=outline_mode
+        )
         
     def run(self):
-        try:
-            self.status_update.emit("加载字体文件...")
-            self.progress_update.emit(5)
-            
-            font = TTFont(self.input_font_path)
-            font_name = font.get("name")
-            family_name = ""
-            full_name = ""
-            
-            # 获取字体名称信息用于HTML展示
-            for record in font_name.names:
-                if record.nameID == 1 and not family_name:  # Family name
-                    if b'\000' in record.string:
-                        family_name = record.string.decode('utf-16-be')
-                    else:
-                        family_name = record.string.decode('latin1')
-                if record.nameID == 4 and not full_name:  # Full name
-                    if b'\000' in record.string:
-                        full_name = record.string.decode('utf-16-be')
-                    else:
-                        full_name = record.string.decode('latin1')
-                        
-            if not family_name:
-                family_name = os.path.basename(self.input_font_path)
-            if not full_name:
-                full_name = family_name
-                
-            self.progress_update.emit(10)
-            
-            url_content = ""
-            if self.url_text:
-                self.status_update.emit("从URL下载字符...")
-                try:
-                    response = requests.get(self.url_text, timeout=10)
-                    response.raise_for_status()
-                    url_content = response.text
-                    self.status_update.emit(f"从URL下载了 {len(url_content)} 个字符")
-                except Exception as e:
-                    self.status_update.emit(f"从URL下载失败: {str(e)}")
-            self.progress_update.emit(20)
-            
-            final_text = url_content + self.custom_text
-            if not final_text:
-                self.status_update.emit("警告: 没有提供字符用于子集化")
-                final_text = None
-            else:
-                self.status_update.emit(f"使用 {len(final_text)} 个字符进行子集化")
-            
-            self.progress_update.emit(30)
-            options = Options()
-            subsetter = Subsetter(options=options)
-            
-            if final_text:
-                subsetter.populate(text=final_text)
-                subsetter.subset(font)
-            self.progress_update.emit(40)
-        
-            # 创建结果目录
-            input_dir = os.path.dirname(self.input_font_path)
-            result_dir = os.path.join(input_dir, "result")
-            os.makedirs(result_dir, exist_ok=True)
-            
-            base_filename = os.path.splitext(os.path.basename(self.input_font_path))[0]
-            
-            # 格式扩展名映射
-            extension_map = {
-                "TTF": ".ttf",
-                "OTF": ".otf",
-                "WOFF": ".woff",
-                "WOFF2": ".woff2",
-                "SVG": ".svg",
-                "EOT": ".eot"
-            }
-            
-            # 先创建一个TTF版本，用于后续转换
-            ttf_base_path = os.path.join(result_dir, f"{base_filename}-subset.ttf")
-            font.save(ttf_base_path)
-            saved_files = []
-            saved_files.append(ttf_base_path)
-            self.status_update.emit(f"保存基础TTF格式...")
-            self.progress_update.emit(45)
-            
-            
-            total_formats = len(self.output_formats)
-            progress_per_format = 50 / total_formats  # 剩余50%的进度分配给保存操作
-            
-            # 首先保存基础TTF格式，然后进行其他格式的转换
-            ttf_output_path = os.path.join(result_dir, f"{base_filename}-subset.ttf")
-            # 先清除可能已存在的flavor
-            if hasattr(font, 'flavor'):
-                font.flavor = None
-            font.save(ttf_output_path)
-            
-            # 如果TTF在输出格式列表中，添加到已保存文件列表
-            if "TTF" in self.output_formats:
-                saved_files.append(ttf_output_path)
-                self.status_update.emit(f"保存TTF格式完成")
-            
-            # 保存字体文件信息用于生成HTML
-            font_files = []
-            
-            # 处理其他格式
-            for i, output_format in enumerate(self.output_formats):
-                # 跳过TTF，因为已经处理过了
-                if output_format == "TTF":
-                    # 添加TTF到字体文件列表
-                    font_files.append({
-                        'format': 'TTF',
-                        'path': f"{base_filename}-subset.ttf",
-                        'rel_path': f"./{base_filename}-subset.ttf"
-                    })
-                    continue
-                    
-                current_format_progress = 50 + (i * progress_per_format)
-                self.status_update.emit(f"转换为 {output_format} 格式...")
-                self.progress_update.emit(int(current_format_progress))
-                
-                output_filename = f"{base_filename}-subset{extension_map[output_format]}"
-                output_path = os.path.join(result_dir, output_filename)
-                
-                try:
-                    if output_format == "OTF":
-                        # 对于OTF，TTF文件并保存为OTF
-                        otf_font = TTFont(ttf_output_path)
-                        # 注意：这里只是改变了扩展名，并没有真正转换格式
-                        # 实际的OTF转换可能需要更专业的处理
-                        otf_font.save(output_path)
-                        saved_files.append(output_path)
-                        
-                        # 添加OTF到字体文件列表
-                        font_files.append({
-                            'format': 'OTF',
-                            'path': output_filename,
-                            'rel_path': f"./{output_filename}"
-                        })
-                    elif output_format == "WOFF":
-                        # 加载TTF并设置flavor为woff
-                        woff_font = TTFont(ttf_output_path)
-                        woff_font.flavor = "woff"
-                        woff_font.save(output_path)
-                        saved_files.append(output_path)
-                        
-                        # 添加WOFF到字体文件列表
-                        font_files.append({
-                            'format': 'WOFF',
-                            'path': output_filename,
-                            'rel_path': f"./{output_filename}"
-                        })
-                    elif output_format == "WOFF2":
-                        # 加载TTF并设置flavor为woff2
-                        try:
-                            woff2_font = TTFont(ttf_output_path)
-                            woff2_font.flavor = "woff2"
-                            woff2_font.save(output_path)
-                            saved_files.append(output_path)
-                            
-                            # 添加WOFF2到字体文件列表
-                            font_files.append({
-                                'format': 'WOFF2',
-                                'path': output_filename,
-                                'rel_path': f"./{output_filename}"
-                            })
-                        except Exception as e:
-                            self.status_update.emit(f"转换WOFF2格式失败: {str(e)}")
-                            self.status_update.emit("WOFF2转换需要安装brotli模块，请运行: pip install brotli")
-                    elif output_format == "SVG":
-                        self.status_update.emit(f"注意：暂不支持SVG格式，跳过。")
-                    elif output_format == "EOT":
-                        self.status_update.emit(f"注意：EOT格式需要额外工具支持，如ttf2eot。此处跳过。")
-                except Exception as e:
-                    self.status_update.emit(f"转换 {output_format} 格式失败: {str(e)}")
-                
-                self.progress_update.emit(int(current_format_progress + progress_per_format / 2))
-            
-            # 准备生成HTML预览文件
-            self.status_update.emit("生成HTML预览文件...")
-            
-            # 获取相对于result目录的原始字体路径
-            original_font_rel_path = self.input_font_path
-            original_font_filename = os.path.basename(self.input_font_path)
-            
-            # 准备测试字符集
-            # 如果自定义字符为空，使用一些常见汉字进行测试
-            test_chars = self.custom_text[:100] if self.custom_text else "你好世界，这是字体瘦身工具的测试页面。中国北京上海广州深圳香港澳门台湾天津重庆成都武汉南京西安长沙杭州"
-            
-            # 添加一些数字和英文字符用于测试
-            test_extra = "0123456789 abcdefghijklmnopqrstuvwxyz ABCDEFGHIJKLMNOPQRSTUVWXYZ"
-            
-            # 生成HTML文件
-            html_content = self.generate_html_preview(
-                family_name, 
-                full_name,
-                original_font_filename,
-                original_font_rel_path,
-                font_files,
-                test_chars,
-                test_extra
-            )
-            
-            html_path = os.path.join(result_dir, "index.html")
-            with open(html_path, "w", encoding="utf-8") as f:
-                f.write(html_content)
-            
-            self.progress_update.emit(100)
-            
-            if saved_files:
-                result_message = f"成功生成 {len(saved_files)} 个字体文件到 {result_dir}\n预览文件: {html_path}"
-                self.completed.emit(True, result_message)
-            else:
-                self.completed.emit(False, "没有成功生成任何字体文件")
-            
-        except Exception as e:
-            self.status_update.emit(f"错误: {str(e)}")
-            self.completed.emit(False, str(e))
-    
-    def generate_html_preview(self, family_name, full_name, original_font_filename, original_font_rel_path, font_files, test_chars, test_extra):
-        """生成HTML预览文件"""
-        
-        # 创建@font-face规则
-        font_face_css = ""
-        
-        # 原始字体的@font-face
-        font_face_css += f"""
-@font-face {{
-    font-family: '{family_name}-original';
-    src: url('{original_font_rel_path}') format('truetype');
-    font-weight: normal;
-    font-style: normal;
-}}
-"""
-        
-        # 子集字体的@font-face
-        # 为每种格式创建一个单独的字体名称
-        format_to_mime = {
-            'TTF': 'truetype',
-            'OTF': 'opentype',
-            'WOFF': 'woff',
-            'WOFF2': 'woff2',
-            'SVG': 'svg',
-            'EOT': 'embedded-opentype'
-        }
-        
-        # 创建一个综合的@font-face，包含所有格式
-        sources = []
-        for font_file in font_files:
-            src_format = format_to_mime.get(font_file['format'], 'truetype')
-            sources.append(f"url('{font_file['rel_path']}') format('{src_format}')")
-        
-        if sources:
-            combined_src = ",\n        ".join(sources)
-            font_face_css += f"""
-@font-face {{
-    font-family: '{family_name}-subset';
-    src: {combined_src};
-    font-weight: normal;
-    font-style: normal;
-}}
-"""
-        
-        # 为每种格式创建单独的@font-face
-        for font_file in font_files:
-            font_format = font_file['format']
-            src_format = format_to_mime.get(font_format, 'truetype')
-            font_face_css += f"""
-@font-face {{
-    font-family: '{family_name}-{font_format.lower()}';
-    src: url('{font_file['rel_path']}') format('{src_format}');
-    font-weight: normal;
-    font-style: normal;
-}}
-"""
-        
-        # 生成字体文件大小信息
-        font_size_info = f"""
-<section class="font-sizes">
-    <h2>字体文件大小对比</h2>
-    <table>
-        <tr>
-            <th>字体文件</th>
-            <th>大小</th>
-        </tr>
-        <tr>
-            <td>{original_font_filename} (原始)</td>
-            <td>{self.get_file_size(self.input_font_path)}</td>
-        </tr>
-"""
-        for font_file in font_files:
-            file_path = os.path.join(os.path.dirname(self.input_font_path), "result", font_file['path'])
-            font_size_info += f"""
-        <tr>
-            <td>{font_file['path']} ({font_file['format']})</td>
-            <td>{self.get_file_size(file_path)}</td>
-        </tr>"""
-        
-        font_size_info += """
-    </table>
-</section>
-"""
-        
-        # 生成HTML内容
-        html = f"""<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{family_name} 字体瘦身预览</title>
-    <style>
-        {font_face_css}
-        
-        * {{
-            box-sizing: border-box;
-            margin: 0;
-            padding: 0;
-        }}
-        
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, Cantarell, 'Open Sans', 'Helvetica Neue', sans-serif;
-            line-height: 1.6;
-            color: #333;
-            padding: 20px;
-            max-width: 1200px;
-            margin: 0 auto;
-        }}
-        
-        h1, h2, h3 {{
-            margin: 20px 0 10px;
-        }}
-        
-        .header {{
-            text-align: center;
-            margin-bottom: 30px;
-            padding-bottom: 20px;
-            border-bottom: 1px solid #eee;
-        }}
-        
-        .font-info {{
-            margin-bottom: 20px;
-            background: #f9f9f9;
-            padding: 15px;
-            border-radius: 5px;
-        }}
-        
-        .font-sizes {{
-            margin: 20px 0;
-        }}
-        
-        table {{
-            width: 100%;
-            border-collapse: collapse;
-            margin: 15px 0;
-        }}
-        
-        table, th, td {{
-            border: 1px solid #ddd;
-        }}
-        
-        th, td {{
-            padding: 10px;
-            text-align: left;
-        }}
-        
-        th {{
-            background-color: #f2f2f2;
-        }}
-        
-        .font-preview {{
-            display: flex;
-            flex-direction: column;
-            gap: 20px;
-            margin: 20px 0;
-        }}
-        
-        .preview-card {{
-            border: 1px solid #ddd;
-            border-radius: 5px;
-            padding: 15px;
-            background: white;
-        }}
-        
-        .preview-card h3 {{
-            margin-top: 0;
-            border-bottom: 1px solid #eee;
-            padding-bottom: 10px;
-            margin-bottom: 15px;
-        }}
-        
-        .text-preview {{
-            min-height: 100px;
-        }}
-        
-        .preview-original {{
-            font-family: '{family_name}-original', sans-serif;
-        }}
-        
-        .preview-subset {{
-            font-family: '{family_name}-subset', sans-serif;
-        }}
-        
-        .preview-ttf {{
-            font-family: '{family_name}-ttf', sans-serif;
-        }}
-        
-        .preview-otf {{
-            font-family: '{family_name}-otf', sans-serif;
-        }}
-        
-        .preview-woff {{
-            font-family: '{family_name}-woff', sans-serif;
-        }}
-        
-        .preview-woff2 {{
-            font-family: '{family_name}-woff2', sans-serif;
-        }}
-        
-        .font-sizes-visual {{
-            margin: 30px 0;
-        }}
-        
-        .size-bar {{
-            height: 30px;
-            background-color: #4CAF50;
-            margin-bottom: 10px;
-            display: flex;
-            align-items: center;
-            padding: 0 10px;
-            color: white;
-            border-radius: 3px;
-        }}
-        
-        .test-sizes {{
-            margin: 20px 0;
-        }}
-        
-        .size-example {{
-            margin: 15px 0;
-        }}
-        
-        footer {{
-            margin-top: 50px;
-            text-align: center;
-            color: #666;
-            font-size: 14px;
-            border-top: 1px solid #eee;
-            padding-top: 20px;
-        }}
-        
-        @media (min-width: 768px) {{
-            .font-preview {{
-                flex-direction: row;
-                flex-wrap: wrap;
-            }}
-            
-            .preview-card {{
-                flex: 1 0 45%;
-            }}
-        }}
-    </style>
-</head>
-<body>
-    <div class="header">
-        <h1>{full_name} 字体瘦身预览</h1>
-        <p>本页面用于比较原始字体与瘦身后的字体效果</p>
-    </div>
-    
-    <div class="font-info">
-        <h2>字体信息</h2>
-        <p><strong>字体名称:</strong> {full_name}</p>
-        <p><strong>字体族:</strong> {family_name}</p>
-        <p><strong>原始文件:</strong> {original_font_filename}</p>
-        <p><strong>生成格式:</strong> {', '.join([f['format'] for f in font_files])}</p>
-    </div>
+        success, message = self.converter.run()
+        self.completed.emit(success, message)
     
-    {font_size_info}
-    
-    <section class="font-preview">
-    <div class="preview-card">
-            <h3>默认字体</h3>
-            <div class="text-preview">
-                <p>{test_chars}</p>
-                <p>{test_extra}</p>
-            </div>
-        </div>
-        <div class="preview-card">
-            <h3>原始包</h3>
-            <div class="text-preview preview-original">
-                <p>{test_chars}</p>
-                <p>{test_extra}</p>
-            </div>
-        </div>
-        
-        <div class="preview-card">
-            <h3>瘦身包 (综合)</h3>
-            <div class="text-preview preview-subset">
-                <p>{test_chars}</p>
-                <p>{test_extra}</p>
-            </div>
-        </div>
-"""
-
-        # 为每种格式添加一个预览卡片
-        for font_file in font_files:
-            font_format = font_file['format'].lower()
-            html += f"""
-        <div class="preview-card">
-            <h3>瘦身包 ({font_file['format']})</h3>
-            <div class="text-preview preview-{font_format}">
-                <p>{test_chars}</p>
-                <p>{test_extra}</p>
-            </div>
-        </div>"""
-        
-        html += f"""
-    </section>
-    
-    <section class="test-sizes">
-        <h2>不同字号测试</h2>
-        
-        <div class="size-example">
-            <h3>原始包</h3>
-            <p class="preview-original" style="font-size: 12px;">12px: 你好世界 Hello World 0123456789</p>
-            <p class="preview-original" style="font-size: 16px;">16px: 你好世界 Hello World 0123456789</p>
-            <p class="preview-original" style="font-size: 24px;">24px: 你好世界 Hello World 0123456789</p>
-            <p class="preview-original" style="font-size: 36px;">36px: 你好世界 Hello World 0123456789</p>
-        </div>
-        
-        <div class="size-example">
-            <h3>瘦身包</h3>
-            <p class="preview-subset" style="font-size: 12px;">12px: 你好世界 Hello World 0123456789</p>
-            <p class="preview-subset" style="font-size: 16px;">16px: 你好世界 Hello World 0123456789</p>
-            <p class="preview-subset" style="font-size: 24px;">24px: 你好世界 Hello World 0123456789</p>
-            <p class="preview-subset" style="font-size: 36px;">36px: 你好世界 Hello World 0123456789</p>
-        </div>
-    </section>
-    
-    <footer>
-        <p>由字体瘦身工具生成 - 生成时间: {self.get_current_time()}</p>
-    </footer>
-</body>
-</html>
-"""
-        return html
-    
-    def get_file_size(self, file_path):
-        """获取文件大小并格式化"""
-        try:
-            size_bytes = os.path.getsize(file_path)
-            if size_bytes < 1024:
-                return f"{size_bytes} 字节"
-            elif size_bytes < 1024 * 1024:
-                return f"{size_bytes/1024:.2f} KB"
-            else:
-                return f"{size_bytes/(1024*1024):.2f} MB"
-        except:
-            return "未知"
-    
-    def get_current_time(self):
-        """获取当前时间格式化字符串"""
-        from datetime import datetime
-        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    def cancel(self):
+        self.converter.cancel()
 
 class FontConverterApp(QMainWindow):
+    # 监视线程中检测到源字体变化，通过信号转到界面线程处理
+    files_changed = pyqtSignal(object)
+    # 任务队列的分发线程中收到的子进程事件: (任务编号, 类型, 值)
+    job_event = pyqtSignal(int, str, object)
+    
     def __init__(self):
         super().__init__()
+        self.watcher = None
+        self.job_queue = None
+        # 任务编号 -> {'path', 'item', 'progress_bar', 'state', 'message', 'events'}
+        self.jobs = {}
+        self.next_job_id = 0
+        # 当前任务队列处理的任务编号
+        self.batch_jobs = []
+        self.rerun_pending = False
+        self.preview_opened = False
+        # 连续修改字符或选项时只在停止修改一段时间后重建一次
+        self.rebuild_timer = QTimer(self)
+        self.rebuild_timer.setSingleShot(True)
+        self.rebuild_timer.setInterval(500)
+        self.rebuild_timer.timeout.connect(self.rebuild)
+        self.files_changed.connect(self.schedule_rebuild)
+        self.job_event.connect(self.handle_job_event)
         self.init_ui()
+        self.setAcceptDrops(True)
         
     def init_ui(self):
         self.setWindowTitle("字体瘦身")
@@ -604,13 +109,43 @@ class FontConverterApp(QMainWindow):
         main_layout = QVBoxLayout(central_widget)
         
         input_group = QGroupBox("选择文件")
-        input_layout = QHBoxLayout()
-        self.input_font_label = QLabel("未选择")
+        input_layout = QVBoxLayout()
+        file_layout = QHBoxLayout()
+        self.input_font_label = QLabel("未选择，可以多选或把字体文件拖放到窗口中")
         self.browse_button = QPushButton("选择文件")
         self.browse_button.clicked.connect(self.browse_font)
-        input_layout.addWidget(QLabel("字体源文件:"))
-        input_layout.addWidget(self.input_font_label, 1)
-        input_layout.addWidget(self.browse_button)
+        self.clear_jobs_button = QPushButton("清除已结束")
+        self.clear_jobs_button.setToolTip("从列表中移除已经处理完成、失败或取消的字体")
+        self.clear_jobs_button.clicked.connect(self.clear_finished_jobs)
+        file_layout.addWidget(QLabel("字体源文件:"))
+        file_layout.addWidget(self.input_font_label, 1)
+        file_layout.addWidget(self.browse_button)
+        file_layout.addWidget(self.clear_jobs_button)
+        input_layout.addLayout(file_layout)
+        
+        # 每个字体一行，显示各自的状态和进度，双击打开该字体的预览页
+        self.job_table = QTableWidget(0, 4)
+        self.job_table.setHorizontalHeaderLabels(["字体", "状态", "进度", "结果"])
+        self.job_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        self.job_table.horizontalHeader().setSectionResizeMode(3, QHeaderView.Stretch)
+        self.job_table.verticalHeader().setVisible(False)
+        self.job_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.job_table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.job_table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.job_table.setMaximumHeight(160)
+        self.job_table.itemSelectionChanged.connect(self.select_job)
+        self.job_table.cellDoubleClicked.connect(self.open_job_preview)
+        input_layout.addWidget(self.job_table)
+        
+        pool_layout = QHBoxLayout()
+        pool_layout.addWidget(QLabel("同时处理的字体数:"))
+        self.pool_size_input = QSpinBox()
+        self.pool_size_input.setRange(1, max(1, (os.cpu_count() or 1) * 2))
+        self.pool_size_input.setValue(os.cpu_count() or 1)
+        self.pool_size_input.setToolTip("多个字体在这么多个进程中同时处理，正在处理时添加的字体会自动排队")
+        pool_layout.addWidget(self.pool_size_input)
+        pool_layout.addStretch(1)
+        input_layout.addLayout(pool_layout)
         input_group.setLayout(input_layout)
         main_layout.addWidget(input_group)
         
@@ -620,12 +155,25 @@ class FontConverterApp(QMainWindow):
         url_layout = QHBoxLayout()
         url_layout.addWidget(QLabel("常用字列表(3500常用字):"))
         self.url_input = QLineEdit()
-        default_url = "https://raw.githubusercontent.com/shinchanZ/-3500-/master/3500"
+        default_url = DEFAULT_CHARS_URL
         self.url_input.setPlaceholderText(f"输入一个远程URL，例如{default_url}")
         self.url_input.setText(default_url)
         url_layout.addWidget(self.url_input)
+        self.offline_checkbox = QCheckBox("离线")
+        self.offline_checkbox.setToolTip("不访问网络，使用上次下载的常用字列表")
+        url_layout.addWidget(self.offline_checkbox)
         chars_layout.addLayout(url_layout)
         
+        site_layout = QHBoxLayout()
+        site_layout.addWidget(QLabel("网站内容目录:"))
+        self.site_dir_input = QLineEdit()
+        self.site_dir_input.setPlaceholderText("可选，扫描其中HTML/JSON/Markdown/JS文件实际用到的字符，多个目录用;分隔")
+        site_layout.addWidget(self.site_dir_input)
+        site_browse_button = QPushButton("选择目录")
+        site_browse_button.clicked.connect(self.browse_site_dir)
+        site_layout.addWidget(site_browse_button)
+        chars_layout.addLayout(site_layout)
+        
         chars_layout.addWidget(QLabel("追加自定义字符:"))
         self.custom_chars = QTextEdit()
         example_chars = "犇骉淼焱"
@@ -665,10 +213,77 @@ class FontConverterApp(QMainWindow):
         output_layout.addLayout(format_layout)
         output_layout.addLayout(format_group)
         
-        output_layout.addWidget(QLabel("所有文件将保存到源文件同级的 'result' 目录下"))
+        self.parallel_encode_checkbox = QCheckBox("并行压缩WOFF/WOFF2")
+        self.parallel_encode_checkbox.setChecked(True)
+        self.parallel_encode_checkbox.setToolTip("在多个进程中同时压缩WOFF和WOFF2，大字体可明显缩短处理时间")
+        output_layout.addWidget(self.parallel_encode_checkbox)
+        
+        self.use_cache_checkbox = QCheckBox("使用缓存")
+        self.use_cache_checkbox.setChecked(True)
+        self.use_cache_checkbox.setToolTip("字体文件、字符和选项都没有变化时，直接复用上次生成的结果")
+        output_layout.addWidget(self.use_cache_checkbox)
+        
+        self.use_mmap_checkbox = QCheckBox("内存映射读取")
+        self.use_mmap_checkbox.setToolTip("通过内存映射按需读取源字体，降低几十MB的大字体的内存占用")
+        output_layout.addWidget(self.use_mmap_checkbox)
+        
+        self.lite_preview_checkbox = QCheckBox("轻量预览页")
+        self.lite_preview_checkbox.setChecked(True)
+        self.lite_preview_checkbox.setToolTip("预览页只内嵌预览文字用到的字形，原始字体点击后才加载，大字体的预览也能立即打开")
+        output_layout.addWidget(self.lite_preview_checkbox)
+        
+        slice_layout = QHBoxLayout()
+        slice_layout.addWidget(QLabel("unicode-range分片数(0为不分片):"))
+        self.slice_count_input = QSpinBox()
+        self.slice_count_input.setRange(0, 500)
+        self.slice_count_input.setToolTip("按常用字顺序切分为多个WOFF2分片并生成CSS，网页只下载用到的分片")
+        slice_layout.addWidget(self.slice_count_input)
+        self.incremental_checkbox = QCheckBox("增量更新分片")
+        self.incremental_checkbox.setChecked(True)
+        self.incremental_checkbox.setToolTip("字符只增不减时保留上次生成的分片，只为新增字符生成新分片；主字体的各格式每次仍完整生成")
+        slice_layout.addWidget(self.incremental_checkbox)
+        slice_layout.addStretch(1)
+        output_layout.addLayout(slice_layout)
+        
+        budget_layout = QHBoxLayout()
+        budget_layout.addWidget(QLabel("WOFF2体积预算KB(0为不限制):"))
+        self.size_budget_input = QSpinBox()
+        self.size_budget_input.setRange(0, 100000)
+        self.size_budget_input.setToolTip("把常用字列表视为按使用频率排序，只保留WOFF2不超过预算的最多的常用字")
+        budget_layout.addWidget(self.size_budget_input)
+        budget_layout.addStretch(1)
+        output_layout.addLayout(budget_layout)
+        
+        instance_layout = QHBoxLayout()
+        instance_layout.addWidget(QLabel("可变字体实例:"))
+        self.instances_input = QLineEdit()
+        self.instances_input.setPlaceholderText("可选，多个实例用;分隔，例如 wght=400; wght=700; wght=300:700")
+        self.instances_input.setToolTip("可变字体先固定或缩小轴的范围再子集化，额外生成各实例的字体文件和CSS，预览页中对比大小和耗时")
+        instance_layout.addWidget(self.instances_input)
+        output_layout.addLayout(instance_layout)
+        
+        profile_layout = QHBoxLayout()
+        profile_layout.addWidget(QLabel("子集化选项预设:"))
+        self.profile_combo = QComboBox()
+        for name, (description, _) in SUBSET_PROFILES.items():
+            self.profile_combo.addItem(name, name)
+            self.profile_combo.setItemData(self.profile_combo.count() - 1, description, Qt.ToolTipRole)
+        self.profile_combo.setToolTip("不同预设的大小和耗时会记录在结果目录中，并在预览页中对比")
+        profile_layout.addWidget(self.profile_combo)
+        profile_layout.addWidget(QLabel("WOFF/WOFF2轮廓:"))
+        self.outline_combo = QComboBox()
+        for name, (description, _) in OUTLINE_MODES.items():
+            self.outline_combo.addItem(name, name)
+            self.outline_combo.setItemData(self.outline_combo.count() - 1, description, Qt.ToolTipRole)
+        self.outline_combo.setToolTip("TTF固定为TrueType轮廓，OTF固定为CFF轮廓；各轮廓的大小和耗时在预览页中对比")
+        profile_layout.addWidget(self.outline_combo)
+        profile_layout.addStretch(1)
+        output_layout.addLayout(profile_layout)
+        
+        output_layout.addWidget(QLabel("每个字体的文件将保存到源文件同级的 'result/<字体文件名>' 目录下"))
         
         # 添加HTML预览文件提示
-        preview_html_label = QLabel("生成完成后，将在result目录生成index.html预览文件用于测试字体效果")
+        preview_html_label = QLabel("生成完成后，将在该目录生成index.html预览文件用于测试字体效果")
         preview_html_label.setStyleSheet("color: #4CAF50; font-weight: bold;")
         output_layout.addWidget(preview_html_label)
         
@@ -687,23 +302,212 @@ class FontConverterApp(QMainWindow):
         self.convert_button = QPushButton("开始处理")
         self.convert_button.setStyleSheet("font-size: 16px; padding: 10px;")
         self.convert_button.clicked.connect(self.start_conversion)
-        main_layout.addWidget(self.convert_button)
+        self.cancel_button = QPushButton("取消")
+        self.cancel_button.setStyleSheet("font-size: 16px; padding: 10px;")
+        self.cancel_button.setEnabled(False)
+        self.cancel_button.clicked.connect(self.cancel_conversion)
+        button_layout = QHBoxLayout()
+        button_layout.addWidget(self.convert_button)
+        button_layout.addWidget(self.cancel_button)
+        self.watch_checkbox = QCheckBox("监视模式")
+        self.watch_checkbox.setToolTip("源字体、字符或选项变化后自动重新生成，已打开的预览页自动刷新")
+        self.watch_checkbox.toggled.connect(self.toggle_watch)
+        button_layout.addWidget(self.watch_checkbox)
+        main_layout.addLayout(button_layout)
+        
+        # 监视模式下字符和选项的修改也会触发重建
+        self.url_input.textChanged.connect(self.schedule_rebuild)
+        self.custom_chars.textChanged.connect(self.schedule_rebuild)
+        self.site_dir_input.editingFinished.connect(self.schedule_rebuild)
+        for checkbox in list(self.format_checkboxes.values()) + [
+            self.offline_checkbox, self.parallel_encode_checkbox, self.use_cache_checkbox,
+            self.use_mmap_checkbox, self.lite_preview_checkbox, self.incremental_checkbox
+        ]:
+            checkbox.toggled.connect(self.schedule_rebuild)
+        self.slice_count_input.valueChanged.connect(self.schedule_rebuild)
+        self.size_budget_input.valueChanged.connect(self.schedule_rebuild)
+        self.instances_input.editingFinished.connect(self.schedule_rebuild)
+        self.profile_combo.currentIndexChanged.connect(self.schedule_rebuild)
+        self.outline_combo.currentIndexChanged.connect(self.schedule_rebuild)
     
         self.input_font_path = ""
         self.converter_thread = None
         
     def browse_font(self):
         file_dialog = QFileDialog()
-        file_path, _ = file_dialog.getOpenFileName(
+        file_paths, _ = file_dialog.getOpenFileNames(
             self, "选择字体文件", "", "字体文件 (*.ttf *.otf *.woff *.woff2)"
         )
-        if file_path:
-            self.input_font_path = file_path
-            self.input_font_label.setText(os.path.basename(file_path))
+        if file_paths:
+            self.add_fonts([os.path.abspath(path) for path in file_paths])
+    
+    def browse_site_dir(self):
+        directory = QFileDialog.getExistingDirectory(self, "选择网站内容目录")
+        if directory:
+            site_dirs = self.site_dirs()
+            if directory not in site_dirs:
+                self.site_dir_input.setText(";".join(site_dirs + [directory]))
+                self.schedule_rebuild()
+    
+    def instance_specs(self):
+        return [spec.strip() for spec in self.instances_input.text().split(";") if spec.strip()]
+    
+    def site_dirs(self):
+        return [path.strip() for path in self.site_dir_input.text().split(";") if path.strip()]
+    
+    def dragEnterEvent(self, event):
+        if event.mimeData().hasUrls():
+            event.acceptProposedAction()
+    
+    def dropEvent(self, event):
+        paths = [url.toLocalFile() for url in event.mimeData().urls() if url.isLocalFile()]
+        # 拖放的目录中的字体也一起加入
+        font_paths = collect_fonts([path for path in paths if os.path.isdir(path)])
+        font_paths += [os.path.abspath(path) for path in paths
+                       if os.path.isfile(path) and path.lower().endswith(FONT_EXTENSIONS)]
+        if font_paths:
+            event.acceptProposedAction()
+            self.add_fonts(font_paths)
+    
+    def add_fonts(self, font_paths):
+        """把字体加入列表，正在处理时直接加入当前队列"""
+        last_row = None
+        for font_path in font_paths:
+            existing = [job for job in self.jobs.values() if job['path'] == font_path]
+            if existing:
+                last_row = self.job_table.row(existing[0]['item'])
+                continue
+            job_id = self.next_job_id
+            self.next_job_id += 1
+            row = self.job_table.rowCount()
+            self.job_table.insertRow(row)
+            item = QTableWidgetItem(os.path.basename(font_path))
+            item.setToolTip(font_path)
+            item.setData(Qt.UserRole, job_id)
+            self.job_table.setItem(row, 0, item)
+            self.job_table.setItem(row, 1, QTableWidgetItem(""))
+            progress_bar = QProgressBar()
+            self.job_table.setCellWidget(row, 2, progress_bar)
+            self.job_table.setItem(row, 3, QTableWidgetItem(""))
+            self.jobs[job_id] = {'path': font_path, 'item': item, 'progress_bar': progress_bar,
+                                 'state': None, 'message': "", 'events': []}
+            self.set_job_state(job_id, "等待处理")
+            if self.job_queue and self.job_queue.is_running():
+                self.enqueue_job(job_id)
+            last_row = row
+        if last_row is not None:
+            self.job_table.selectRow(last_row)
+    
+    def set_job_state(self, job_id, state, detail=None):
+        job = self.jobs[job_id]
+        job['state'] = state
+        row = self.job_table.row(job['item'])
+        self.job_table.item(row, 1).setText(state)
+        if detail is not None:
+            self.job_table.item(row, 3).setText(detail)
+    
+    def select_job(self):
+        rows = self.job_table.selectionModel().selectedRows()
+        if not rows:
+            return
+        job_id = self.job_table.item(rows[0].row(), 0).data(Qt.UserRole)
+        file_path = self.jobs[job_id]['path']
+        if file_path == self.input_font_path:
+            return
+        self.input_font_path = file_path
+        self.input_font_label.setText(os.path.basename(file_path))
+        # 只读取name、cmap等少量表，大字体也能立即显示基本信息
+        try:
+            info = probe_font(file_path)
+            self.input_font_label.setText(f"{os.path.basename(file_path)} ({format_font_info(info)})")
+        except Exception as e:
+            self.status_label.setText(f"读取字体信息失败: {str(e)}")
+        # 监视模式只监视选中的字体
+        if self.watch_checkbox.isChecked():
+            self.start_watcher()
+            self.schedule_rebuild()
+    
+    def clear_finished_jobs(self):
+        for job_id, job in list(self.jobs.items()):
+            if job['state'] not in ACTIVE_JOB_STATES:
+                self.job_table.removeRow(self.job_table.row(job['item']))
+                del self.jobs[job_id]
+        if self.input_font_path not in {job['path'] for job in self.jobs.values()}:
+            self.input_font_path = ""
+            self.input_font_label.setText("未选择，可以多选或把字体文件拖放到窗口中")
+            self.stop_watcher()
+    
+    def open_job_preview(self, row, column):
+        job_id = self.job_table.item(row, 0).data(Qt.UserRole)
+        html_path = os.path.join(get_output_dir(self.jobs[job_id]['path'], None), "index.html")
+        if os.path.exists(html_path):
+            import webbrowser
+            webbrowser.open(f"file://{html_path}")
+        else:
+            self.status_label.setText("该字体还没有生成预览页")
+    
+    def toggle_watch(self, checked):
+        if checked:
+            self.preview_opened = False
+            self.start_watcher()
+            self.schedule_rebuild()
+        else:
+            self.stop_watcher()
+            self.rebuild_timer.stop()
+    
+    def start_watcher(self):
+        self.stop_watcher()
+        if self.input_font_path:
+            self.watcher = FileWatcher([self.input_font_path], self.files_changed.emit).start()
+            self.status_label.setText(f"监视模式: 正在监视 {os.path.basename(self.input_font_path)} ({self.watcher.backend.name})")
+    
+    def stop_watcher(self):
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+    
+    def schedule_rebuild(self, *args):
+        if self.watch_checkbox.isChecked() and self.input_font_path:
+            self.rebuild_timer.start()
+    
+    def rebuild(self):
+        # 正在生成时取消本次，结束后立即按最新的字符和选项重建
+        if self.job_queue and self.job_queue.is_running():
+            self.rerun_pending = True
+            return
+        if self.converter_thread and self.converter_thread.isRunning():
+            self.rerun_pending = True
+            self.converter_thread.cancel()
+            return
+        self.start_conversion()
+    
+    def conversion_options(self, selected_formats):
+        """单个字体的线程和多字体的任务队列共用的转换参数"""
+        return {
+            'url_text': self.url_input.text().strip(),
+            'custom_text': self.custom_chars.toPlainText(),
+            'output_formats': selected_formats,
+            'parallel_encode': self.parallel_encode_checkbox.isChecked(),
+            'cache': SubsetCache() if self.use_cache_checkbox.isChecked() else None,
+            'fetcher': CharListFetcher(offline=self.offline_checkbox.isChecked()),
+            'use_mmap': self.use_mmap_checkbox.isChecked(),
+            'slice_count': self.slice_count_input.value(),
+            'incremental': self.incremental_checkbox.isChecked(),
+            'lite_preview': self.lite_preview_checkbox.isChecked(),
+            'size_budget': self.size_budget_input.value() * 1024,
+            'auto_refresh': self.watch_checkbox.isChecked(),
+            'subset_profile': self.profile_combo.currentData(),
+            'site_dirs': self.site_dirs() or None,
+            'instances': self.instance_specs() or None,
+            'outline_mode': self.outline_combo.currentData()
+        }
     
     def start_conversion(self):
-        if not self.input_font_path:
-            QMessageBox.warning(self, "提示", "请选择一个字体源文件。")
+        if not self.jobs:
+            QMessageBox.warning(self, "提示", "请选择至少一个字体源文件。")
+            return
+        if self.watch_checkbox.isChecked() and not self.input_font_path:
+            QMessageBox.warning(self, "提示", "监视模式下请在列表中选中一个字体。")
             return
         
         selected_formats = []
@@ -714,26 +518,60 @@ class FontConverterApp(QMainWindow):
         if not selected_formats:
             QMessageBox.warning(self, "提示", "请至少选择一种输出格式。")
             return
+        
+        try:
+            for spec in self.instance_specs():
+                parse_instance_spec(spec)
+        except ValueError as e:
+            QMessageBox.warning(self, "提示", str(e))
+            return
             
         self.progress_bar.setValue(0)
         self.status_label.setText("开始处理...")
         self.convert_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
+        
+        options = self.conversion_options(selected_formats)
+        # 监视模式只处理选中的字体，在当前进程中重建，fontTools只导入一次
+        if self.watch_checkbox.isChecked():
+            self.converter_thread = FontConverterThread(
+                self.input_font_path,
+                output_dir=get_output_dir(self.input_font_path, None),
+                **options
+            )
+            self.converter_thread.progress_update.connect(self.update_progress)
+            self.converter_thread.status_update.connect(self.update_status)
+            self.converter_thread.completed.connect(self.conversion_completed)
+            self.converter_thread.stage_event.connect(self.record_stage_event)
+            self.stage_events = []
+            self.converter_thread.start()
+            return
         
-        url_text = self.url_input.text().strip()
-        custom_text = self.custom_chars.toPlainText()
-
-        self.converter_thread = FontConverterThread(
-            self.input_font_path, 
-            url_text, 
-            custom_text,
-            selected_formats
-        )
+        # 其余情况把列表中没有在处理的字体都交给任务队列，在多个进程中同时处理
+        self.job_queue = JobQueue(self.pool_size_input.value(), options, self.job_event.emit)
+        self.batch_jobs = []
+        for job_id, job in self.jobs.items():
+            if job['state'] not in ACTIVE_JOB_STATES:
+                self.enqueue_job(job_id)
+        self.job_queue.start()
     
-        self.converter_thread.progress_update.connect(self.update_progress)
-        self.converter_thread.status_update.connect(self.update_status)
-        self.converter_thread.completed.connect(self.conversion_completed)
-        
-        self.converter_thread.start()
+    def enqueue_job(self, job_id):
+        job = self.jobs[job_id]
+        if self.job_queue.add(job_id, job['path'], get_output_dir(job['path'], None)):
+            job['events'] = []
+            job['progress_bar'].setValue(0)
+            self.set_job_state(job_id, "排队中", "")
+            self.batch_jobs.append(job_id)
+    
+    def cancel_conversion(self):
+        if self.job_queue and self.job_queue.is_running():
+            self.cancel_button.setEnabled(False)
+            self.status_label.setText("正在取消...")
+            self.job_queue.cancel()
+        elif self.converter_thread and self.converter_thread.isRunning():
+            self.cancel_button.setEnabled(False)
+            self.status_label.setText("正在取消...")
+            self.converter_thread.cancel()
     
     def update_progress(self, value):
         self.progress_bar.setValue(value)
@@ -741,17 +579,109 @@ class FontConverterApp(QMainWindow):
     def update_status(self, message):
         self.status_label.setText(message)
     
+    def record_stage_event(self, event):
+        self.stage_events.append(event)
+        self.status_label.setText(format_event(event))
+    
+    def handle_job_event(self, job_id, kind, value):
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        row = self.job_table.row(job['item'])
+        if kind == "started":
+            self.set_job_state(job_id, "处理中")
+        elif kind == "progress":
+            job['progress_bar'].setValue(value)
+        elif kind == "status":
+            self.job_table.item(row, 3).setText(value)
+        elif kind == "stage":
+            job['events'].append(value)
+        elif kind == "finished":
+            success, message, events = value
+            job['message'] = message
+            job['events'] = events or job['events']
+            if success:
+                state = "完成"
+                job['progress_bar'].setValue(100)
+            else:
+                state = "已取消" if message == "已取消" else "失败"
+            self.set_job_state(job_id, state, message.splitlines()[0] if message else "")
+            self.job_table.item(row, 3).setToolTip(
+                message + "\n" + "\n".join(format_event(event) for event in job['events']))
+        # 总进度取本批各字体进度的平均值
+        batch = [self.jobs[batch_id] for batch_id in self.batch_jobs if batch_id in self.jobs]
+        if batch:
+            self.progress_bar.setValue(sum(job['progress_bar'].value() for job in batch) // len(batch))
+            done = sum(1 for job in batch if job['state'] not in ACTIVE_JOB_STATES)
+            self.status_label.setText(f"已处理 {done}/{len(batch)} 个字体")
+        if kind == "finished" and not any(job['state'] in ACTIVE_JOB_STATES for job in batch):
+            self.queue_completed(batch)
+    
+    def queue_completed(self, batch):
+        self.convert_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
+        
+        if self.rerun_pending:
+            self.rerun_pending = False
+            self.rebuild_timer.start()
+            return
+        if all(job['state'] == "已取消" for job in batch):
+            self.progress_bar.setValue(0)
+            self.status_label.setText("已取消")
+            return
+        if len(batch) == 1:
+            job = batch[0]
+            self.show_result(job['path'], job['state'] == "完成", job['message'], job['events'])
+            return
+        succeeded = sum(1 for job in batch if job['state'] == "完成")
+        failed = sum(1 for job in batch if job['state'] == "失败")
+        summary = f"处理结束: 成功 {succeeded} 个，失败 {failed} 个"
+        if len(batch) - succeeded - failed:
+            summary += f"，取消 {len(batch) - succeeded - failed} 个"
+        self.status_label.setText(summary)
+        msg_box = QMessageBox(self)
+        msg_box.setIcon(QMessageBox.Warning if failed else QMessageBox.Information)
+        msg_box.setWindowTitle("处理结束")
+        msg_box.setText(summary)
+        msg_box.setInformativeText("双击列表中的字体可以打开它的预览HTML文件")
+        msg_box.setDetailedText("\n\n".join(
+            f"{os.path.basename(job['path'])}: {job['state']}\n{job['message']}" for job in batch))
+        msg_box.exec_()
+    
     def conversion_completed(self, success, message):
         self.convert_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
         
+        if self.rerun_pending:
+            self.rerun_pending = False
+            self.rebuild_timer.start()
+            return
+        if message == "已取消":
+            self.progress_bar.setValue(0)
+            return
+        if self.watch_checkbox.isChecked():
+            # 监视模式下不弹出对话框，只在第一次生成后打开预览页，之后由预览页自动刷新
+            if not success:
+                self.status_label.setText(f"监视模式: 生成失败: {message}")
+                return
+            self.status_label.setText(f"监视模式: 已更新 {time.strftime('%H:%M:%S')}")
+            if not self.preview_opened:
+                self.preview_opened = True
+                import webbrowser
+                html_path = os.path.join(get_output_dir(self.input_font_path, None), "index.html")
+                webbrowser.open(f"file://{html_path}")
+            return
+        self.show_result(self.input_font_path, success, message, self.stage_events)
+    
+    def show_result(self, font_path, success, message, stage_events):
         if success:
-            result_dir = os.path.join(os.path.dirname(self.input_font_path), "result")
-            html_path = os.path.join(result_dir, "index.html")
+            html_path = os.path.join(get_output_dir(font_path, None), "index.html")
             
             msg_box = QMessageBox()
             msg_box.setWindowTitle("成功")
             msg_box.setText(f"字体处理完成!\n{message}")
             msg_box.setInformativeText("是否打开预览HTML文件?")
+            msg_box.setDetailedText("各阶段耗时:\n" + "\n".join(format_event(event) for event in stage_events))
             msg_box.setStandardButtons(QMessageBox.Yes | QMessageBox.No)
             msg_box.setDefaultButton(QMessageBox.Yes)
             
@@ -773,6 +703,8 @@ def resource_path(relative_path):
     return os.path.join(os.path.abspath("."), relative_path)
 
 def main():
+    # 打包后的可执行文件中使用子进程需要先调用freeze_support
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     app.setWindowIcon(QIcon(resource_path('font.ico')))
     window = FontConverterApp()
@@ -0,0 +1,253 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+
+from converter import FontConverter, encode_output_format, open_font
+from metrics import peak_rss, current_rss
+from profiles import make_options, SUBSET_PROFILES, DEFAULT_PROFILE
+
+# 合成字体: 名称 -> (说明, 码位列表)
+SYNTHETIC_FONTS = {
+    "latin": ("小型拉丁字体", list(range(0x20, 0x7F)) + list(range(0xA0, 0x180))),
+    "gb2312": ("GB2312规模的中文字体(约7千字)", list(range(0x20, 0x7F)) + list(range(0x4E00, 0x4E00 + 7000))),
+    "cjk": ("完整的中日韩字体(约3万字)", list(range(0x20, 0x7F)) + list(range(0x4E00, 0x9FA6)) + list(range(0x3400, 0x3400 + 9000))),
+}
+
+# 每个字体测试的子集字符数，超过字体字符数的会被跳过
+DEFAULT_SUBSET_SIZES = [100, 1000, 3500, 7000]
+
+DEFAULT_FORMATS = ["TTF", "WOFF", "WOFF2"]
+
+
+def build_synthetic_font(path, codepoints, family_name="Bench"):
+    """
+    生成一个每个字符都有不同轮廓的TrueType字体
+    轮廓用固定的随机种子生成，保证多次运行得到相同的字体，压缩率也接近真实字体
+    """
+    from fontTools.fontBuilder import FontBuilder
+    from fontTools.pens.ttGlyphPen import TTGlyphPen
+
+    glyph_names = [".notdef"] + [f"uni{cp:04X}" for cp in codepoints]
+    builder = FontBuilder(1000, isTTF=True)
+    builder.setupGlyphOrder(glyph_names)
+    builder.setupCharacterMap({cp: f"uni{cp:04X}" for cp in codepoints})
+
+    glyphs = {}
+    for index, name in enumerate(glyph_names):
+        rng = random.Random(index)
+        pen = TTGlyphPen(None)
+        for _ in range(rng.randint(2, 6)):
+            x, y = rng.randint(50, 700), rng.randint(0, 600)
+            points = [(x + rng.randint(0, 250), y + rng.randint(0, 250)) for _ in range(rng.randint(4, 10))]
+            pen.moveTo(points[0])
+            for point in points[1:]:
+                pen.lineTo(point)
+            pen.closePath()
+        glyphs[name] = pen.glyph()
+
+    builder.setupGlyf(glyphs)
+    builder.setupHorizontalMetrics({name: (1000, 50) for name in glyph_names})
+    builder.setupHorizontalHeader(ascent=880, descent=-120)
+    builder.setupNameTable({"familyName": family_name, "styleName": "Regular"})
+    builder.setupOS2(sTypoAscender=880, sTypoDescender=-120, usWinAscent=880, usWinDescent=120)
+    builder.setupPost()
+    builder.save(path)
+
+
+def ensure_fonts(work_dir, names):
+    """在工作目录中生成合成字体，已存在时直接复用"""
+    os.makedirs(work_dir, exist_ok=True)
+    paths = {}
+    for name in names:
+        path = os.path.join(work_dir, f"bench-{name}.ttf")
+        if not os.path.isfile(path):
+            print(f"生成合成字体 {name}: {SYNTHETIC_FONTS[name][0]}...")
+            build_synthetic_font(path, SYNTHETIC_FONTS[name][1])
+        paths[name] = path
+    return paths
+
+
+def run_case(font_path, codepoints, output_formats, output_dir, profile=DEFAULT_PROFILE):
+    """
+    在独立的子进程中测量一组参数下每个阶段的耗时、内存变化和输出大小
+    每个用例使用新进程，峰值内存互不影响
+    """
+    from fontTools.subset import Subsetter
+
+    stages = []
+
+    def record(stage, start, rss_before, bytes_out=None):
+        rss_after = current_rss()
+        stages.append({
+            "stage": stage,
+            "seconds": round(time.perf_counter() - start, 6),
+            "rss_delta": rss_after - rss_before if rss_after is not None and rss_before is not None else None,
+            "bytes_out": bytes_out
+        })
+
+    start, rss = time.perf_counter(), current_rss()
+    font = open_font(font_path)
+    font.getBestCmap()
+    record("load", start, rss)
+
+    start, rss = time.perf_counter(), current_rss()
+    subsetter = Subsetter(options=make_options(profile))
+    subsetter.populate(unicodes=codepoints)
+    record("populate", start, rss)
+
+    start, rss = time.perf_counter(), current_rss()
+    subsetter.subset(font)
+    record("subset", start, rss)
+
+    start, rss = time.perf_counter(), current_rss()
+    buffer = BytesIO()
+    font.save(buffer)
+    ttf_data = buffer.getvalue()
+    font.close()
+    record("compile", start, rss, len(ttf_data))
+
+    for output_format in output_formats:
+        start, rss = time.perf_counter(), current_rss()
+        data = encode_output_format(ttf_data, output_format)
+        record(f"encode:{output_format}", start, rss, len(data))
+
+    # HTML预览和完整流程都通过FontConverter执行，与界面和命令行的实际用法一致
+    converter = FontConverter(font_path, "", "".join(map(chr, codepoints)), output_formats, output_dir=output_dir,
+                              subset_profile=profile)
+    start, rss = time.perf_counter(), current_rss()
+    success, message = converter.run()
+    if not success:
+        raise RuntimeError(message)
+    record("pipeline", start, rss, sum(
+        os.path.getsize(os.path.join(output_dir, name)) for name in os.listdir(output_dir)
+    ))
+
+    base_filename = os.path.splitext(os.path.basename(font_path))[0]
+    font_files = [
+        {'format': fmt, 'path': f"{base_filename}-subset.{fmt.lower()}", 'rel_path': f"./{base_filename}-subset.{fmt.lower()}",
+         'size': os.path.getsize(os.path.join(output_dir, f"{base_filename}-subset.{fmt.lower()}"))}
+        for fmt in output_formats
+    ]
+    start, rss = time.perf_counter(), current_rss()
+    html_content = converter.generate_html_preview(
+        "Bench", "Bench", os.path.basename(font_path), font_path,
+        font_files, "".join(map(chr, codepoints[:100])), "0123456789"
+    )
+    record("html", start, rss, len(html_content.encode("utf-8")))
+
+    return {"stages": stages, "peak_rss": peak_rss()}
+
+
+def compare(results, baseline, tolerance):
+    """与基准结果对比，返回耗时超出容差的阶段说明列表"""
+    baseline_times = {}
+    for case in baseline.get("cases", []):
+        for stage in case["stages"]:
+            key = (case["font"], case["subset_size"], case.get("profile", DEFAULT_PROFILE), stage["stage"])
+            baseline_times[key] = stage["seconds"]
+    regressions = []
+    for case in results["cases"]:
+        for stage in case["stages"]:
+            key = (case["font"], case["subset_size"], case.get("profile", DEFAULT_PROFILE), stage["stage"])
+            old = baseline_times.get(key)
+            # 太短的阶段受计时误差影响较大，不参与比较
+            if old and old >= 0.005 and stage["seconds"] > old * (1 + tolerance):
+                regressions.append(f"{key[0]} / {key[1]} 字 / {key[2]} / {key[3]}: {old:.3f}s -> {stage['seconds']:.3f}s")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="字体子集化流程的性能基准测试")
+    parser.add_argument("--fonts", default=",".join(SYNTHETIC_FONTS),
+                        help="要测试的合成字体，逗号分隔，默认 %(default)s")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SUBSET_SIZES)),
+                        help="子集字符数，逗号分隔，默认 %(default)s")
+    parser.add_argument("--formats", default=",".join(DEFAULT_FORMATS), help="测试的输出格式，默认 %(default)s")
+    parser.add_argument("--profiles", default=DEFAULT_PROFILE,
+                        help=f"子集化选项预设，逗号分隔，可选 {', '.join(SUBSET_PROFILES)}，默认 %(default)s")
+    parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "thin-font-bench"),
+                        help="合成字体和输出文件的工作目录，默认 %(default)s")
+    parser.add_argument("-o", "--output", default="benchmark-results.json", help="结果JSON文件，默认 %(default)s")
+    parser.add_argument("--baseline", help="用于对比的历史结果JSON文件")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="允许的耗时增长比例，默认 %(default)s")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    font_names = [name.strip() for name in args.fonts.split(",") if name.strip()]
+    for name in font_names:
+        if name not in SYNTHETIC_FONTS:
+            print(f"未知的合成字体: {name}", file=sys.stderr)
+            return 2
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    output_formats = [fmt.strip().upper() for fmt in args.formats.split(",") if fmt.strip()]
+    profiles = [name.strip() for name in args.profiles.split(",") if name.strip()]
+    for name in profiles:
+        if name not in SUBSET_PROFILES:
+            print(f"未知的子集化选项预设: {name}", file=sys.stderr)
+            return 2
+
+    font_paths = ensure_fonts(args.work_dir, font_names)
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "cases": []
+    }
+    try:
+        import fontTools
+        results["fonttools"] = fontTools.version
+    except ImportError:
+        pass
+
+    for name in font_names:
+        all_codepoints = SYNTHETIC_FONTS[name][1]
+        for size in sizes:
+            if size > len(all_codepoints):
+                continue
+            # 均匀抽取字符，避免只测试连续区间
+            step = len(all_codepoints) / size
+            codepoints = [all_codepoints[int(i * step)] for i in range(size)]
+            for profile in profiles:
+                output_dir = os.path.join(args.work_dir, "result", f"{name}-{size}-{profile}")
+                os.makedirs(output_dir, exist_ok=True)
+                with ProcessPoolExecutor(max_workers=1) as executor:
+                    case = executor.submit(
+                        run_case, font_paths[name], codepoints, output_formats, output_dir, profile
+                    ).result()
+                case.update({
+                    "font": name,
+                    "font_bytes": os.path.getsize(font_paths[name]),
+                    "subset_size": size,
+                    "profile": profile
+                })
+                results["cases"].append(case)
+                summary = "  ".join(f"{stage['stage']}={stage['seconds']:.3f}s" for stage in case["stages"])
+                print(f"{name:<7} {size:>6} 字 {profile:<10} {summary}  峰值内存={case['peak_rss'] / (1024 * 1024):.1f}MB")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"以下阶段的耗时超出基准 {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("没有发现性能退化")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+import os
+import sys
+import time
+from io import BytesIO
+
+from subset_cache import link_or_copy
+
+# 归档格式 -> tarfile的流式写入模式，zip单独处理
+TAR_MODES = {
+    "tar": "w|",
+    "tar.gz": "w|gz"
+}
+
+ARCHIVE_FORMATS = ["zip"] + list(TAR_MODES)
+
+# 已经压缩过的格式在zip中直接存储，不再重复压缩
+STORED_EXTENSIONS = (".woff", ".woff2")
+
+
+def guess_archive_format(path):
+    """根据扩展名判断归档格式，无法判断时抛出ValueError"""
+    name = path.lower()
+    if name.endswith(".zip"):
+        return "zip"
+    if name.endswith((".tar.gz", ".tgz")):
+        return "tar.gz"
+    if name.endswith(".tar"):
+        return "tar"
+    raise ValueError(f"无法根据扩展名判断归档格式: {path}，可选 {', '.join(ARCHIVE_FORMATS)}")
+
+
+def to_bytes(data):
+    return data.encode("utf-8") if isinstance(data, str) else data
+
+
+class DirectoryOutput:
+    """
+    把生成的文件写入结果目录
+    write返回文件路径；result_dir供增量更新等需要读取上次结果的步骤使用
+    """
+
+    def __init__(self, result_dir):
+        self.result_dir = result_dir
+        self.location = result_dir
+        os.makedirs(result_dir, exist_ok=True)
+
+    def write(self, name, data):
+        path = os.path.join(self.result_dir, name)
+        # 旧文件可能是指向缓存的硬链接，先删除再写入，避免改写缓存内容
+        if os.path.lexists(path):
+            os.remove(path)
+        with open(path, "wb") as f:
+            f.write(to_bytes(data))
+        return path
+
+    def add_file(self, name, source_path):
+        """加入一个已有的文件（如缓存中的结果），优先使用硬链接"""
+        path = os.path.join(self.result_dir, name)
+        link_or_copy(source_path, path)
+        return path
+
+    def close(self):
+        pass
+
+
+class ArchiveOutput:
+    """
+    把生成的文件按顺序直接写入zip或tar归档，不经过结果目录，源字体所在目录可以是只读的
+    target: 归档文件路径，"-"表示写到标准输出
+    archive_format: zip、tar或tar.gz，为None时根据target的扩展名判断
+    stdout: target为"-"时写入的标准输出，默认是当前的sys.stdout
+    """
+
+    result_dir = None
+
+    def __init__(self, target, archive_format=None, stdout=None):
+        self.archive_format = archive_format or guess_archive_format(target)
+        if self.archive_format not in ARCHIVE_FORMATS:
+            raise ValueError(f"不支持的归档格式: {self.archive_format}，可选 {', '.join(ARCHIVE_FORMATS)}")
+        self.location = "标准输出" if target == "-" else target
+        self.stream = (stdout or sys.stdout).buffer if target == "-" else None
+        if self.archive_format == "zip":
+            import zipfile
+            self.zip_module = zipfile
+            # 写到管道等不能回退的流时，zipfile会在每个文件后写入数据描述符
+            self.archive = zipfile.ZipFile(self.stream or target, "w", compression=zipfile.ZIP_DEFLATED)
+        else:
+            import tarfile
+            self.tar_module = tarfile
+            mode = TAR_MODES[self.archive_format]
+            if self.stream is not None:
+                self.archive = tarfile.open(fileobj=self.stream, mode=mode)
+            else:
+                self.archive = tarfile.open(target, mode=mode)
+
+    def compress_type(self, name):
+        if name.lower().endswith(STORED_EXTENSIONS):
+            return self.zip_module.ZIP_STORED
+        return self.zip_module.ZIP_DEFLATED
+
+    def write(self, name, data):
+        data = to_bytes(data)
+        if self.archive_format == "zip":
+            info = self.zip_module.ZipInfo(name, time.localtime()[:6])
+            info.compress_type = self.compress_type(name)
+            info.external_attr = 0o644 << 16
+            self.archive.writestr(info, data)
+        else:
+            info = self.tar_module.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            info.mode = 0o644
+            self.archive.addfile(info, BytesIO(data))
+        return name
+
+    def add_file(self, name, source_path):
+        if self.archive_format == "zip":
+            self.archive.write(source_path, name, compress_type=self.compress_type(name))
+        else:
+            self.archive.add(source_path, name)
+        return name
+
+    def close(self):
+        self.archive.close()
+        if self.stream is not None:
+            self.stream.flush()
+
+
+class MemoryOutput:
+    """
+    在批处理的子进程中收集生成的文件，返回给主进程后依次写入同一个归档
+    files: [(文件名, 数据)]
+    """
+
+    result_dir = None
+
+    def __init__(self):
+        self.files = []
+        self.location = "归档"
+
+    def write(self, name, data):
+        self.files.append((name, to_bytes(data)))
+        return name
+
+    def add_file(self, name, source_path):
+        with open(source_path, "rb") as f:
+            self.files.append((name, f.read()))
+        return name
+
+    def close(self):
+        pass
@@ -0,0 +1,177 @@
+import os
+import json
+import hashlib
+import threading
+import unicodedata
+
+# 默认的字符列表缓存目录
+DEFAULT_CHARS_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "thin-font", "charlists")
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """返回进程内共享的requests.Session，复用连接池并对临时错误自动重试"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            # requests导入较慢，只在真正需要下载时才导入
+            import requests
+            from requests.adapters import HTTPAdapter
+            from urllib3.util.retry import Retry
+            session = requests.Session()
+            retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(500, 502, 503, 504))
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=retry)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def text_to_codepoints(*texts):
+    """
+    把多个文本来源合并为去重、排序后的码位列表
+    换行、制表符等控制字符不需要字形，直接丢弃
+    """
+    codepoints = set()
+    for text in texts:
+        if text:
+            codepoints.update(map(ord, text))
+    return sorted(cp for cp in codepoints if unicodedata.category(chr(cp)) not in ("Cc", "Cs"))
+
+
+def text_to_ordered_codepoints(*texts):
+    """
+    与text_to_codepoints相同，但保留字符首次出现的顺序
+    常用字列表通常按使用频率排列，分片时据此把最常用的字符放在前面
+    """
+    seen = set()
+    codepoints = []
+    for text in texts:
+        for cp in map(ord, text or ""):
+            if cp not in seen:
+                seen.add(cp)
+                if unicodedata.category(chr(cp)) not in ("Cc", "Cs"):
+                    codepoints.append(cp)
+    return codepoints
+
+
+def format_codepoints(codepoints):
+    """把码位列表序列化为紧凑的区间字符串，例如 "U+20-7E,U+4E00-4E05,U+4E08" """
+    ranges = []
+    for cp in sorted(set(codepoints)):
+        if ranges and ranges[-1][1] == cp - 1:
+            ranges[-1][1] = cp
+        else:
+            ranges.append([cp, cp])
+    return ",".join(
+        f"U+{start:X}" if start == end else f"U+{start:X}-{end:X}"
+        for start, end in ranges
+    )
+
+
+def parse_codepoints(text):
+    """解析format_codepoints生成的区间字符串，返回排序后的码位列表，超出Unicode范围时抛出ValueError"""
+    codepoints = set()
+    for item in text.replace("\n", ",").split(","):
+        item = item.strip().upper()
+        if not item:
+            continue
+        if item.startswith("U+"):
+            item = item[2:]
+        start, _, end = item.partition("-")
+        start, end = int(start, 16), int(end or start, 16)
+        # 先检查范围再展开，避免很大的区间占满内存
+        if not 0 <= start <= 0x10FFFF or not 0 <= end <= 0x10FFFF:
+            raise ValueError(f"码位超出Unicode范围: {item}")
+        codepoints.update(range(start, end + 1))
+    return sorted(codepoints)
+
+
+class CharListFetcher:
+    """
+    带本地缓存的常用字列表下载
+    使用ETag/Last-Modified发起条件请求，服务器返回304时直接使用本地副本；
+    下载失败或离线模式下使用上次成功下载的副本
+
+    cache_dir: 缓存目录
+    offline: 离线模式，不访问网络，只使用本地副本
+    timeout: 请求超时时间（秒）
+    """
+
+    def __init__(self, cache_dir=None, offline=False, timeout=10):
+        self.cache_dir = cache_dir or DEFAULT_CHARS_CACHE_DIR
+        self.offline = offline
+        self.timeout = timeout
+
+    def cache_paths(self, url):
+        name = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{name}.txt"), os.path.join(self.cache_dir, f"{name}.json")
+
+    def load_cached(self, url):
+        """读取本地副本，返回(文本, 响应头信息)，没有副本时返回(None, {})"""
+        text_path, meta_path = self.cache_paths(url)
+        try:
+            with open(text_path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except OSError:
+            return None, {}
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            meta = {}
+        return text, meta
+
+    def save_cached(self, url, text, meta):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        text_path, meta_path = self.cache_paths(url)
+        # 先写临时文件再替换，多个进程同时下载时不会读到写了一半的文件
+        for path, content in ((text_path, text), (meta_path, json.dumps(meta))):
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+
+    def fetch(self, url):
+        """
+        获取字符列表
+        返回(文本, 来源)，来源为 "network"、"not-modified" 或 "cache"
+        网络不可用且没有本地副本时抛出异常
+        """
+        cached_text, meta = self.load_cached(url)
+        if self.offline:
+            if cached_text is None:
+                raise RuntimeError("离线模式下没有可用的本地副本")
+            return cached_text, "cache"
+
+        headers = {}
+        if cached_text is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+
+        try:
+            response = get_session().get(url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304 and cached_text is not None:
+                return cached_text, "not-modified"
+            response.raise_for_status()
+        except Exception:
+            if cached_text is None:
+                raise
+            return cached_text, "cache"
+
+        # 没有声明charset时requests会按ISO-8859-1解码，字符列表统一按UTF-8处理
+        if "charset" not in response.headers.get("Content-Type", "").lower():
+            response.encoding = "utf-8"
+        text = response.text
+        try:
+            self.save_cached(url, text, {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified")
+            })
+        except OSError:
+            pass
+        return text, "network"
@@ -0,0 +1,342 @@
+import os
+import sys
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from converter import (FontConverter, DEFAULT_CHARS_URL, probe_font, format_font_info,
+                       collect_fonts, get_output_dir)
+from subset_cache import SubsetCache, DEFAULT_CACHE_SIZE
+from charset import CharListFetcher, parse_codepoints, text_to_codepoints
+from metrics import format_event
+from watcher import FileWatcher, RebuildWorker
+from profiles import SUBSET_PROFILES, DEFAULT_PROFILE
+from bundle import ArchiveOutput, MemoryOutput, ARCHIVE_FORMATS
+from site_chars import scan_site
+from instancing import parse_instance_spec
+from outlines import OUTLINE_MODES, DEFAULT_OUTLINE_MODE
+
+# 命令行模式默认输出的格式（SVG、EOT暂不支持）
+DEFAULT_FORMATS = ["TTF", "OTF", "WOFF", "WOFF2"]
+
+
+def convert_one(font_path, url_text, custom_text, output_formats, output_dir, parallel_encode=False,
+                cache=None, fetcher=None, use_mmap=False, slice_count=0,
+                incremental=False, lite_preview=False, size_budget=0, budget_format="WOFF2",
+                auto_refresh=False, subset_profile=DEFAULT_PROFILE, site_dirs=None, instances=None,
+                outline_mode=DEFAULT_OUTLINE_MODE, bundle=False, max_workers=None):
+    """
+    在子进程中处理单个字体，返回(字体路径, 是否成功, 结果信息, 日志, 阶段事件, 归档文件)
+    bundle: 为True时不写结果目录，生成的文件以[(文件名, 数据)]返回，由主进程写入归档
+    max_workers: 字体内部各个进程池的大小，见FontConverter
+    """
+    logs = []
+    output = MemoryOutput() if bundle else None
+    converter = FontConverter(
+        font_path,
+        url_text,
+        custom_text,
+        output_formats,
+        status_callback=logs.append,
+        output_dir=output_dir,
+        parallel_encode=parallel_encode,
+        cache=cache,
+        fetcher=fetcher,
+        use_mmap=use_mmap,
+        slice_count=slice_count,
+        incremental=incremental,
+        lite_preview=lite_preview,
+        size_budget=size_budget,
+        budget_format=budget_format,
+        auto_refresh=auto_refresh,
+        subset_profile=subset_profile,
+        site_dirs=site_dirs,
+        instances=instances,
+        outline_mode=outline_mode,
+        bundle=output,
+        max_workers=max_workers
+    )
+    success, message = converter.run()
+    return font_path, success, message, logs, converter.events, output.files if output else None
+
+
+def probe_fonts(font_paths, jobs):
+    """并行读取字体的基本信息并逐行输出"""
+    failed = 0
+    with ProcessPoolExecutor(max_workers=max(1, min(jobs, len(font_paths)))) as executor:
+        futures = {executor.submit(probe_font, font_path): font_path for font_path in font_paths}
+        for future in as_completed(futures):
+            try:
+                print(f"{futures[future]}: {format_font_info(future.result())}")
+            except Exception as e:
+                failed += 1
+                print(f"{futures[future]}: 读取失败: {str(e)}")
+    return 1 if failed else 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m cli",
+        description="字体瘦身命令行批处理：对目录或通配符匹配到的所有字体并行生成子集"
+    )
+    parser.add_argument("inputs", nargs="+", help="字体源文件、目录或通配符，例如 fonts/ 或 'fonts/*.ttf'")
+    parser.add_argument("--url", default=DEFAULT_CHARS_URL, help="常用字列表URL，传入空字符串则不下载")
+    parser.add_argument("--chars", default="", help="追加的自定义字符")
+    parser.add_argument("--chars-file", help="从文本文件读取追加的自定义字符")
+    parser.add_argument("--codepoints-file", help="读取之前生成的 *-codepoints.txt 码位区间文件作为追加字符")
+    parser.add_argument("--site-dir", action="append", dest="site_dirs",
+                        help="扫描网站内容目录中HTML/JSON/Markdown/JS文件实际用到的字符，按出现次数排在最前面，可重复指定；"
+                             "再次运行时只重新读取有变化的文件")
+    parser.add_argument("--formats", default=",".join(DEFAULT_FORMATS),
+                        help="输出格式，逗号分隔，默认 %(default)s")
+    parser.add_argument("-o", "--output", help="输出根目录，每个字体输出到其中的同名子目录；默认输出到源文件同级的 result/<字体名>")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="并行进程数，默认为CPU核心数 (%(default)s)")
+    parser.add_argument("--parallel-encode", action="store_true",
+                        help="每个字体的WOFF/WOFF2在子进程中并行压缩，适合字体数量少于CPU核心数时使用")
+    parser.add_argument("--slices", type=int, default=0,
+                        help="额外生成按使用频率切分的WOFF2分片和unicode-range CSS，指定分片数量")
+    # --incremental是旧的名称，保留以兼容已有的脚本
+    parser.add_argument("--incremental-slices", "--incremental", action="store_true", dest="incremental",
+                        help="配合 --slices 使用：字符只增不减时保留上次生成的分片，新增字符并入最后一个分片，分片数量不变；"
+                             "主字体的各格式每次仍完整重新生成")
+    parser.add_argument("--subset-profile", default=DEFAULT_PROFILE, choices=list(SUBSET_PROFILES),
+                        help="子集化选项预设: " + "；".join(f"{name}: {description}" for name, (description, _) in SUBSET_PROFILES.items()))
+    parser.add_argument("--size-budget", type=int, default=0,
+                        help="体积预算(KB)，把字符列表视为按使用频率排序，只保留不超过预算的最多的前N个字符")
+    parser.add_argument("--budget-format", default="WOFF2", choices=["TTF", "OTF", "WOFF", "WOFF2"],
+                        help="体积预算针对的输出格式，默认 %(default)s")
+    parser.add_argument("--instance", action="append", dest="instances",
+                        help="可变字体先固定或缩小轴的范围再子集化，额外生成该实例的各格式和CSS，可重复指定；"
+                             "例如 wght=700 生成静态的粗体，wght=300:700 生成缩小范围的可变字体")
+    parser.add_argument("--outline", default=DEFAULT_OUTLINE_MODE, choices=list(OUTLINE_MODES), dest="outline_mode",
+                        help="WOFF/WOFF2使用的轮廓格式（TTF固定为TrueType，OTF固定为CFF）: "
+                             + "；".join(f"{name}: {description}" for name, (description, _) in OUTLINE_MODES.items()))
+    parser.add_argument("--lite-preview", action="store_true",
+                        help="生成轻量预览页，只内嵌预览用的小字体，原始字体点击后才加载，适合很大的中文字体")
+    parser.add_argument("--bundle", help="把所有字体的结果直接写入zip或tar归档（每个字体一个子目录），不创建结果目录；"
+                                         "传入 - 时写到标准输出，日志改为输出到标准错误")
+    parser.add_argument("--bundle-format", choices=ARCHIVE_FORMATS,
+                        help="归档格式，默认根据 --bundle 的扩展名判断，写到标准输出时默认为zip")
+    parser.add_argument("--mmap", action="store_true", help="通过内存映射读取源字体，降低大字体的内存占用")
+    parser.add_argument("--offline", action="store_true", help="不访问网络，使用上次下载的常用字列表")
+    parser.add_argument("--cache-dir", help="子集结果缓存目录，默认 ~/.cache/thin-font/subsets")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+                        help="缓存容量上限(MB)，超出后按最近使用时间淘汰，默认 %(default)s")
+    parser.add_argument("--no-cache", action="store_true", help="不读取也不写入子集结果缓存")
+    parser.add_argument("--probe", action="store_true", help="只列出每个字体的名称、字形数和字符数，不生成子集")
+    parser.add_argument("--profile", action="store_true", help="输出每个字体各阶段的耗时、字节数和内存变化")
+    parser.add_argument("--trace", help="把所有字体的阶段事件写入JSON文件")
+    parser.add_argument("--watch", action="store_true",
+                        help="生成后继续监视源字体和字符文件，变化后自动重建（有分片时增量更新分片），预览页自动刷新")
+    parser.add_argument("--debounce", type=float, default=0.3,
+                        help="监视模式下合并连续变化的等待时间(秒)，默认 %(default)s")
+    parser.add_argument("-v", "--verbose", action="store_true", help="输出每个字体的详细处理日志")
+    return parser.parse_args(argv)
+
+
+def read_custom_text(args):
+    """合并命令行中的字符、字符文件和码位文件"""
+    custom_text = args.chars
+    if args.chars_file:
+        with open(args.chars_file, "r", encoding="utf-8") as f:
+            custom_text += f.read()
+    if args.codepoints_file:
+        with open(args.codepoints_file, "r", encoding="utf-8") as f:
+            custom_text += "".join(map(chr, parse_codepoints(f.read())))
+    return custom_text
+
+
+def watch_fonts(args, font_paths, output_formats, cache, fetcher):
+    """
+    监视源字体和字符文件，变化后在后台线程中重新生成
+    所有重建都在当前进程中进行，fontTools只导入一次；源字体变化只重建该字体，字符文件变化时重建全部字体
+    """
+    char_files = [os.path.abspath(path) for path in (args.chars_file, args.codepoints_file) if path]
+
+    def build(changed):
+        targets = [path for path in font_paths if path in changed]
+        if any(path in char_files for path in changed):
+            targets = font_paths
+        try:
+            custom_text = read_custom_text(args)
+        except OSError as e:
+            print(f"读取字符文件失败: {str(e)}", file=sys.stderr)
+            return
+        for font_path in targets:
+            if not os.path.isfile(font_path):
+                print(f"源字体不存在，跳过: {font_path}", file=sys.stderr)
+                continue
+            start = time.perf_counter()
+            _, success, message, logs, events, _ = convert_one(
+                font_path, args.url, custom_text, output_formats, get_output_dir(font_path, args.output),
+                args.parallel_encode, cache, fetcher, args.mmap, args.slices, True, args.lite_preview,
+                args.size_budget * 1024, args.budget_format, True, args.subset_profile, args.site_dirs,
+                args.instances, args.outline_mode
+            )
+            state = "完成" if success else "失败"
+            print(f"[{time.strftime('%H:%M:%S')}] {state}: {os.path.basename(font_path)} "
+                  f"({time.perf_counter() - start:.2f}s)")
+            if args.verbose or not success:
+                for line in logs:
+                    print(f"    {line}")
+                print(f"    {message}")
+            if args.profile:
+                for event in events:
+                    print(f"    {format_event(event)}")
+
+    worker = RebuildWorker(build).start()
+    worker.request(font_paths)
+    watcher = FileWatcher(font_paths + char_files, worker.request, debounce=args.debounce).start()
+    print(f"监视 {len(watcher.paths)} 个文件 ({watcher.backend.name})，按 Ctrl+C 退出")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("停止监视")
+    finally:
+        watcher.stop()
+        worker.stop()
+    return 0
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    stdout = sys.stdout
+    if args.bundle == "-":
+        # 标准输出用于归档数据，任何输出之前先把其余输出改到标准错误
+        sys.stdout = sys.stderr
+
+    output_formats = [fmt.strip().upper() for fmt in args.formats.split(",") if fmt.strip()]
+    if not output_formats:
+        print("请至少选择一种输出格式。", file=sys.stderr)
+        return 2
+
+    custom_text = read_custom_text(args)
+
+    if args.incremental and not args.slices:
+        print("注意：--incremental-slices 只对分片生效，没有指定 --slices 时不起作用。", file=sys.stderr)
+
+    for spec in args.instances or []:
+        try:
+            parse_instance_spec(spec)
+        except ValueError as e:
+            print(str(e), file=sys.stderr)
+            return 2
+
+    font_paths = collect_fonts(args.inputs)
+    if not font_paths:
+        print("没有找到任何字体源文件。", file=sys.stderr)
+        return 2
+
+    cache = None
+    if not args.no_cache:
+        cache = SubsetCache(args.cache_dir, args.cache_size * 1024 * 1024)
+
+    if args.probe:
+        return probe_fonts(font_paths, args.jobs)
+
+    # 常用字列表只在主进程下载一次，子进程以离线模式读取本地副本
+    fetcher = CharListFetcher(offline=args.offline)
+    if args.url:
+        try:
+            url_content, source = fetcher.fetch(args.url)
+            print(f"常用字列表: {len(text_to_codepoints(url_content))} 个不重复字符 ({source})")
+        except Exception as e:
+            print(f"从URL下载失败，且没有可用的本地副本: {str(e)}", file=sys.stderr)
+            return 2
+    worker_fetcher = CharListFetcher(fetcher.cache_dir, offline=True)
+
+    # 网站内容只在主进程扫描一次，各字体的子进程读取扫描缓存，不会再重新读取文件
+    if args.site_dirs:
+        missing = [path for path in args.site_dirs if not os.path.isdir(path)]
+        if missing:
+            print(f"网站内容目录不存在: {', '.join(missing)}", file=sys.stderr)
+            return 2
+        start = time.perf_counter()
+        frequencies, stats = scan_site(args.site_dirs, max_workers=args.jobs)
+        print(f"网站内容: {stats['files']} 个文件，重新读取 {stats['read']} 个，"
+              f"{len(frequencies)} 个不重复字符 ({time.perf_counter() - start:.2f}s)")
+
+    if args.watch:
+        if args.bundle:
+            print("监视模式不能与 --bundle 同时使用。", file=sys.stderr)
+            return 2
+        return watch_fonts(args, font_paths, output_formats, cache, worker_fetcher)
+
+    archive = None
+    if args.bundle:
+        try:
+            archive = ArchiveOutput(args.bundle, args.bundle_format or ("zip" if args.bundle == "-" else None), stdout)
+        except (ValueError, OSError) as e:
+            print(f"无法创建归档: {str(e)}", file=sys.stderr)
+            return 2
+
+    jobs = max(1, min(args.jobs, len(font_paths)))
+    print(f"共 {len(font_paths)} 个字体，使用 {jobs} 个进程处理")
+
+    failed = 0
+    trace = []
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [
+            executor.submit(
+                convert_one,
+                font_path,
+                args.url,
+                custom_text,
+                output_formats,
+                get_output_dir(font_path, args.output),
+                args.parallel_encode,
+                cache,
+                worker_fetcher,
+                args.mmap,
+                args.slices,
+                args.incremental,
+                args.lite_preview,
+                args.size_budget * 1024,
+                args.budget_format,
+                False,
+                args.subset_profile,
+                args.site_dirs,
+                args.instances,
+                args.outline_mode,
+                archive is not None,
+                # 多个字体同时处理时，字体内部不再开多个进程
+                1 if jobs > 1 else None
+            )
+            for font_path in font_paths
+        ]
+        for done, future in enumerate(as_completed(futures), 1):
+            font_path, success, message, logs, events, files = future.result()
+            if files:
+                # 每个字体完成后立即写入归档，不需要等待其他字体
+                base_filename = os.path.splitext(os.path.basename(font_path))[0]
+                for name, data in files:
+                    archive.write(f"{base_filename}/{name}", data)
+            trace.append({"font": font_path, "success": success, "events": events})
+            if not success:
+                failed += 1
+            state = "完成" if success else "失败"
+            print(f"[{done}/{len(font_paths)}] {state}: {os.path.basename(font_path)}")
+            if args.verbose or not success:
+                for line in logs:
+                    print(f"    {line}")
+                print(f"    {message}")
+            if args.profile:
+                for event in events:
+                    print(f"    {format_event(event)}")
+
+    if archive:
+        archive.close()
+        print(f"结果已写入归档: {archive.location}")
+    if args.trace:
+        with open(args.trace, "w", encoding="utf-8") as f:
+            json.dump(trace, f, ensure_ascii=False, indent=2)
+        print(f"阶段事件已写入 {args.trace}")
+    print(f"处理结束: 成功 {len(font_paths) - failed} 个，失败 {failed} 个")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,1616 @@
+import os
+import glob
+import mmap
+import time
+import threading
+from io import BytesIO
+from html import escape as html_escape
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from subset_cache import file_digest, options_fingerprint
+from charset import CharListFetcher, text_to_codepoints, text_to_ordered_codepoints, format_codepoints
+from metrics import peak_rss, format_size, StageRecorder
+from manifest import load_manifest, save_manifest, diff_codepoints
+from progress import ProgressTracker, SubsetLogProgress, ConversionCancelled
+from profiles import make_options, record_profile_result, DEFAULT_PROFILE, SUBSET_PROFILES
+from glyph_coverage import build_coverage_report, save_coverage_report, format_codepoints_preview
+from bundle import DirectoryOutput
+from site_chars import scan_site, frequency_order, save_frequency_table
+from outlines import OUTLINE_MODES, DEFAULT_OUTLINE_MODE, save_outline_report
+
+# fontTools的子集化模块和requests导入较慢，统一推迟到第一次使用时再导入，
+# 界面和命令行启动时只需要加载本模块
+
+# 默认的常用字列表(3500常用字)
+DEFAULT_CHARS_URL = "https://raw.githubusercontent.com/shinchanZ/-3500-/master/3500"
+
+# 支持读取的字体源文件扩展名
+FONT_EXTENSIONS = (".ttf", ".otf", ".woff", ".woff2")
+
+# 输出格式对应的fontTools flavor，None表示不压缩的sfnt数据
+FLAVOR_MAP = {
+    "TTF": None,
+    "OTF": None,
+    "WOFF": "woff",
+    "WOFF2": "woff2"
+}
+
+# 预览页中不同字号测试使用的文字
+SIZE_TEST_TEXT = "你好世界 Hello World 0123456789"
+
+# 生成内嵌预览字体时优先读取的输出格式，未压缩的格式不需要解码
+INSPECT_FORMAT_ORDER = ["TTF", "OTF", "WOFF", "WOFF2"]
+
+# 轻量预览页中按需加载字体的脚本，点击按钮后才通过FontFace下载对应的字体
+LAZY_FONT_SCRIPT = """
+    <script>
+        document.querySelectorAll('button.load-font').forEach(function (button) {
+            button.addEventListener('click', function () {
+                var family = button.dataset.family;
+                button.disabled = true;
+                button.textContent = '加载中...';
+                new FontFace(family, button.dataset.src).load().then(function (face) {
+                    document.fonts.add(face);
+                    document.querySelectorAll('button.load-font').forEach(function (other) {
+                        if (other.dataset.family === family) {
+                            other.disabled = true;
+                            other.textContent = '已加载';
+                        }
+                    });
+                }, function () {
+                    button.disabled = false;
+                    button.textContent = '加载失败，点击重试';
+                });
+            });
+        });
+    </script>"""
+
+# 监视模式下预览页自动刷新的脚本；file://页面不能用fetch读取本地文件，
+# 改为定时重新加载build-stamp.js，其中的构建时间与页面生成时不同就刷新页面
+AUTO_REFRESH_SCRIPT = """
+    <script>
+        setInterval(function () {
+            var script = document.createElement('script');
+            script.src = './build-stamp.js?' + Date.now();
+            script.onload = function () {
+                script.remove();
+                if (window.buildStamp && window.buildStamp !== '%s') {
+                    location.reload();
+                }
+            };
+            script.onerror = function () {
+                script.remove();
+            };
+            document.head.appendChild(script);
+        }, 1000);
+    </script>"""
+
+BUILD_STAMP_FILENAME = "build-stamp.js"
+
+
+def encode_font_data(ttf_data, flavor):
+    """
+    从内存中的TTF数据生成指定flavor的字体数据
+    字体以未解析状态打开，WOFF直接复制原始表数据，不会重新解析和编译整个字体
+    """
+    if not flavor:
+        return ttf_data
+    from fontTools.ttLib import TTFont
+    font = TTFont(BytesIO(ttf_data))
+    font.flavor = flavor
+    buffer = BytesIO()
+    font.save(buffer)
+    font.close()
+    return buffer.getvalue()
+
+
+def encode_output_format(ttf_data, output_format, outline=None):
+    """
+    按输出格式编码一份子集字体数据，供子集化服务、实例和基准测试使用
+    TTF/OTF先转换为格式对应的轮廓（转换得到的OTF再提取子程序），WOFF/WOFF2使用outline指定的轮廓，为None时保持不变
+    无法转换时（如可变字体）保持原来的轮廓
+    """
+    from outlines import FORMAT_OUTLINES, convert_outline, subroutinize_data
+    outline = FORMAT_OUTLINES.get(output_format, outline)
+    if outline:
+        try:
+            converted = convert_outline(ttf_data, outline)
+        except Exception:
+            converted = ttf_data
+        if output_format == "OTF" and converted is not ttf_data:
+            try:
+                converted = subroutinize_data(converted)
+            except Exception:
+                pass
+        ttf_data = converted
+    return encode_font_data(ttf_data, FLAVOR_MAP[output_format])
+
+
+def encode_smallest(ttf_data, output_format, outline_mode=DEFAULT_OUTLINE_MODE):
+    """
+    与write_outputs相同地按轮廓模式编码一种输出格式，几种轮廓都编码时返回最小的结果
+    体积预算的试编码用它测量，报告的大小与最终输出一致
+    """
+    from outlines import sfnt_outline, mode_outlines
+    return min(
+        (encode_output_format(ttf_data, output_format, outline)
+         for outline in mode_outlines(output_format, sfnt_outline(ttf_data), outline_mode)),
+        key=len
+    )
+
+
+def timed_encode_font_data(ttf_data, flavor):
+    """在子进程中编码并计时，返回(字体数据, 耗时秒数, 子进程峰值内存)"""
+    start = time.perf_counter()
+    data = encode_font_data(ttf_data, flavor)
+    return data, time.perf_counter() - start, peak_rss()
+
+
+def open_font(font_path, use_mmap=False):
+    """
+    以lazy模式打开源字体，表和字形在子集化时按需解析（与fontTools.subset的命令行一致）
+    use_mmap为True时通过内存映射读取，表数据按需从映射的页面读出，不经过Python的文件缓冲
+    """
+    from fontTools.ttLib import TTFont
+    if not use_mmap:
+        return TTFont(font_path, lazy=True)
+    with open(font_path, "rb") as f:
+        # mmap持有自己的文件句柄，原文件对象可以直接关闭，TTFont.close()时会关闭映射
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return TTFont(mapped, lazy=True)
+
+
+def read_font_names(font, fallback_name):
+    """获取字体名称信息用于HTML展示，只解析name表，返回(字体族名, 完整名称)"""
+    font_name = font.get("name")
+    family_name = ""
+    full_name = ""
+    
+    for record in font_name.names if font_name else []:
+        if record.nameID == 1 and not family_name:  # Family name
+            if b'\000' in record.string:
+                family_name = record.string.decode('utf-16-be')
+            else:
+                family_name = record.string.decode('latin1')
+        if record.nameID == 4 and not full_name:  # Full name
+            if b'\000' in record.string:
+                full_name = record.string.decode('utf-16-be')
+            else:
+                full_name = record.string.decode('latin1')
+                
+    if not family_name:
+        family_name = fallback_name
+    if not full_name:
+        full_name = family_name
+    return family_name, full_name
+
+
+def probe_font(font_path):
+    """
+    快速读取字体的基本信息，用于界面展示和批量扫描
+    以lazy模式打开，只解析name、maxp和cmap表，不加载字形数据
+    """
+    from fontTools.ttLib import TTFont
+    font = TTFont(font_path, lazy=True)
+    try:
+        family_name, full_name = read_font_names(font, os.path.basename(font_path))
+        cmap = font.getBestCmap() or {}
+        return {
+            'path': font_path,
+            'family_name': family_name,
+            'full_name': full_name,
+            'num_glyphs': font['maxp'].numGlyphs,
+            'num_chars': len(cmap),
+            'outline': 'CFF' if 'CFF ' in font or 'CFF2' in font else 'TrueType',
+            'variable': 'fvar' in font,
+            'file_size': os.path.getsize(font_path)
+        }
+    finally:
+        font.close()
+
+
+def build_preview_font(font_source, preview_text):
+    """
+    从生成的子集字体中提取预览页用到的字符，生成可以内嵌为data URI的小字体
+    font_source: 子集字体的文件路径或内存中的数据
+    返回data URI字符串
+    """
+    import base64
+    from fontTools.ttLib import TTFont
+    from fontTools.subset import Subsetter, Options
+    font = TTFont(BytesIO(font_source) if isinstance(font_source, bytes) else font_source)
+    try:
+        cmap = font.getBestCmap() or {}
+        try:
+            import brotli  # noqa: F401
+            flavor, mime = "woff2", "font/woff2"
+        except ImportError:
+            flavor, mime = "woff", "font/woff"
+        subsetter = Subsetter(options=Options())
+        subsetter.populate(unicodes=[cp for cp in text_to_codepoints(preview_text) if cp in cmap])
+        subsetter.subset(font)
+        font.flavor = flavor
+        buffer = BytesIO()
+        font.save(buffer)
+        return f"data:{mime};base64,{base64.b64encode(buffer.getvalue()).decode('ascii')}"
+    finally:
+        font.close()
+
+
+def format_budget_result(result):
+    """把体积预算的查找结果格式化为一行说明"""
+    return (f"体积预算 {format_size(result['budget'])}: 保留前 {result['cutoff']}/{result['total']} 个字符，"
+            f"{result['format']} 大小 {format_size(result['size'])}")
+
+
+def format_saving(size, reference):
+    """与可变字体的同格式子集相比的大小变化，没有可比较的大小时返回空字符串"""
+    if not reference:
+        return ""
+    ratio = 1 - size / reference
+    if ratio >= 0:
+        return f"（比可变字体小 {ratio:.1%}）"
+    return f"（比可变字体大 {-ratio:.1%}）"
+
+
+def format_font_info(info):
+    """把probe_font的结果格式化为一行简短的说明"""
+    text = f"{info['full_name']} · {info['num_glyphs']} 个字形 · {info['num_chars']} 个字符 · {info['outline']}"
+    if info['variable']:
+        text += " · 可变字体"
+    return text
+
+
+def collect_fonts(inputs):
+    """根据目录或通配符收集字体源文件，结果去重并排序"""
+    font_paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = [os.path.join(item, name) for name in os.listdir(item)]
+        else:
+            candidates = glob.glob(item)
+        for path in candidates:
+            if os.path.isfile(path) and path.lower().endswith(FONT_EXTENSIONS):
+                font_paths.append(os.path.abspath(path))
+    return sorted(set(font_paths))
+
+
+def get_output_dir(font_path, output_root):
+    """每个字体单独一个结果目录，避免同一目录下的多个字体互相覆盖index.html"""
+    base_filename = os.path.splitext(os.path.basename(font_path))[0]
+    if output_root:
+        return os.path.join(os.path.abspath(output_root), base_filename)
+    return os.path.join(os.path.dirname(font_path), "result", base_filename)
+
+
+class FontConverter:
+    """
+    字体子集化与格式转换流程，不依赖PyQt5，可在GUI线程或批处理进程中使用
+
+    input_font_path: 字体源文件路径
+    url_text: 常用字列表URL
+    custom_text: 自定义字符
+    output_formats: 要输出的格式列表
+    status_callback: 状态回调，接收一个字符串
+    progress_callback: 进度回调，接收0-100的整数
+    output_dir: 输出目录，默认为源文件同级的result目录
+    parallel_encode: 是否在子进程中并行压缩WOFF/WOFF2
+    cache: 子集结果缓存(SubsetCache)，为None时不使用缓存
+    fetcher: 常用字列表下载器(CharListFetcher)，为None时使用默认设置
+    use_mmap: 是否通过内存映射读取源字体，适合很大的字体文件
+    slice_count: 按unicode-range分片的数量，0表示不分片
+    incremental: 字符只增不减时保留上次的分片，新增字符并入最后一个分片重新生成；只影响分片，主字体的各格式总是完整生成
+    event_callback: 阶段事件回调，每个阶段结束时接收一个包含耗时、字节数和内存变化的字典
+    lite_preview: 生成轻量预览页，只内嵌一个预览用的小字体，原始字体和各格式的子集点击后才加载
+    size_budget: 体积预算（字节），大于0时把字符列表视为按使用频率排序，只保留不超过预算的最多的前N个字符
+    budget_format: 体积预算针对的输出格式
+    auto_refresh: 预览页在结果重新生成后自动刷新，用于监视模式
+    subset_profile: 子集化选项预设的名称，见profiles.SUBSET_PROFILES
+    outline_mode: WOFF/WOFF2使用的轮廓格式，见outlines.OUTLINE_MODES；TTF总是TrueType轮廓，OTF总是CFF轮廓
+    instances: 可变字体实例说明列表，例如["wght=400", "wght=700"]或["wght=300:700"]，见instancing.parse_instance_spec；
+               每个实例固定或缩小可变字体的轴后再子集化，并行生成各输出格式，源字体不是可变字体时跳过
+    site_dirs: 网站内容目录列表，扫描其中HTML/JSON/Markdown/JS文件实际用到的字符，按出现次数排在字符列表最前面
+    bundle: 归档输出(bundle.ArchiveOutput或MemoryOutput)，传入时所有文件直接写入归档，不创建结果目录，
+            也没有上次的清单可用于增量更新
+    max_workers: 体积预算、分片和可变字体实例各自的进程池大小，为None时使用CPU核心数；
+                 批处理中同时处理多个字体时传1，避免每个字体都再占满全部核心
+    """
+
+    def __init__(self, input_font_path, url_text, custom_text, output_formats,
+                 status_callback=None, progress_callback=None, output_dir=None,
+                 parallel_encode=False, cache=None, fetcher=None, use_mmap=False,
+                 slice_count=0, incremental=False, event_callback=None, lite_preview=False,
+                 size_budget=0, budget_format="WOFF2", auto_refresh=False, subset_profile=DEFAULT_PROFILE,
+                 outline_mode=DEFAULT_OUTLINE_MODE, instances=None, site_dirs=None, bundle=None,
+                 max_workers=None):
+        self.input_font_path = input_font_path
+        self.url_text = url_text
+        self.custom_text = custom_text
+        self.output_formats = output_formats
+        self.status_callback = status_callback
+        self.progress_callback = progress_callback
+        self.output_dir = output_dir
+        self.parallel_encode = parallel_encode
+        self.cache = cache
+        self.fetcher = fetcher
+        self.use_mmap = use_mmap
+        self.slice_count = slice_count
+        self.incremental = incremental
+        self.lite_preview = lite_preview
+        self.size_budget = size_budget
+        self.budget_format = budget_format
+        self.budget_result = None
+        self.auto_refresh = auto_refresh
+        self.subset_profile = subset_profile
+        self.outline_mode = outline_mode
+        self.outline_report = None
+        self.instances = instances
+        self.site_dirs = site_dirs
+        self.max_workers = max_workers
+        self.bundle = bundle
+        self.build_stamp = None
+        self.recorder = StageRecorder(event_callback)
+        self.progress = ProgressTracker(self.emit_progress)
+        self.cancel_event = threading.Event()
+
+    def emit_status(self, message):
+        if self.status_callback:
+            self.status_callback(message)
+
+    def emit_progress(self, value):
+        if self.progress_callback:
+            self.progress_callback(value)
+
+    def cancel(self):
+        """请求取消转换，会在当前阶段结束或子集化的下一步时生效"""
+        self.cancel_event.set()
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise ConversionCancelled()
+
+    @contextmanager
+    def stage(self, name, bytes_in=None):
+        """执行一个阶段：开始前检查是否已取消，同时记录阶段事件并推进进度"""
+        self.check_cancelled()
+        self.progress.begin(name)
+        try:
+            with self.recorder.stage(name, bytes_in) as event:
+                yield event
+        finally:
+            self.progress.end()
+
+    @property
+    def events(self):
+        """本次运行记录的所有阶段事件"""
+        return self.recorder.events
+
+    def run(self):
+        from fontTools.subset import Subsetter
+        from sharding import build_slices
+        from instancing import parse_instance_spec, build_instances
+        try:
+            # 创建结果目录；写入归档时不经过结果目录
+            if self.bundle is not None:
+                output = self.bundle
+            else:
+                input_dir = os.path.dirname(self.input_font_path)
+                output = DirectoryOutput(self.output_dir or os.path.join(input_dir, "result"))
+            result_dir = output.result_dir
+            self.result_dir = result_dir
+            
+            base_filename = os.path.splitext(os.path.basename(self.input_font_path))[0]
+            
+            # 上次运行的清单中记录了各阶段的耗时，用来按实际开销分配进度
+            previous_manifest = load_manifest(result_dir, base_filename) if result_dir else None
+            self.progress = ProgressTracker(
+                self.emit_progress,
+                previous_manifest.get('stage_seconds') if previous_manifest else None
+            )
+            encode_stages = [f"encode:{fmt}" for fmt in self.output_formats if fmt in FLAVOR_MAP]
+            tail_stages = (["instances"] if self.instances else []) + (["slices"] if self.slice_count else []) + ["html"]
+            self.progress.replan(
+                (["fetch"] if self.url_text else [])
+                + (["scan"] if self.site_dirs else [])
+                + (["budget"] if self.size_budget else [])
+                + ["digest", "load", "coverage", "populate", "subset", "save"]
+                + encode_stages + tail_stages
+            )
+            
+            url_content = ""
+            if self.url_text:
+                self.emit_status("从URL下载字符...")
+                fetcher = self.fetcher or CharListFetcher()
+                with self.stage("fetch") as event:
+                    try:
+                        url_content, source = fetcher.fetch(self.url_text)
+                    except Exception as e:
+                        raise RuntimeError(f"从URL下载失败，且没有可用的本地副本: {str(e)}")
+                    event["bytes_out"] = len(url_content.encode("utf-8"))
+                    event["source"] = source
+                url_count = len(text_to_codepoints(url_content))
+                if source == "network":
+                    self.emit_status(f"从URL下载了 {url_count} 个字符")
+                elif source == "not-modified":
+                    self.emit_status(f"URL内容未变化，使用本地副本的 {url_count} 个字符")
+                else:
+                    self.emit_status(f"使用上次下载的本地副本，共 {url_count} 个字符")
+            
+            # 网站实际用到的字符按出现次数排在最前面，体积预算和分片都优先保留它们
+            site_content = ""
+            if self.site_dirs:
+                self.emit_status("扫描网站内容中的字符...")
+                with self.stage("scan") as event:
+                    frequencies, scan_stats = scan_site(
+                        self.site_dirs,
+                        status_callback=self.emit_status,
+                        progress_callback=lambda done, total: self.progress.update(done / total),
+                        cancel_event=self.cancel_event
+                    )
+                    event.update(scan_stats)
+                site_content = "".join(map(chr, frequency_order(frequencies)))
+                save_frequency_table(output, base_filename, frequencies, scan_stats)
+                self.emit_status(f"网站内容中共有 {len(frequencies)} 个不重复字符"
+                                 f"（{scan_stats['files']} 个文件，重新读取 {scan_stats['read']} 个）")
+            
+            codepoints = text_to_codepoints(site_content, url_content, self.custom_text)
+            ordered_codepoints = text_to_ordered_codepoints(site_content, url_content, self.custom_text)
+            if self.size_budget and ordered_codepoints:
+                ordered_codepoints = self.apply_size_budget(ordered_codepoints)
+                codepoints = sorted(ordered_codepoints)
+            if not codepoints:
+                self.emit_status("警告: 没有提供字符用于子集化")
+            else:
+                self.emit_status(f"使用 {len(codepoints)} 个不重复字符进行子集化")
+            
+            options = make_options(self.subset_profile)
+            if self.subset_profile != DEFAULT_PROFILE:
+                self.emit_status(f"子集化选项预设: {self.subset_profile} ({SUBSET_PROFILES[self.subset_profile][0]})")
+            if self.outline_mode != DEFAULT_OUTLINE_MODE:
+                self.emit_status(f"WOFF/WOFF2轮廓: {self.outline_mode} ({OUTLINE_MODES[self.outline_mode][0]})")
+            
+            # 保存本次使用的码位集合，可通过命令行的 --codepoints-file 复用
+            if codepoints:
+                output.write(f"{base_filename}-codepoints.txt", format_codepoints(codepoints))
+            
+            # 格式扩展名映射
+            extension_map = {
+                "TTF": ".ttf",
+                "OTF": ".otf",
+                "WOFF": ".woff",
+                "WOFF2": ".woff2",
+                "SVG": ".svg",
+                "EOT": ".eot"
+            }
+            
+            # 源字体、字符集和选项都没有变化时，直接使用缓存的结果
+            font_size = os.path.getsize(self.input_font_path)
+            with self.stage("digest", font_size):
+                font_digest = file_digest(self.input_font_path)
+            options_key = options_fingerprint(options)
+            
+            # 与上次运行的清单对比，源字体和选项不变时可以增量更新分片；主字体总是完整地重新子集化
+            manifest = None
+            if self.incremental and self.slice_count:
+                manifest = previous_manifest
+                if manifest and (manifest.get('font_digest') != font_digest or manifest.get('options') != options_key):
+                    manifest = None
+                if manifest:
+                    added, removed = diff_codepoints(manifest['codepoints'], codepoints)
+                    self.emit_status(f"与上次相比新增 {len(added)} 个字符，删除 {len(removed)} 个字符")
+            
+            cache_key = None
+            cached = None
+            if self.cache:
+                cache_key = self.cache.make_key(font_digest, codepoints, options, self.outline_mode)
+                cached = self.cache.lookup(cache_key, [fmt for fmt in self.output_formats if fmt in FLAVOR_MAP])
+            
+            ttf_data = None
+            if cached:
+                self.emit_status("命中缓存，复用已生成的字体文件...")
+                meta, cached_files = cached
+                family_name = meta["family_name"]
+                full_name = meta["full_name"]
+                coverage = meta.get("coverage")
+                self.outline_report = meta.get("outlines")
+                self.progress.replan(["cache"] + ([] if coverage else ["coverage"]) + tail_stages)
+                saved_files = []
+                font_files = []
+                with self.stage("cache") as event:
+                    for output_format in self.output_formats:
+                        if output_format not in cached_files:
+                            continue
+                        output_filename = f"{base_filename}-subset{extension_map[output_format]}"
+                        saved_files.append(output.add_file(output_filename, cached_files[output_format]))
+                        font_files.append({
+                            'format': output_format,
+                            'path': output_filename,
+                            'rel_path': f"./{output_filename}",
+                            'size': os.path.getsize(cached_files[output_format])
+                        })
+                    event["bytes_out"] = sum(font_file['size'] for font_file in font_files)
+                if not coverage:
+                    # 旧版本写入的缓存没有覆盖报告，只读取源字体的cmap补上
+                    with self.stage("coverage"):
+                        font = open_font(self.input_font_path, self.use_mmap)
+                        try:
+                            coverage = build_coverage_report(font.getBestCmap() or {}, codepoints, font['maxp'].numGlyphs)
+                        finally:
+                            font.close()
+            else:
+                self.emit_status("加载字体文件...")
+                with self.stage("load", font_size):
+                    font = open_font(self.input_font_path, self.use_mmap)
+                try:
+                    family_name, full_name = read_font_names(font, os.path.basename(self.input_font_path))
+                    
+                    # 子集化前先对比cmap，子集化时不会报告缺少字形的字符
+                    with self.stage("coverage"):
+                        coverage = build_coverage_report(font.getBestCmap() or {}, codepoints, font['maxp'].numGlyphs)
+                    
+                    subsetter = Subsetter(options=options)
+                    if codepoints:
+                        with self.stage("populate") as event:
+                            subsetter.populate(unicodes=codepoints)
+                            event["codepoints"] = len(codepoints)
+                        with self.stage("subset") as event:
+                            # 每个表大约有裁剪、子集化两条INFO日志，再加上几次闭包
+                            expected_steps = 2 * len(font.keys()) + 6
+                            with SubsetLogProgress(expected_steps, self.progress.update, self.cancel_event):
+                                subsetter.subset(font)
+                            event["glyphs"] = len(font.getGlyphOrder())
+                    coverage['glyphs_after_closure'] = len(font.getGlyphOrder())
+                    
+                    # 子集字体只编译一次到内存，所有格式都从这份TTF数据派生
+                    self.emit_status("编译子集字体...")
+                    with self.stage("save") as event:
+                        if hasattr(font, 'flavor'):
+                            font.flavor = None
+                        buffer = BytesIO()
+                        font.save(buffer)
+                        ttf_data = buffer.getvalue()
+                        event["bytes_out"] = len(ttf_data)
+                finally:
+                    font.close()
+                
+                saved_files, font_files, cache_files = self.write_outputs(ttf_data, output, base_filename, extension_map)
+                
+                if cache_key and font_files:
+                    self.cache.store(
+                        cache_key,
+                        {'family_name': family_name, 'full_name': full_name, 'coverage': coverage,
+                         'outlines': self.outline_report},
+                        cache_files
+                    )
+            
+            # 记录本预设的各格式大小和耗时，便于对比不同预设
+            profile_results = record_profile_result(
+                output,
+                base_filename,
+                self.subset_profile,
+                {font_file['format']: font_file['size'] for font_file in font_files},
+                self.events
+            )
+            
+            if self.outline_report:
+                save_outline_report(output, base_filename, self.outline_report)
+            
+            coverage_file = save_coverage_report(output, base_filename, coverage)
+            if coverage['missing_count']:
+                self.emit_status(f"注意：有 {coverage['missing_count']} 个字符在字体中没有字形，详见 {os.path.basename(coverage_file)}")
+            
+            # 可变字体的实例从已经子集化的数据生成，命中缓存时才回退到源字体
+            instances = None
+            if self.instances and codepoints:
+                self.emit_status(f"生成 {len(self.instances)} 个可变字体实例...")
+                with self.stage("instances", len(ttf_data) if ttf_data else font_size) as event:
+                    instances = build_instances(
+                        ttf_data or self.input_font_path,
+                        codepoints,
+                        [parse_instance_spec(spec) for spec in self.instances],
+                        [(fmt, FLAVOR_MAP[fmt], extension_map[fmt]) for fmt in self.output_formats if fmt in FLAVOR_MAP],
+                        output,
+                        base_filename,
+                        family_name,
+                        status_callback=self.emit_status,
+                        progress_callback=lambda done, total: self.progress.update(done / total),
+                        cancel_event=self.cancel_event,
+                        profile=self.subset_profile,
+                        outline_mode=self.outline_mode,
+                        max_workers=self.max_workers
+                    )
+                    if instances:
+                        event["bytes_out"] = sum(font_file['size'] for instance in instances[1] for font_file in instance['files'])
+                if instances:
+                    variable_sizes = {font_file['format']: font_file['size'] for font_file in font_files}
+                    for instance in instances[1]:
+                        for font_file in instance['files']:
+                            saved_files.append(font_file['path'])
+                        self.emit_status(f"实例 {instance['name']}: " + "，".join(
+                            f"{font_file['format']} {format_size(font_file['size'])}"
+                            + format_saving(font_file['size'], variable_sizes.get(font_file['format']))
+                            for font_file in instance['files']
+                        ))
+                    instances = (os.path.basename(instances[0]), instances[1])
+            
+            slices = None
+            if self.slice_count and codepoints:
+                self.emit_status(f"生成 {self.slice_count} 个unicode-range分片...")
+                # 分片基于已经子集化的TTF数据，比从源字体重新加载小得多；命中缓存时才回退到源字体
+                with self.stage("slices", len(ttf_data) if ttf_data else font_size) as event:
+                    css_path, slice_files = build_slices(
+                        ttf_data or self.input_font_path,
+                        ordered_codepoints,
+                        self.slice_count,
+                        output,
+                        base_filename,
+                        family_name,
+                        max_workers=self.max_workers,
+                        status_callback=self.emit_status,
+                        progress_callback=lambda done, total: self.progress.update(done / total),
+                        cancel_event=self.cancel_event,
+                        profile=self.subset_profile,
+                        previous_slices=manifest['slices'] if manifest and manifest.get('slice_count') == self.slice_count else None
+                    )
+                    event["bytes_out"] = sum(slice_file['size'] for slice_file in slice_files)
+                slices = (os.path.basename(css_path), slice_files)
+                saved_files.extend(slice_file['path'] for slice_file in slice_files)
+            
+            # 准备生成HTML预览文件
+            self.emit_status("生成HTML预览文件...")
+            
+            # 获取相对于result目录的原始字体路径
+            original_font_rel_path = self.input_font_path
+            original_font_filename = os.path.basename(self.input_font_path)
+            
+            # 准备测试字符集
+            # 如果自定义字符为空，使用一些常见汉字进行测试
+            test_chars = self.custom_text[:100] if self.custom_text else "你好世界，这是字体瘦身工具的测试页面。中国北京上海广州深圳香港澳门台湾天津重庆成都武汉南京西安长沙杭州"
+            
+            # 添加一些数字和英文字符用于测试
+            test_extra = "0123456789 abcdefghijklmnopqrstuvwxyz ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+            
+            # 生成HTML文件
+            self.build_stamp = str(time.time_ns())
+            with self.stage("html") as event:
+                preview_font = None
+                inspect_files = sorted(
+                    (font_file for font_file in font_files if font_file['format'] in INSPECT_FORMAT_ORDER),
+                    key=lambda font_file: INSPECT_FORMAT_ORDER.index(font_file['format'])
+                )
+                if self.lite_preview and inspect_files:
+                    try:
+                        # 子集字体的TTF数据还在内存中时直接使用，命中缓存时读取缓存的文件
+                        preview_font = build_preview_font(
+                            ttf_data or cached_files[inspect_files[0]['format']],
+                            test_chars + test_extra + SIZE_TEST_TEXT + "0123456789px: "
+                        )
+                    except Exception as e:
+                        self.emit_status(f"生成内嵌预览字体失败: {str(e)}")
+                html_content = self.generate_html_preview(
+                    family_name, 
+                    full_name,
+                    original_font_filename,
+                    original_font_rel_path,
+                    font_files,
+                    test_chars,
+                    test_extra,
+                    slices,
+                    coverage,
+                    preview_font,
+                    profile_results,
+                    instances,
+                    self.outline_report
+                )
+                
+                html_path = output.write("index.html", html_content)
+                if self.auto_refresh:
+                    # 页面写完后再更新构建时间，已打开的页面刷新时读到的是新页面
+                    output.write(BUILD_STAMP_FILENAME, f"window.buildStamp = '{self.build_stamp}';\n")
+                event["bytes_out"] = len(html_content.encode("utf-8"))
+            
+            # 清单只用于下次在同一结果目录中增量更新，写入归档时不需要
+            if result_dir:
+                save_manifest(
+                    result_dir,
+                    base_filename,
+                    font_digest,
+                    options_key,
+                    codepoints,
+                    self.slice_count,
+                    slices[1] if slices else None,
+                    {event['stage']: event['seconds'] for event in self.events if event.get('seconds')}
+                )
+            
+            self.progress.finish()
+            self.emit_status(f"进程峰值内存: {format_size(peak_rss())}")
+            
+            if saved_files:
+                result_message = f"成功生成 {len(saved_files)} 个字体文件到 {output.location}\n预览文件: {html_path}"
+                if self.budget_result:
+                    result_message += f"\n{format_budget_result(self.budget_result)}"
+                return True, result_message
+            else:
+                return False, "没有成功生成任何字体文件"
+            
+        except ConversionCancelled:
+            self.progress.stop_ticker()
+            self.emit_status("已取消")
+            return False, "已取消"
+        except Exception as e:
+            self.emit_status(f"错误: {str(e)}")
+            return False, str(e)
+    
+    def apply_size_budget(self, ordered_codepoints):
+        """
+        在按使用频率排序的字符列表中查找不超过体积预算的最大前缀，返回截断后的字符列表
+        源字体只加载一次并预先裁剪到全部候选字符，并行试编码都从这份数据开始
+        """
+        from size_budget import prepare_budget_font, find_budget_cutoff
+        self.emit_status(f"查找不超过 {format_size(self.size_budget)} 的 {self.budget_format} 字符集...")
+        with self.stage("budget", os.path.getsize(self.input_font_path)) as event:
+            font = open_font(self.input_font_path, self.use_mmap)
+            try:
+                font_data = prepare_budget_font(font, ordered_codepoints, self.subset_profile)
+            finally:
+                font.close()
+            cutoff, size = find_budget_cutoff(
+                font_data,
+                ordered_codepoints,
+                self.size_budget,
+                self.budget_format,
+                max_workers=self.max_workers or os.cpu_count(),
+                status_callback=self.emit_status,
+                progress_callback=lambda done, total: self.progress.update(done / total),
+                cancel_event=self.cancel_event,
+                profile=self.subset_profile,
+                outline_mode=self.outline_mode
+            )
+            self.budget_result = {
+                'budget': self.size_budget,
+                'format': self.budget_format,
+                'cutoff': cutoff,
+                'total': len(ordered_codepoints),
+                'size': size
+            }
+            event.update(self.budget_result)
+            event["bytes_out"] = size
+        self.emit_status(format_budget_result(self.budget_result))
+        if not cutoff:
+            raise RuntimeError(f"体积预算 {format_size(self.size_budget)} 太小，一个字符都放不下")
+        return ordered_codepoints[:cutoff]
+    
+    def write_outputs(self, ttf_data, output, base_filename, extension_map):
+        """
+        将子集字体数据编码为各输出格式并写入结果目录或归档
+        TTF输出TrueType轮廓、OTF输出CFF轮廓，与子集字体的轮廓不同时先转换；WOFF/WOFF2的轮廓按outline_mode选择
+        返回(已保存的文件位置列表, 用于生成HTML的字体文件信息列表, 用于放入缓存的{格式: 文件路径或(文件名, 数据)})
+        """
+        saved_files = []
+        # 保存字体文件信息用于生成HTML
+        font_files = []
+        cache_files = {}
+        
+        encode_formats = []
+        for output_format in self.output_formats:
+            if output_format == "SVG":
+                self.emit_status(f"注意：暂不支持SVG格式，跳过。")
+            elif output_format == "EOT":
+                self.emit_status(f"注意：EOT格式需要额外工具支持，如ttf2eot。此处跳过。")
+            else:
+                encode_formats.append(output_format)
+        
+        if not encode_formats:
+            return saved_files, font_files, cache_files
+        
+        def save_output(output_format, data):
+            output_filename = f"{base_filename}-subset{extension_map[output_format]}"
+            saved_files.append(output.write(output_filename, data))
+            font_files.append({
+                'format': output_format,
+                'path': output_filename,
+                'rel_path': f"./{output_filename}",
+                'size': len(data)
+            })
+            if self.cache:
+                # 结果目录中的文件可以硬链接进缓存，写入归档时只能把数据交给缓存
+                cache_files[output_format] = saved_files[-1] if output.result_dir else (output_filename, data)
+        
+        def report_failure(output_format, e):
+            self.emit_status(f"转换 {output_format} 格式失败: {str(e)}")
+            if output_format == "WOFF2":
+                self.emit_status("WOFF2转换需要安装brotli模块，请运行: pip install brotli")
+        
+        jobs = self.plan_outlines(ttf_data, encode_formats)
+        # 每种格式的编码结果 {格式: {轮廓: 字体数据}}，这种格式的轮廓都编码完后保留较小的一个
+        pending_outlines = {fmt: [outline for job_fmt, outline, _ in jobs if job_fmt == fmt] for fmt in encode_formats}
+        results = {fmt: {} for fmt in encode_formats}
+        
+        def finish_job(output_format, outline, data, seconds):
+            self.outline_report['results'].append({
+                'format': output_format,
+                'outline': outline,
+                'size': len(data) if data is not None else None,
+                'seconds': round(seconds, 6) if seconds is not None else None,
+                'selected': False
+            })
+            if data is not None:
+                results[output_format][outline] = data
+            pending_outlines[output_format].remove(outline)
+            if pending_outlines[output_format] or not results[output_format]:
+                return
+            selected = min(results[output_format], key=lambda name: len(results[output_format][name]))
+            for result in self.outline_report['results']:
+                if result['format'] == output_format and result['outline'] == selected:
+                    result['selected'] = True
+            if len(results[output_format]) > 1:
+                self.emit_status(f"{output_format} 选用 {selected} 轮廓: " + "，".join(
+                    f"{name} {format_size(len(data))}" for name, data in results[output_format].items()
+                ))
+            save_output(output_format, results[output_format].pop(selected))
+            results[output_format].clear()
+        
+        def stage_name(output_format, outline):
+            return self.encode_stage(output_format, outline, jobs)
+        
+        # TTF和OTF不需要压缩，直接写入；WOFF/WOFF2按需放到子进程中并行压缩
+        compress_jobs = [job for job in jobs if FLAVOR_MAP[job[0]]]
+        if self.parallel_encode and len(compress_jobs) > 1:
+            self.emit_status(f"并行转换 {', '.join(dict.fromkeys(fmt for fmt, _, _ in compress_jobs))} 格式...")
+            with ProcessPoolExecutor(max_workers=len(compress_jobs)) as executor:
+                futures = {
+                    executor.submit(timed_encode_font_data, data, FLAVOR_MAP[fmt]): (fmt, outline, data)
+                    for fmt, outline, data in compress_jobs
+                }
+                for fmt, outline, data in jobs:
+                    if not FLAVOR_MAP[fmt]:
+                        finish_job(fmt, outline, data, 0.0)
+                        self.progress.complete(stage_name(fmt, outline))
+                pending = set(futures)
+                while pending:
+                    # 定时醒来检查取消；已经在子进程中运行的压缩无法中断，只能丢弃结果
+                    finished, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                    if self.cancel_event.is_set():
+                        for future in pending:
+                            future.cancel()
+                        raise ConversionCancelled()
+                    for future in finished:
+                        fmt, outline, data = futures[future]
+                        self.record_encode_result(future, fmt, outline, stage_name(fmt, outline), data,
+                                                  finish_job, report_failure)
+            # 按输出格式的顺序排列，保证@font-face中src的顺序稳定
+            font_files.sort(key=lambda font_file: encode_formats.index(font_file['format']))
+            return saved_files, font_files, cache_files
+        
+        # 按计划中的轮廓数量决定是否标注轮廓，pending_outlines在编码过程中会逐个移除
+        outline_counts = {fmt: len(outlines) for fmt, outlines in pending_outlines.items()}
+        for output_format, outline, data in jobs:
+            self.emit_status(f"转换为 {output_format} 格式" + (f" ({outline}轮廓)..." if outline_counts[output_format] > 1 else "..."))
+            encoded, seconds = None, None
+            try:
+                with self.stage(stage_name(output_format, outline), len(data)) as event:
+                    start = time.perf_counter()
+                    encoded = encode_font_data(data, FLAVOR_MAP[output_format])
+                    seconds = time.perf_counter() - start
+                    event["bytes_out"] = len(encoded)
+            except ConversionCancelled:
+                raise
+            except Exception as e:
+                report_failure(output_format, e)
+            finish_job(output_format, outline, encoded, seconds)
+        return saved_files, font_files, cache_files
+    
+    def encode_stage(self, output_format, outline, jobs):
+        """只有一种轮廓或与子集字体轮廓相同的编码沿用encode:格式的阶段名，另一种轮廓的阶段名带上轮廓"""
+        outlines = [job[1] for job in jobs if job[0] == output_format]
+        if len(outlines) == 1 or outline == self.outline_report['source']:
+            return f"encode:{output_format}"
+        return f"encode:{output_format}:{outline}"
+    
+    def plan_outlines(self, ttf_data, encode_formats):
+        """
+        准备各输出格式需要的轮廓数据，轮廓转换和OTF的子程序提取都记录为单独的阶段
+        返回[(输出格式, 轮廓, sfnt数据)]；轮廓转换失败时（如可变字体），这种轮廓的格式改用子集字体的轮廓并给出提示
+        """
+        from outlines import (OUTLINES, sfnt_outline, mode_outlines, convert_outline,
+                              subroutinize_data, has_subroutinizer)
+        source_outline = sfnt_outline(ttf_data)
+        plan = [(fmt, outline) for fmt in encode_formats for outline in mode_outlines(fmt, source_outline, self.outline_mode)]
+        self.outline_report = {
+            'source': source_outline,
+            'mode': self.outline_mode,
+            'conversions': {},
+            'failed': {},
+            'subroutinized': None,
+            'results': []
+        }
+        
+        def replan(plan):
+            # 子集化之后才知道需要哪些转换，转换失败后剩余的阶段也会变化
+            convert_stages = [f"outline:{outline}" for outline in OUTLINES
+                              if outline != source_outline and outline not in self.outline_report['conversions']
+                              and outline not in self.outline_report['failed']
+                              and any(job_outline == outline for _, job_outline in plan)]
+            if ("OTF", "CFF") in plan and source_outline != "CFF" and has_subroutinizer():
+                convert_stages.append("subroutinize")
+            self.progress.replan(
+                convert_stages
+                + [self.encode_stage(fmt, outline, plan) for fmt, outline in plan]
+                + [stage for stage in self.progress.pending
+                   if not stage.startswith(("encode:", "outline:")) and stage != "subroutinize"]
+            )
+        
+        replan(plan)
+        outline_data = {source_outline: ttf_data}
+        for outline in OUTLINES:
+            if outline in outline_data or not any(job_outline == outline for _, job_outline in plan):
+                continue
+            self.emit_status(f"转换为 {outline} 轮廓...")
+            try:
+                with self.stage(f"outline:{outline}", len(ttf_data)) as event:
+                    outline_data[outline] = convert_outline(ttf_data, outline)
+                    event["bytes_out"] = len(outline_data[outline])
+                self.outline_report['conversions'][outline] = event["seconds"]
+            except ConversionCancelled:
+                raise
+            except Exception as e:
+                self.outline_report['failed'][outline] = str(e)
+                self.emit_status(f"注意：转换为 {outline} 轮廓失败: {str(e)}")
+                # 这种格式只需要这一种轮廓时改用子集字体的轮廓，OTF与以前一样输出TrueType轮廓的sfnt
+                for fmt in dict.fromkeys(fmt for fmt, job_outline in plan if job_outline == outline):
+                    if all(job_outline == outline for job_fmt, job_outline in plan if job_fmt == fmt):
+                        self.emit_status(f"注意：{fmt} 改用 {source_outline} 轮廓")
+                        plan.append((fmt, source_outline))
+                plan = [(fmt, job_outline) for fmt, job_outline in plan if job_outline != outline]
+                plan.sort(key=lambda job: encode_formats.index(job[0]))
+                replan(plan)
+        
+        jobs = [(fmt, outline, outline_data[outline]) for fmt, outline in plan]
+        # 转换得到的CFF为OTF提取子程序；源字体本身是CFF时保留子集化后的子程序
+        if ("OTF", "CFF") in plan and source_outline != "CFF":
+            if has_subroutinizer():
+                self.emit_status("提取CFF子程序...")
+                try:
+                    with self.stage("subroutinize", len(outline_data["CFF"])) as event:
+                        otf_data = subroutinize_data(outline_data["CFF"])
+                        event["bytes_out"] = len(otf_data)
+                    self.outline_report['conversions']['subroutinize'] = event["seconds"]
+                    self.outline_report['subroutinized'] = True
+                    jobs = [(fmt, outline, otf_data if fmt == "OTF" else data) for fmt, outline, data in jobs]
+                except ConversionCancelled:
+                    raise
+                except Exception as e:
+                    # 提取失败时OTF使用未提取子程序的CFF
+                    self.outline_report['subroutinized'] = False
+                    self.emit_status(f"提取CFF子程序失败: {str(e)}")
+            else:
+                self.outline_report['subroutinized'] = False
+                self.emit_status("注意：没有安装cffsubr，OTF未提取子程序，体积会偏大，可运行: pip install cffsubr")
+        return jobs
+    
+    def record_encode_result(self, future, output_format, outline, stage, data, finish_job, report_failure):
+        """保存子进程中完成的一个编码，并记录对应的阶段事件"""
+        event = {"stage": stage, "bytes_in": len(data), "bytes_out": None,
+                 "seconds": None, "rss_delta": None, "peak_rss": None, "worker": True}
+        encoded, seconds = None, None
+        try:
+            encoded, seconds, worker_peak_rss = future.result()
+            event.update(seconds=round(seconds, 6), bytes_out=len(encoded), peak_rss=worker_peak_rss)
+            self.emit_status(f"转换 {output_format} 格式完成")
+        except Exception as e:
+            event["error"] = str(e)
+            report_failure(output_format, e)
+        finish_job(output_format, outline, encoded, seconds)
+        self.recorder.record(event)
+        self.progress.complete(stage)
+    
+    def generate_html_preview(self, family_name, full_name, original_font_filename, original_font_rel_path, font_files, test_chars, test_extra, slices=None, coverage=None, preview_font=None, profile_results=None, instances=None, outlines=None):
+        """
+        生成HTML预览文件
+        slices: 分片结果(CSS文件名, 分片信息列表)，为None时不展示分片
+        coverage: build_coverage_report生成的字形覆盖报告，为None时不展示
+        preview_font: 轻量预览中内嵌的预览字体data URI
+        profile_results: record_profile_result返回的各预设结果，为None时不展示
+        instances: 可变字体实例(CSS文件名, 实例信息列表)，为None时不展示
+        outlines: 轮廓格式报告，没有转换过轮廓时不展示
+        """
+        
+        # 创建@font-face规则
+        font_face_css = ""
+        # 轻量预览时不声明@font-face，记录每个字体族的src，点击按钮后由脚本加载
+        font_sources = {}
+        
+        # 原始字体的@font-face
+        font_sources['original'] = f"url('{original_font_rel_path}') format('truetype')"
+        
+        if preview_font:
+            font_face_css += f"""
+@font-face {{
+    font-family: '{family_name}-inline';
+    src: url('{preview_font}');
+    font-weight: normal;
+    font-style: normal;
+}}
+"""
+        
+        # 子集字体的@font-face
+        # 为每种格式创建一个单独的字体名称
+        format_to_mime = {
+            'TTF': 'truetype',
+            'OTF': 'opentype',
+            'WOFF': 'woff',
+            'WOFF2': 'woff2',
+            'SVG': 'svg',
+            'EOT': 'embedded-opentype'
+        }
+        
+        # 创建一个综合的@font-face，包含所有格式
+        sources = []
+        for font_file in font_files:
+            src_format = format_to_mime.get(font_file['format'], 'truetype')
+            sources.append(f"url('{font_file['rel_path']}') format('{src_format}')")
+        
+        if sources:
+            font_sources['subset'] = ",\n        ".join(sources)
+        
+        # 为每种格式创建单独的@font-face
+        for font_file in font_files:
+            font_format = font_file['format']
+            src_format = format_to_mime.get(font_format, 'truetype')
+            font_sources[font_format.lower()] = f"url('{font_file['rel_path']}') format('{src_format}')"
+        
+        # 每个可变字体实例一个字体族，src包含该实例的所有格式
+        for instance in instances[1] if instances else []:
+            font_sources[f"instance-{instance['name']}"] = ",\n        ".join(
+                f"url('./{font_file['path']}') format('{format_to_mime[font_file['format']]}')"
+                for font_file in instance['files']
+            )
+        
+        if not self.lite_preview:
+            for name, src in font_sources.items():
+                font_face_css += f"""
+@font-face {{
+    font-family: '{family_name}-{name}';
+    src: {src};
+    font-weight: normal;
+    font-style: normal;
+}}
+"""
+        
+        def load_button(name):
+            """轻量预览中按需加载字体的按钮"""
+            if not self.lite_preview or name not in font_sources:
+                return ""
+            src = html_escape(font_sources[name].replace(",\n        ", ", "))
+            return f' <button class="load-font" data-family="{family_name}-{name}" data-src="{src}">加载字体</button>'
+        
+        # 生成字体文件大小信息
+        font_size_info = f"""
+<section class="font-sizes">
+    <h2>字体文件大小对比</h2>
+    <table>
+        <tr>
+            <th>字体文件</th>
+            <th>大小</th>
+        </tr>
+        <tr>
+            <td>{original_font_filename} (原始)</td>
+            <td>{self.get_file_size(self.input_font_path)}</td>
+        </tr>
+"""
+        for font_file in font_files:
+            font_size_info += f"""
+        <tr>
+            <td>{font_file['path']} ({font_file['format']})</td>
+            <td>{format_size(font_file['size'])}</td>
+        </tr>"""
+        
+        slices_link = ""
+        slices_card = ""
+        if slices:
+            slices_css, slice_files = slices
+            total_size = sum(slice_file['size'] for slice_file in slice_files)
+            font_size_info += f"""
+        <tr>
+            <td>{slices_css} ({len(slice_files)} 个WOFF2分片，合计)</td>
+            <td>{format_size(total_size)}</td>
+        </tr>
+        <tr>
+            <td>首个分片 ({slice_files[0]['count']} 个最常用字符)</td>
+            <td>{format_size(slice_files[0]['size'])}</td>
+        </tr>"""
+            slices_link = f'<link rel="stylesheet" href="./{slices_css}">'
+            slices_card = f"""
+        <div class="preview-card">
+            <h3>瘦身包 (分片加载)</h3>
+            <div class="text-preview" style="font-family: '{family_name}', sans-serif;">
+                <p>{test_chars}</p>
+                <p>{test_extra}</p>
+            </div>
+        </div>"""
+        
+        font_size_info += """
+    </table>
+</section>
+"""
+        
+        coverage_info = ""
+        if coverage:
+            glyphs_after = coverage['glyphs_after_closure']
+            coverage_info = f"""
+<section class="coverage">
+    <h2>字形覆盖</h2>
+    <p>请求 {coverage['requested']} 个字符，源字体中有字形的 {coverage['covered']} 个，缺少 {coverage['missing_count']} 个</p>
+    <p>源字体共 {coverage['source_glyphs']} 个字形，子集闭包前 {coverage['glyphs_before_closure']} 个，闭包后 {glyphs_after if glyphs_after is not None else '未知'} 个</p>
+    <table>
+        <tr>
+            <th>Unicode区块</th>
+            <th>请求字符</th>
+            <th>有字形</th>
+            <th>覆盖率</th>
+        </tr>"""
+            for block in coverage['blocks']:
+                coverage_info += f"""
+        <tr>
+            <td>{block['block']}</td>
+            <td>{block['requested']}</td>
+            <td>{block['covered']}</td>
+            <td>{block['covered'] / block['requested']:.1%}</td>
+        </tr>"""
+            coverage_info += """
+    </table>"""
+            if coverage['missing_count']:
+                coverage_info += f"""
+    <p>缺少字形的字符:</p>
+    <p class="missing-chars">{html_escape(format_codepoints_preview(coverage['missing']))}</p>"""
+            coverage_info += """
+</section>
+"""
+        
+        profiles_info = ""
+        if profile_results:
+            formats = [font_file['format'] for font_file in font_files]
+            header = "".join(f"<th>{fmt}</th><th>{fmt} 编码耗时</th>" for fmt in formats)
+            profiles_info = f"""
+<section class="profiles">
+    <h2>子集化选项预设对比</h2>
+    <table>
+        <tr>
+            <th>预设</th>
+            <th>子集化耗时</th>
+            {header}
+            <th>更新时间</th>
+        </tr>"""
+            for name, result in profile_results.items():
+                seconds = result.get('seconds', {})
+                
+                def format_seconds(stage):
+                    return f"{seconds[stage]:.3f}s" if stage in seconds else "-"
+                
+                cells = "".join(
+                    f"<td>{format_size(result['sizes'][fmt]) if fmt in result.get('sizes', {}) else '-'}</td>"
+                    f"<td>{format_seconds(f'encode:{fmt}')}</td>"
+                    for fmt in formats
+                )
+                current = " (本次)" if name == self.subset_profile else ""
+                profiles_info += f"""
+        <tr>
+            <td>{name}{current}</td>
+            <td>{format_seconds('subset')}</td>
+            {cells}
+            <td>{result.get('updated', '')}</td>
+        </tr>"""
+            profiles_info += """
+    </table>
+</section>
+"""
+        
+        outlines_info = ""
+        if outlines and (outlines['conversions'] or outlines.get('failed')):
+            conversions = "，".join(
+                f"{'提取子程序' if name == 'subroutinize' else f'转换为{name}'} {seconds:.3f}s"
+                for name, seconds in outlines['conversions'].items()
+            )
+            notes = "".join(
+                f"<p>转换为{name}轮廓失败，使用这种轮廓的格式改用{outlines['source']}轮廓: {html_escape(error)}</p>"
+                for name, error in outlines.get('failed', {}).items()
+            )
+            if outlines['subroutinized'] is False:
+                notes += "<p>没有安装cffsubr，OTF未提取子程序，可运行 pip install cffsubr</p>"
+            if outlines['source'] == "TrueType":
+                notes += "<p>CFF轮廓不包含TrueType的hinting指令，Windows小字号下的显示可能不同</p>"
+            outlines_info = f"""
+<section class="outlines">
+    <h2>轮廓格式对比</h2>
+    <p>子集字体的轮廓: {outlines['source']}，模式: {outlines['mode']}，{conversions}</p>
+    {notes}
+    <table>
+        <tr>
+            <th>格式</th>
+            <th>轮廓</th>
+            <th>大小</th>
+            <th>编码耗时</th>
+            <th>选用</th>
+        </tr>"""
+            for result in outlines['results']:
+                size = format_size(result['size']) if result['size'] is not None else "失败"
+                seconds = f"{result['seconds']:.3f}s" if result['seconds'] is not None else "-"
+                outlines_info += f"""
+        <tr>
+            <td>{result['format']}</td>
+            <td>{result['outline']}</td>
+            <td>{size}</td>
+            <td>{seconds}</td>
+            <td>{'✓' if result['selected'] else ''}</td>
+        </tr>"""
+            outlines_info += """
+    </table>
+</section>
+"""
+        
+        instances_info = ""
+        instance_cards = ""
+        if instances:
+            instances_css, instance_files = instances
+            # 某种格式转换失败的实例在这一列显示为-
+            formats = list(dict.fromkeys(font_file['format'] for instance in instance_files for font_file in instance['files']))
+            variable_sizes = {font_file['format']: font_file['size'] for font_file in font_files}
+            # 可变字体子集的编码耗时，命中缓存时没有记录
+            variable_seconds = {event['stage']: event['seconds'] for event in self.events if event.get('seconds')}
+            header = "".join(f"<th>{fmt}</th><th>{fmt} 编码耗时</th>" for fmt in formats)
+            
+            def format_seconds(stage):
+                return f"{variable_seconds[stage]:.3f}s" if stage in variable_seconds else "-"
+            
+            variable_cells = "".join(
+                f"<td>{format_size(variable_sizes[fmt]) if fmt in variable_sizes else '-'}</td>"
+                f"<td>{format_seconds(f'encode:{fmt}')}</td>"
+                for fmt in formats
+            )
+            instances_info = f"""
+<section class="instances">
+    <h2>可变字体实例</h2>
+    <p>各实例先固定或缩小轴的范围再子集化，@font-face规则见 {instances_css}</p>
+    <table>
+        <tr>
+            <th>实例</th>
+            <th>类型</th>
+            <th>实例化+子集化耗时</th>
+            {header}
+        </tr>
+        <tr>
+            <td>可变字体 (全部轴)</td>
+            <td>可变</td>
+            <td>{format_seconds('subset')}</td>
+            {variable_cells}
+        </tr>"""
+            for instance in instance_files:
+                cells = ""
+                instance_formats = {font_file['format']: font_file for font_file in instance['files']}
+                for fmt in formats:
+                    if fmt not in instance_formats:
+                        cells += "<td>-</td><td>-</td>"
+                        continue
+                    font_file = instance_formats[fmt]
+                    encode_seconds = variable_seconds.get(f"encode:{fmt}")
+                    time_saving = ""
+                    # TTF/OTF不需要编码，耗时只是复制数据，不比较
+                    if encode_seconds and FLAVOR_MAP.get(fmt):
+                        time_saving = f" ({font_file['seconds'] - encode_seconds:+.3f}s)"
+                    cells += (f"<td>{format_size(font_file['size'])}{format_saving(font_file['size'], variable_sizes.get(fmt))}</td>"
+                              f"<td>{font_file['seconds']:.3f}s{time_saving}</td>")
+                seconds = instance['seconds']
+                instances_info += f"""
+        <tr>
+            <td>{instance['name']}</td>
+            <td>{'静态' if instance['static'] else '缩小范围的可变字体'}</td>
+            <td>{seconds['instance']:.3f}s + {seconds['subset']:.3f}s</td>
+            {cells}
+        </tr>"""
+                instance_cards += f"""
+        <div class="preview-card">
+            <h3>实例 ({instance['name']}){load_button(f"instance-{instance['name']}")}</h3>
+            <div class="text-preview" style="font-family: '{family_name}-instance-{instance['name']}', sans-serif;">
+                <p>{test_chars}</p>
+                <p>{test_extra}</p>
+            </div>
+        </div>"""
+            instances_info += """
+    </table>
+</section>
+"""
+        
+        inline_card = ""
+        if preview_font:
+            inline_card = f"""
+        <div class="preview-card">
+            <h3>瘦身包 (内嵌预览)</h3>
+            <div class="text-preview" style="font-family: '{family_name}-inline', sans-serif;">
+                <p>{test_chars}</p>
+                <p>{test_extra}</p>
+            </div>
+        </div>"""
+        lite_note = ""
+        if self.lite_preview:
+            lite_note = "<p>轻量预览: 页面只内嵌了预览文字用到的字形，原始字体和各格式的子集点击“加载字体”后才会下载</p>"
+        size_test_attrs = 'class="preview-subset" style="'
+        if preview_font:
+            size_test_attrs = f'style="font-family: \'{family_name}-inline\', sans-serif; '
+        
+        # 生成HTML内容
+        html = f"""<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{family_name} 字体瘦身预览</title>
+    {slices_link}
+    <style>
+        {font_face_css}
+        
+        * {{
+            box-sizing: border-box;
+            margin: 0;
+            padding: 0;
+        }}
+        
+        body {{
+            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, Oxygen, Ubuntu, Cantarell, 'Open Sans', 'Helvetica Neue', sans-serif;
+            line-height: 1.6;
+            color: #333;
+            padding: 20px;
+            max-width: 1200px;
+            margin: 0 auto;
+        }}
+        
+        h1, h2, h3 {{
+            margin: 20px 0 10px;
+        }}
+        
+        .header {{
+            text-align: center;
+            margin-bottom: 30px;
+            padding-bottom: 20px;
+            border-bottom: 1px solid #eee;
+        }}
+        
+        .font-info {{
+            margin-bottom: 20px;
+            background: #f9f9f9;
+            padding: 15px;
+            border-radius: 5px;
+        }}
+        
+        .font-sizes {{
+            margin: 20px 0;
+        }}
+        
+        table {{
+            width: 100%;
+            border-collapse: collapse;
+            margin: 15px 0;
+        }}
+        
+        table, th, td {{
+            border: 1px solid #ddd;
+        }}
+        
+        th, td {{
+            padding: 10px;
+            text-align: left;
+        }}
+        
+        th {{
+            background-color: #f2f2f2;
+        }}
+        
+        .font-preview {{
+            display: flex;
+            flex-direction: column;
+            gap: 20px;
+            margin: 20px 0;
+        }}
+        
+        .preview-card {{
+            border: 1px solid #ddd;
+            border-radius: 5px;
+            padding: 15px;
+            background: white;
+        }}
+        
+        .preview-card h3 {{
+            margin-top: 0;
+            border-bottom: 1px solid #eee;
+            padding-bottom: 10px;
+            margin-bottom: 15px;
+        }}
+        
+        .text-preview {{
+            min-height: 100px;
+        }}
+        
+        .preview-original {{
+            font-family: '{family_name}-original', sans-serif;
+        }}
+        
+        .preview-subset {{
+            font-family: '{family_name}-subset', sans-serif;
+        }}
+        
+        .preview-ttf {{
+            font-family: '{family_name}-ttf', sans-serif;
+        }}
+        
+        .preview-otf {{
+            font-family: '{family_name}-otf', sans-serif;
+        }}
+        
+        .preview-woff {{
+            font-family: '{family_name}-woff', sans-serif;
+        }}
+        
+        .preview-woff2 {{
+            font-family: '{family_name}-woff2', sans-serif;
+        }}
+        
+        .font-sizes-visual {{
+            margin: 30px 0;
+        }}
+        
+        .size-bar {{
+            height: 30px;
+            background-color: #4CAF50;
+            margin-bottom: 10px;
+            display: flex;
+            align-items: center;
+            padding: 0 10px;
+            color: white;
+            border-radius: 3px;
+        }}
+        
+        .test-sizes {{
+            margin: 20px 0;
+        }}
+        
+        .size-example {{
+            margin: 15px 0;
+        }}
+        
+        .missing-chars {{
+            word-break: break-all;
+            color: #c62828;
+        }}
+        
+        button.load-font {{
+            margin-left: 10px;
+            padding: 2px 10px;
+            font-size: 13px;
+        }}
+        
+        footer {{
+            margin-top: 50px;
+            text-align: center;
+            color: #666;
+            font-size: 14px;
+            border-top: 1px solid #eee;
+            padding-top: 20px;
+        }}
+        
+        @media (min-width: 768px) {{
+            .font-preview {{
+                flex-direction: row;
+                flex-wrap: wrap;
+            }}
+            
+            .preview-card {{
+                flex: 1 0 45%;
+            }}
+        }}
+    </style>
+</head>
+<body>
+    <div class="header">
+        <h1>{full_name} 字体瘦身预览</h1>
+        <p>本页面用于比较原始字体与瘦身后的字体效果</p>
+        {lite_note}
+    </div>
+    
+    <div class="font-info">
+        <h2>字体信息</h2>
+        <p><strong>字体名称:</strong> {full_name}</p>
+        <p><strong>字体族:</strong> {family_name}</p>
+        <p><strong>原始文件:</strong> {original_font_filename}</p>
+        <p><strong>生成格式:</strong> {', '.join([f['format'] for f in font_files])}</p>
+    </div>
+    
+    {font_size_info}
+    
+    {coverage_info}
+    
+    {outlines_info}
+    
+    {profiles_info}
+    
+    {instances_info}
+    
+    <section class="font-preview">{inline_card}
+    <div class="preview-card">
+            <h3>默认字体</h3>
+            <div class="text-preview">
+                <p>{test_chars}</p>
+                <p>{test_extra}</p>
+            </div>
+        </div>
+        <div class="preview-card">
+            <h3>原始包{load_button('original')}</h3>
+            <div class="text-preview preview-original">
+                <p>{test_chars}</p>
+                <p>{test_extra}</p>
+            </div>
+        </div>
+        
+        <div class="preview-card">
+            <h3>瘦身包 (综合){load_button('subset')}</h3>
+            <div class="text-preview preview-subset">
+                <p>{test_chars}</p>
+                <p>{test_extra}</p>
+            </div>
+        </div>
+"""
+
+        # 为每种格式添加一个预览卡片
+        for font_file in font_files:
+            font_format = font_file['format'].lower()
+            html += f"""
+        <div class="preview-card">
+            <h3>瘦身包 ({font_file['format']}){load_button(font_format)}</h3>
+            <div class="text-preview preview-{font_format}">
+                <p>{test_chars}</p>
+                <p>{test_extra}</p>
+            </div>
+        </div>"""
+        html += instance_cards
+        html += slices_card
+        
+        html += f"""
+    </section>
+    
+    <section class="test-sizes">
+        <h2>不同字号测试</h2>
+        
+        <div class="size-example">
+            <h3>原始包{load_button('original')}</h3>
+            <p class="preview-original" style="font-size: 12px;">12px: {SIZE_TEST_TEXT}</p>
+            <p class="preview-original" style="font-size: 16px;">16px: {SIZE_TEST_TEXT}</p>
+            <p class="preview-original" style="font-size: 24px;">24px: {SIZE_TEST_TEXT}</p>
+            <p class="preview-original" style="font-size: 36px;">36px: {SIZE_TEST_TEXT}</p>
+        </div>
+        
+        <div class="size-example">
+            <h3>瘦身包</h3>
+            <p {size_test_attrs}font-size: 12px;">12px: {SIZE_TEST_TEXT}</p>
+            <p {size_test_attrs}font-size: 16px;">16px: {SIZE_TEST_TEXT}</p>
+            <p {size_test_attrs}font-size: 24px;">24px: {SIZE_TEST_TEXT}</p>
+            <p {size_test_attrs}font-size: 36px;">36px: {SIZE_TEST_TEXT}</p>
+        </div>
+    </section>
+    
+    <footer>
+        <p>由字体瘦身工具生成 - 生成时间: {self.get_current_time()}</p>
+    </footer>{LAZY_FONT_SCRIPT if self.lite_preview else ""}{AUTO_REFRESH_SCRIPT % self.build_stamp if self.auto_refresh else ""}
+</body>
+</html>
+"""
+        return html
+    
+    def get_file_size(self, file_path):
+        """获取文件大小并格式化"""
+        try:
+            return format_size(os.path.getsize(file_path))
+        except:
+            return "未知"
+    
+    def get_current_time(self):
+        """获取当前时间格式化字符串"""
+        from datetime import datetime
+        return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -0,0 +1,122 @@
+import json
+from bisect import bisect_right
+
+from charset import format_codepoints, parse_codepoints
+
+# 常用的Unicode区块 (起始码位, 结束码位, 名称)，按起始码位排序
+# 只收录字体子集化时常见的区块，其余码位归入"Other"
+UNICODE_BLOCKS = [
+    (0x0000, 0x007F, "Basic Latin"),
+    (0x0080, 0x00FF, "Latin-1 Supplement"),
+    (0x0100, 0x017F, "Latin Extended-A"),
+    (0x0180, 0x024F, "Latin Extended-B"),
+    (0x0250, 0x02AF, "IPA Extensions"),
+    (0x02B0, 0x02FF, "Spacing Modifier Letters"),
+    (0x0300, 0x036F, "Combining Diacritical Marks"),
+    (0x0370, 0x03FF, "Greek and Coptic"),
+    (0x0400, 0x04FF, "Cyrillic"),
+    (0x0590, 0x05FF, "Hebrew"),
+    (0x0600, 0x06FF, "Arabic"),
+    (0x0E00, 0x0E7F, "Thai"),
+    (0x1100, 0x11FF, "Hangul Jamo"),
+    (0x1E00, 0x1EFF, "Latin Extended Additional"),
+    (0x2000, 0x206F, "General Punctuation"),
+    (0x2070, 0x209F, "Superscripts and Subscripts"),
+    (0x20A0, 0x20CF, "Currency Symbols"),
+    (0x2100, 0x214F, "Letterlike Symbols"),
+    (0x2150, 0x218F, "Number Forms"),
+    (0x2190, 0x21FF, "Arrows"),
+    (0x2200, 0x22FF, "Mathematical Operators"),
+    (0x2300, 0x23FF, "Miscellaneous Technical"),
+    (0x2460, 0x24FF, "Enclosed Alphanumerics"),
+    (0x2500, 0x257F, "Box Drawing"),
+    (0x2580, 0x259F, "Block Elements"),
+    (0x25A0, 0x25FF, "Geometric Shapes"),
+    (0x2600, 0x26FF, "Miscellaneous Symbols"),
+    (0x2700, 0x27BF, "Dingbats"),
+    (0x2E80, 0x2EFF, "CJK Radicals Supplement"),
+    (0x2F00, 0x2FDF, "Kangxi Radicals"),
+    (0x3000, 0x303F, "CJK Symbols and Punctuation"),
+    (0x3040, 0x309F, "Hiragana"),
+    (0x30A0, 0x30FF, "Katakana"),
+    (0x3100, 0x312F, "Bopomofo"),
+    (0x3130, 0x318F, "Hangul Compatibility Jamo"),
+    (0x31F0, 0x31FF, "Katakana Phonetic Extensions"),
+    (0x3200, 0x32FF, "Enclosed CJK Letters and Months"),
+    (0x3300, 0x33FF, "CJK Compatibility"),
+    (0x3400, 0x4DBF, "CJK Unified Ideographs Extension A"),
+    (0x4E00, 0x9FFF, "CJK Unified Ideographs"),
+    (0xAC00, 0xD7AF, "Hangul Syllables"),
+    (0xE000, 0xF8FF, "Private Use Area"),
+    (0xF900, 0xFAFF, "CJK Compatibility Ideographs"),
+    (0xFE10, 0xFE1F, "Vertical Forms"),
+    (0xFE30, 0xFE4F, "CJK Compatibility Forms"),
+    (0xFE50, 0xFE6F, "Small Form Variants"),
+    (0xFF00, 0xFFEF, "Halfwidth and Fullwidth Forms"),
+    (0x1F300, 0x1F5FF, "Miscellaneous Symbols and Pictographs"),
+    (0x1F600, 0x1F64F, "Emoticons"),
+    (0x1F900, 0x1F9FF, "Supplemental Symbols and Pictographs"),
+    (0x20000, 0x2A6DF, "CJK Unified Ideographs Extension B"),
+    (0x2A700, 0x2EBEF, "CJK Unified Ideographs Extension C-F"),
+    (0x2F800, 0x2FA1F, "CJK Compatibility Ideographs Supplement"),
+    (0x30000, 0x323AF, "CJK Unified Ideographs Extension G-H"),
+]
+
+_BLOCK_STARTS = [block[0] for block in UNICODE_BLOCKS]
+
+
+def block_name(codepoint):
+    """返回码位所在的Unicode区块名称，不在UNICODE_BLOCKS中的返回"Other" """
+    index = bisect_right(_BLOCK_STARTS, codepoint) - 1
+    if index >= 0 and codepoint <= UNICODE_BLOCKS[index][1]:
+        return UNICODE_BLOCKS[index][2]
+    return "Other"
+
+
+def coverage_filename(base_filename):
+    return f"{base_filename}-coverage.json"
+
+
+def build_coverage_report(cmap, codepoints, num_glyphs):
+    """
+    用集合运算对比请求的码位和源字体的cmap，不需要逐个字符查询字体
+    cmap: 源字体的cmap {码位: 字形名}
+    num_glyphs: 源字体的字形总数
+    返回报告字典，闭包后的字形数由调用方在子集化后填入glyphs_after_closure
+    """
+    requested = set(codepoints)
+    covered = requested & cmap.keys()
+    missing = sorted(requested - covered)
+
+    blocks = {}
+    for codepoint in requested:
+        name = block_name(codepoint)
+        block = blocks.setdefault(name, {'block': name, 'requested': 0, 'covered': 0})
+        block['requested'] += 1
+    for codepoint in covered:
+        blocks[block_name(codepoint)]['covered'] += 1
+    order = {block[2]: i for i, block in enumerate(UNICODE_BLOCKS)}
+
+    return {
+        'requested': len(requested),
+        'covered': len(covered),
+        'missing': format_codepoints(missing),
+        'missing_count': len(missing),
+        'blocks': sorted(blocks.values(), key=lambda block: order.get(block['block'], len(order))),
+        'source_glyphs': num_glyphs,
+        # cmap直接映射到的字形加上.notdef，即闭包前的字形数
+        'glyphs_before_closure': len({cmap[codepoint] for codepoint in covered}) + 1,
+        'glyphs_after_closure': None
+    }
+
+
+def format_codepoints_preview(ranges, limit=200):
+    """把码位区间字符串还原为字符，用于在预览页中直接展示，超过limit个时截断"""
+    codepoints = parse_codepoints(ranges)
+    text = "".join(chr(codepoint) for codepoint in codepoints[:limit])
+    return text + " ..." if len(codepoints) > limit else text
+
+
+def save_coverage_report(output, base_filename, report):
+    """output: 输出位置(bundle中的DirectoryOutput等)，返回写入的位置"""
+    return output.write(coverage_filename(base_filename), json.dumps(report, ensure_ascii=False, indent=2))
@@ -0,0 +1,74 @@
+import sys
+import argparse
+import subprocess
+
+# 模块名: (导入耗时预算(毫秒), 启动时不允许导入的包)
+BUDGETS = {
+    "converter": (100, ("PyQt5", "fontTools", "requests")),
+    "cli": (150, ("PyQt5", "fontTools", "requests")),
+    "server": (150, ("PyQt5", "fontTools", "requests")),
+    "app": (800, ("fontTools", "requests")),
+}
+
+
+def measure(module):
+    """
+    在新的解释器中导入模块，解析 -X importtime 的输出
+    返回(累计导入耗时(毫秒), 导入过的模块名集合)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    cumulative = None
+    imported = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        name = name.strip()
+        if not cumulative_us.strip().isdigit():
+            continue  # 表头
+        imported.add(name)
+        if name == module:
+            cumulative = int(cumulative_us) / 1000
+    return cumulative, imported
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="检查入口模块的导入耗时预算")
+    parser.add_argument("modules", nargs="*", default=list(BUDGETS), help="要检查的模块，默认检查全部")
+    parser.add_argument("-n", "--repeat", type=int, default=5, help="每个模块测量的次数，取最小值 (%(default)s)")
+    args = parser.parse_args(argv)
+
+    failed = False
+    for module in args.modules:
+        budget, forbidden = BUDGETS.get(module, (None, ()))
+        try:
+            samples = [measure(module) for _ in range(max(1, args.repeat))]
+        except RuntimeError as e:
+            print(f"{module:<10} 无法导入: {e}")
+            failed = True
+            continue
+        elapsed = min(sample[0] for sample in samples)
+        imported = samples[0][1]
+        leaked = sorted(name for name in imported if name.split(".")[0] in forbidden)
+
+        state = "通过"
+        if budget is not None and elapsed > budget:
+            state = "超出预算"
+            failed = True
+        if leaked:
+            state = "提前导入了重量级依赖"
+            failed = True
+        budget_text = f"{budget} ms" if budget is not None else "-"
+        print(f"{module:<10} {elapsed:8.1f} ms  预算 {budget_text:<8} {state}")
+        if leaked:
+            print(f"           {', '.join(leaked[:10])}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
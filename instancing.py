@@ -0,0 +1,272 @@
+import os
+import time
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from progress import ConversionCancelled
+from profiles import make_options, DEFAULT_PROFILE
+from outlines import DEFAULT_OUTLINE_MODE
+
+# 命令行和界面在启动时就要解析实例说明，fontTools推迟到生成实例时才导入
+
+# 子进程中共享的字体数据和字符集，由进程池的initializer设置
+_instance_font_source = None
+_instance_codepoints = None
+_instance_profile = DEFAULT_PROFILE
+_instance_outline_mode = DEFAULT_OUTLINE_MODE
+
+
+def parse_instance_spec(spec):
+    """
+    解析一个实例说明，逗号分隔多个轴，例如 "wght=700" 或 "wght=300:700,wdth=100"
+    固定为一个值时生成静态实例，指定范围时生成缩小范围的可变字体；没有提到的轴保持不变
+    返回{轴标签: 数值或(最小值, 最大值)}，格式错误时抛出ValueError
+    """
+    limits = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        tag, sep, value = item.partition("=")
+        tag = tag.strip()
+        if not sep or not tag or len(tag) > 4:
+            raise ValueError(f"无法解析实例说明: {spec}，应为 轴=值 或 轴=最小值:最大值，例如 wght=700")
+        try:
+            if ":" in value:
+                minimum, maximum = (float(part) for part in value.split(":"))
+                if minimum > maximum:
+                    minimum, maximum = maximum, minimum
+                limits[tag] = (minimum, maximum) if minimum != maximum else minimum
+            else:
+                limits[tag] = float(value)
+        except ValueError:
+            raise ValueError(f"无法解析实例说明: {spec}，轴 {tag} 的值不是数字")
+    if not limits:
+        raise ValueError(f"实例说明为空: {spec!r}")
+    return limits
+
+
+def format_axis_value(value):
+    return f"{value:g}"
+
+
+def format_limits(limits):
+    """把轴范围格式化为 wght=300:700,wdth=100 形式"""
+    return ",".join(
+        f"{tag}={format_axis_value(value[0])}:{format_axis_value(value[1])}" if isinstance(value, tuple)
+        else f"{tag}={format_axis_value(value)}"
+        for tag, value in limits.items()
+    )
+
+
+def instance_name(limits):
+    """用于文件名的实例名称，例如 wght700、wght300-700-wdth100"""
+    return "-".join(
+        f"{tag}{format_axis_value(value[0])}-{format_axis_value(value[1])}" if isinstance(value, tuple)
+        else f"{tag}{format_axis_value(value)}"
+        for tag, value in limits.items()
+    ).replace(" ", "")
+
+
+def read_axes(font):
+    """返回可变字体的轴{标签: (最小值, 默认值, 最大值)}，静态字体返回空字典"""
+    if "fvar" not in font:
+        return {}
+    return {axis.axisTag: (axis.minValue, axis.defaultValue, axis.maxValue) for axis in font["fvar"].axes}
+
+
+def resolve_limits(axes, limits):
+    """
+    按字体实际的轴范围检查并收紧实例说明，超出范围的值收紧到范围内
+    返回(收紧后的轴范围, 是否有值被收紧)，字体没有对应的轴时抛出ValueError
+    """
+    resolved = {}
+    clamped = False
+    for tag, value in limits.items():
+        if tag not in axes:
+            raise ValueError(f"字体没有 {tag} 轴，可用的轴: "
+                             + ", ".join(f"{name} ({minimum:g}-{maximum:g})" for name, (minimum, _, maximum) in axes.items()))
+        minimum, _, maximum = axes[tag]
+        if isinstance(value, tuple):
+            new_value = (min(max(value[0], minimum), maximum), min(max(value[1], minimum), maximum))
+            if new_value[0] == new_value[1]:
+                new_value = new_value[0]
+        else:
+            new_value = min(max(value, minimum), maximum)
+        clamped = clamped or new_value != value
+        resolved[tag] = new_value
+    return resolved, clamped
+
+
+def _init_instance_worker(font_source, codepoints, profile=DEFAULT_PROFILE, outline_mode=DEFAULT_OUTLINE_MODE):
+    global _instance_font_source, _instance_codepoints, _instance_profile, _instance_outline_mode
+    _instance_font_source = font_source
+    _instance_codepoints = codepoints
+    _instance_profile = profile
+    _instance_outline_mode = outline_mode
+
+
+def build_instance(limits, formats):
+    """
+    在子进程中固定或缩小可变字体的轴，再子集化并编码为各输出格式
+    实例化会去掉gvar/HVAR等表中不再需要的变化数据，之后再子集化一次，清理只被已去掉的变体用到的字形
+    各格式的轮廓与主字体一样按轮廓模式选择，几种轮廓都编码时保留较小的一个；缩小范围的可变字体无法转换轮廓，保持原来的轮廓
+    formats: [(输出格式, flavor)]
+    返回{'seconds': {'instance', 'subset'}, 'files': [(输出格式, 数据, 编码耗时)], 'errors': [(输出格式, 改用原轮廓的原因)]}
+    """
+    from fontTools.ttLib import TTFont
+    from fontTools.subset import Subsetter
+    from fontTools.varLib import instancer
+    from converter import encode_font_data
+    from outlines import sfnt_outline, mode_outlines, convert_outline, subroutinize_data
+    font_source = _instance_font_source
+    font = TTFont(BytesIO(font_source) if isinstance(font_source, bytes) else font_source)
+    try:
+        start = time.perf_counter()
+        instancer.instantiateVariableFont(font, limits, inplace=True)
+        instance_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        subsetter = Subsetter(options=make_options(_instance_profile))
+        subsetter.populate(unicodes=_instance_codepoints)
+        subsetter.subset(font)
+        font.flavor = None
+        buffer = BytesIO()
+        font.save(buffer)
+        ttf_data = buffer.getvalue()
+        subset_seconds = time.perf_counter() - start
+    finally:
+        font.close()
+
+    source_outline = sfnt_outline(ttf_data)
+    # 同一种轮廓只转换一次，WOFF和WOFF2共用
+    outline_data = {source_outline: ttf_data}
+    files = []
+    errors = []
+    for output_format, flavor in formats:
+        start = time.perf_counter()
+        encoded = []
+        error = None
+        for outline in mode_outlines(output_format, source_outline, _instance_outline_mode):
+            try:
+                if outline not in outline_data:
+                    outline_data[outline] = convert_outline(ttf_data, outline)
+                data = outline_data[outline]
+                if output_format == "OTF" and outline != source_outline:
+                    data = subroutinize_data(data)
+                encoded.append(encode_font_data(data, flavor))
+            except Exception as e:
+                error = str(e)
+        if not encoded:
+            # 缩小范围的可变字体无法转换轮廓，回退到实例本身的轮廓
+            errors.append((output_format, error))
+            encoded.append(encode_font_data(ttf_data, flavor))
+        files.append((output_format, min(encoded, key=len), time.perf_counter() - start))
+    return {'seconds': {'instance': instance_seconds, 'subset': subset_seconds}, 'files': files, 'errors': errors}
+
+
+def instance_css(family_name, instance_files, axes):
+    """
+    每个实例一个@font-face，按固定或缩小后的wght/wdth声明font-weight和font-stretch
+    实例中没有固定的轴按字体原来的范围声明
+    """
+    format_to_css = {"TTF": "truetype", "OTF": "opentype", "WOFF": "woff", "WOFF2": "woff2"}
+    css = ""
+    for instance in instance_files:
+        # 浏览器按src的顺序选择第一个支持的格式，压缩率高的放在前面
+        sources = ",\n         ".join(
+            f"url('./{font_file['path']}') format('{format_to_css[font_file['format']]}')"
+            for font_file in sorted(instance['files'], key=lambda font_file: -list(format_to_css).index(font_file['format']))
+        )
+        descriptors = ""
+        for tag, prop, unit in (("wght", "font-weight", ""), ("wdth", "font-stretch", "%")):
+            value = instance['limits'].get(tag)
+            if value is None and tag in axes:
+                value = (axes[tag][0], axes[tag][2])
+            if isinstance(value, tuple):
+                descriptors += f"\n    {prop}: {format_axis_value(value[0])}{unit} {format_axis_value(value[1])}{unit};"
+            elif value is not None:
+                descriptors += f"\n    {prop}: {format_axis_value(value)}{unit};"
+        css += f"""@font-face {{
+    font-family: '{family_name}';
+    src: {sources};{descriptors}
+    font-style: normal;
+    font-display: swap;
+}}
+"""
+    return css
+
+
+def build_instances(font_source, codepoints, instances, formats, output, base_filename, family_name,
+                    max_workers=None, status_callback=None, progress_callback=None, cancel_event=None,
+                    profile=DEFAULT_PROFILE, outline_mode=DEFAULT_OUTLINE_MODE):
+    """
+    为可变字体生成多个静态或缩小范围的实例，每个实例在子进程中实例化、子集化并编码
+
+    font_source: 已经子集化的TTF数据，或源字体文件路径（命中缓存时）
+    instances: parse_instance_spec解析后的轴范围列表
+    formats: [(输出格式, flavor, 扩展名)]
+    output: 输出位置(bundle中的DirectoryOutput等)
+    cancel_event: 设置后在下一个实例完成时放弃剩余实例，抛出ConversionCancelled
+    outline_mode: WOFF/WOFF2使用的轮廓，见outlines.OUTLINE_MODES
+    返回(CSS文件的位置, 实例信息列表)，源字体不是可变字体时返回None
+    """
+    from fontTools.ttLib import TTFont
+    font = TTFont(BytesIO(font_source) if isinstance(font_source, bytes) else font_source, lazy=True)
+    try:
+        axes = read_axes(font)
+    finally:
+        font.close()
+    if not axes:
+        if status_callback:
+            status_callback("注意：源字体不是可变字体，跳过实例化")
+        return None
+
+    resolved = []
+    for limits in instances:
+        limits, clamped = resolve_limits(axes, limits)
+        if clamped and status_callback:
+            status_callback(f"注意：实例超出了字体的轴范围，已收紧为 {format_limits(limits)}")
+        # 收紧后相同的实例只生成一次
+        if limits not in resolved:
+            resolved.append(limits)
+
+    instance_files = [None] * len(resolved)
+    max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(resolved)))
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_instance_worker,
+                             initargs=(font_source, codepoints, profile, outline_mode)) as executor:
+        futures = {
+            executor.submit(build_instance, limits, [(fmt, flavor) for fmt, flavor, _ in formats]): i
+            for i, limits in enumerate(resolved)
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            if cancel_event is not None and cancel_event.is_set():
+                for pending in futures:
+                    pending.cancel()
+                raise ConversionCancelled()
+            i = futures[future]
+            limits = resolved[i]
+            name = instance_name(limits)
+            result = future.result()
+            for output_format, error in result['errors']:
+                if status_callback:
+                    status_callback(f"注意：实例 {format_limits(limits)} 的 {output_format} 无法转换轮廓，保持原来的轮廓: {error}")
+            extensions = {fmt: extension for fmt, _, extension in formats}
+            files = []
+            for output_format, data, seconds in result['files']:
+                filename = f"{base_filename}-{name}{extensions[output_format]}"
+                output.write(filename, data)
+                files.append({'format': output_format, 'path': filename, 'size': len(data), 'seconds': seconds})
+            instance_files[i] = {
+                'name': name,
+                'limits': limits,
+                'static': not any(isinstance(value, tuple) for value in limits.values()) and len(limits) == len(axes),
+                'seconds': result['seconds'],
+                'files': files
+            }
+            if status_callback:
+                status_callback(f"生成实例 {done}/{len(resolved)}: {format_limits(limits)}")
+            if progress_callback:
+                progress_callback(done, len(resolved))
+
+    return output.write(f"{base_filename}-instances.css", instance_css(family_name, instance_files, axes)), instance_files
@@ -0,0 +1,154 @@
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, CancelledError
+
+from converter import FontConverter
+from charset import CharListFetcher
+from site_chars import scan_site
+
+
+def run_job(job_id, font_path, output_dir, options, events, cancel_event):
+    """
+    在进程池的子进程中处理一个字体，开始、进度、状态和阶段事件通过events队列发回主进程
+    options: FontConverter的其余参数
+    cancel_event: Manager创建的事件，主进程设置后在下一个检查点取消
+    返回(任务编号, 是否成功, 结果信息, 阶段事件)
+    """
+    events.put((job_id, "started", None))
+    converter = FontConverter(
+        font_path,
+        status_callback=lambda message: events.put((job_id, "status", message)),
+        progress_callback=lambda value: events.put((job_id, "progress", value)),
+        event_callback=lambda event: events.put((job_id, "stage", event)),
+        output_dir=output_dir,
+        **options
+    )
+    converter.cancel_event = cancel_event
+    success, message = converter.run()
+    return job_id, success, message, converter.events
+
+
+class JobQueue:
+    """
+    在固定大小的进程池中处理多个字体，运行期间可以继续添加任务，全部任务结束后自动退出
+    每个任务的进度通过Manager队列从子进程发回，在分发线程中调用on_event
+
+    max_workers: 同时处理的字体数
+    options: 所有任务共用的FontConverter参数（url_text、custom_text、output_formats等）
+    on_event: 回调，接收(任务编号, 类型, 值)，类型为started、progress、status、stage或finished，
+              finished的值为(是否成功, 结果信息, 阶段事件)
+    """
+
+    def __init__(self, max_workers, options, on_event):
+        self.max_workers = max(1, max_workers)
+        # 多个字体同时处理时，字体内部不再开多个进程
+        self.options = dict(options, max_workers=1) if self.max_workers > 1 else options
+        self.on_event = on_event
+        self.pending = queue.Queue()
+        self.lock = threading.Lock()
+        self.accepting = True
+        self.cancelled = False
+        self.cancel_events = {}
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def is_running(self):
+        return self.thread.is_alive()
+
+    def add(self, job_id, font_path, output_dir):
+        """添加任务，队列已经结束时返回False，需要新建一个队列"""
+        with self.lock:
+            if not self.accepting:
+                return False
+            self.pending.put((job_id, font_path, output_dir))
+            return True
+
+    def cancel(self):
+        """取消全部任务：还没开始的直接跳过，正在处理的在下一个检查点停止"""
+        with self.lock:
+            self.cancelled = True
+            for cancel_event in self.cancel_events.values():
+                cancel_event.set()
+
+    def join(self):
+        self.thread.join()
+
+    def dispatch(self, events, timeout):
+        """把子进程发回的事件转给回调，timeout秒内没有事件时返回"""
+        try:
+            while True:
+                self.on_event(*events.get(timeout=timeout))
+                timeout = 0
+        except queue.Empty:
+            pass
+
+    def prefetch(self):
+        """
+        常用字列表只在分发线程中下载一次，子进程以离线模式读取本地副本；
+        网站内容目录也先扫描一次，各任务只读取扫描缓存
+        """
+        if self.options.get('site_dirs'):
+            try:
+                scan_site(self.options['site_dirs'])
+            except Exception:
+                # 扫描失败时由各个任务报告失败原因
+                pass
+        fetcher = self.options.get('fetcher')
+        if not self.options.get('url_text') or fetcher is None or fetcher.offline:
+            return
+        try:
+            fetcher.fetch(self.options['url_text'])
+        except Exception:
+            # 没有可用的本地副本时由各个任务报告失败原因
+            pass
+        self.options = dict(self.options, fetcher=CharListFetcher(fetcher.cache_dir, offline=True))
+
+    def run(self):
+        self.prefetch()
+        manager = multiprocessing.Manager()
+        try:
+            events = manager.Queue()
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {}
+                while True:
+                    while True:
+                        try:
+                            job_id, font_path, output_dir = self.pending.get_nowait()
+                        except queue.Empty:
+                            break
+                        with self.lock:
+                            if self.cancelled:
+                                self.on_event(job_id, "finished", (False, "已取消", []))
+                                continue
+                            cancel_event = manager.Event()
+                            self.cancel_events[job_id] = cancel_event
+                        future = executor.submit(run_job, job_id, font_path, output_dir, self.options,
+                                                 events, cancel_event)
+                        futures[future] = job_id
+                    if self.cancelled:
+                        for future in futures:
+                            future.cancel()
+                    self.dispatch(events, 0.1)
+                    for future in [future for future in futures if future.done()]:
+                        job_id = futures.pop(future)
+                        # 子进程返回前发出的事件都已经在队列中，先转发完再报告结束
+                        self.dispatch(events, 0)
+                        try:
+                            _, success, message, stage_events = future.result()
+                        except CancelledError:
+                            success, message, stage_events = False, "已取消", []
+                        except Exception as e:
+                            success, message, stage_events = False, f"处理失败: {str(e)}", []
+                        with self.lock:
+                            self.cancel_events.pop(job_id, None)
+                        self.on_event(job_id, "finished", (success, message, stage_events))
+                    with self.lock:
+                        if not futures and self.pending.empty():
+                            self.accepting = False
+                            break
+        finally:
+            manager.shutdown()
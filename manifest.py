@@ -0,0 +1,45 @@
+import os
+import json
+
+from charset import format_codepoints, parse_codepoints
+
+
+def manifest_path(result_dir, base_filename):
+    return os.path.join(result_dir, f"{base_filename}-manifest.json")
+
+
+def load_manifest(result_dir, base_filename):
+    """读取上次运行留下的清单，不存在或损坏时返回None"""
+    try:
+        with open(manifest_path(result_dir, base_filename), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    manifest['codepoints'] = parse_codepoints(manifest.get('codepoints', ""))
+    return manifest
+
+
+def save_manifest(result_dir, base_filename, font_digest, options, codepoints, slice_count=0, slices=None,
+                  stage_seconds=None):
+    """
+    记录本次运行的源字体摘要、子集化选项、码位集合和分片信息，供下次增量更新使用
+    options: options_fingerprint生成的选项字符串
+    stage_seconds: 各阶段耗时(秒)，下次运行时用来分配进度
+    """
+    manifest = {
+        'font_digest': font_digest,
+        'options': options,
+        'codepoints': format_codepoints(codepoints),
+        'slice_count': slice_count,
+        'slices': slices or [],
+        'stage_seconds': stage_seconds or {}
+    }
+    with open(manifest_path(result_dir, base_filename), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+
+def diff_codepoints(old_codepoints, new_codepoints):
+    """返回(新增的码位, 删除的码位)，均为排序后的列表"""
+    old_set = set(old_codepoints)
+    new_set = set(new_codepoints)
+    return sorted(new_set - old_set), sorted(old_set - new_set)
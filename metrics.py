@@ -0,0 +1,130 @@
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows没有resource模块
+    resource = None
+
+
+def _windows_memory_counters():
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+        return None
+    return counters
+
+
+def peak_rss():
+    """当前进程的峰值常驻内存（字节），无法获取时返回None"""
+    try:
+        if resource is not None:
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # Linux上单位是KB，macOS上是字节
+            return peak if sys.platform == "darwin" else peak * 1024
+        if sys.platform == "win32":
+            counters = _windows_memory_counters()
+            return counters.PeakWorkingSetSize if counters else None
+    except Exception:
+        pass
+    return None
+
+
+def current_rss():
+    """当前进程的常驻内存（字节），无法获取时返回None"""
+    try:
+        if sys.platform.startswith("linux"):
+            with open("/proc/self/statm", "r") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        if sys.platform == "win32":
+            counters = _windows_memory_counters()
+            return counters.WorkingSetSize if counters else None
+    except Exception:
+        pass
+    return None
+
+
+def format_size(size_bytes):
+    """把字节数格式化为易读的字符串"""
+    if size_bytes is None:
+        return "未知"
+    if size_bytes < 1024:
+        return f"{size_bytes} 字节"
+    elif size_bytes < 1024 * 1024:
+        return f"{size_bytes/1024:.2f} KB"
+    else:
+        return f"{size_bytes/(1024*1024):.2f} MB"
+
+
+class StageRecorder:
+    """
+    记录流程中每个阶段的耗时、输入输出字节数和常驻内存变化
+    每个阶段结束时生成一条结构化事件，保存在events中并传给回调
+
+    callback: 事件回调，接收一个事件字典
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.events = []
+
+    @contextmanager
+    def stage(self, name, bytes_in=None):
+        """
+        测量一个阶段，with语句内可以设置事件的bytes_out等字段
+        事件字段: stage, seconds, bytes_in, bytes_out, rss_delta, peak_rss，出错时还有error
+        """
+        event = {"stage": name, "bytes_in": bytes_in, "bytes_out": None}
+        rss_before = current_rss()
+        start = time.perf_counter()
+        try:
+            yield event
+        except Exception as e:
+            event["error"] = str(e)
+            raise
+        finally:
+            event["seconds"] = round(time.perf_counter() - start, 6)
+            rss_after = current_rss()
+            event["rss_delta"] = rss_after - rss_before if rss_after is not None and rss_before is not None else None
+            event["peak_rss"] = peak_rss()
+            self.record(event)
+
+    def record(self, event):
+        """直接记录一条在别处测量的事件，例如子进程中完成的编码"""
+        self.events.append(event)
+        if self.callback:
+            self.callback(event)
+
+
+def format_event(event):
+    """把阶段事件格式化为一行简短的说明"""
+    text = f"{event['stage']}: {event['seconds']:.3f}s"
+    if event.get("bytes_in") is not None:
+        text += f" 输入 {format_size(event['bytes_in'])}"
+    if event.get("bytes_out") is not None:
+        text += f" 输出 {format_size(event['bytes_out'])}"
+    if event.get("rss_delta") is not None:
+        text += f" 内存变化 {event['rss_delta'] / (1024 * 1024):+.1f} MB"
+    if event.get("error"):
+        text += f" 失败: {event['error']}"
+    return text
@@ -0,0 +1,208 @@
+import json
+from io import BytesIO
+from collections import Counter
+
+# fontTools只在转换轮廓时才导入，命令行和界面启动时只需要这里的常量
+
+# 输出格式固定的轮廓：TTF为TrueType(glyf)，OTF为CFF
+FORMAT_OUTLINES = {
+    "TTF": "TrueType",
+    "OTF": "CFF"
+}
+
+OUTLINES = ["TrueType", "CFF"]
+
+# WOFF/WOFF2使用的轮廓：名称 -> (说明, 尝试的轮廓)，None表示与子集字体的轮廓相同
+OUTLINE_MODES = {
+    "source": ("与源字体相同，不转换轮廓", None),
+    "truetype": ("TrueType二次曲线轮廓，保留hinting指令", ["TrueType"]),
+    "cff": ("CFF三次曲线轮廓，不包含TrueType的hinting，很多字体更小", ["CFF"]),
+    "smallest": ("两种轮廓都编码，每种格式保留较小的一个", OUTLINES),
+}
+
+DEFAULT_OUTLINE_MODE = "source"
+
+# 轮廓转换允许的最大误差（字体单位，按1000 UPM折算）
+CURVE_MAX_ERR = 1.0
+
+
+def font_outline(font):
+    return "CFF" if "CFF " in font or "CFF2" in font else "TrueType"
+
+
+def sfnt_outline(data):
+    """只读取表目录，判断sfnt数据的轮廓格式"""
+    from fontTools.ttLib import TTFont
+    font = TTFont(BytesIO(data), lazy=True)
+    try:
+        return font_outline(font)
+    finally:
+        font.close()
+
+
+def mode_outlines(output_format, source_outline, mode=DEFAULT_OUTLINE_MODE):
+    """
+    返回一种输出格式需要编码的轮廓列表
+    TTF、OTF的轮廓由格式决定；WOFF/WOFF2按mode选择，smallest时两种都要编码
+    """
+    if output_format in FORMAT_OUTLINES:
+        return [FORMAT_OUTLINES[output_format]]
+    return list(OUTLINE_MODES[mode][1] or [source_outline])
+
+
+def has_subroutinizer():
+    """CFF子程序提取依赖可选的cffsubr模块"""
+    try:
+        import cffsubr  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def check_static(font):
+    if "gvar" in font or "CFF2" in font:
+        raise ValueError("可变字体暂不支持转换轮廓格式，固定了全部轴的静态实例（--instance）可以转换")
+
+
+def draw_glyphs(font, make_pen):
+    """
+    把每个字形（展开复合字形后）画到make_pen(字形名, 宽度)返回的笔上
+    返回{字形名: 笔}
+    """
+    from fontTools.pens.recordingPen import DecomposingRecordingPen
+    glyph_set = font.getGlyphSet()
+    pens = {}
+    for name in font.getGlyphOrder():
+        glyph = glyph_set[name]
+        recording = DecomposingRecordingPen(glyph_set)
+        glyph.draw(recording)
+        pen, outer = make_pen(name, glyph.width)
+        recording.replay(outer)
+        pens[name] = pen
+    return pens
+
+
+def truetype_to_cff(font):
+    """
+    把TrueType轮廓就地转换为CFF
+    二次曲线用qu2cu合并为尽量少的三次曲线，轮廓方向反转为CFF的逆时针方向；
+    最常见的字宽作为defaultWidthX，中文字体绝大多数字形的charstring不需要再写字宽
+    """
+    from fontTools.fontBuilder import FontBuilder
+    from fontTools.misc.roundTools import otRound
+    from fontTools.pens.t2CharStringPen import T2CharStringPen
+    from fontTools.pens.qu2cuPen import Qu2CuPen
+    check_static(font)
+    max_err = CURVE_MAX_ERR * font["head"].unitsPerEm / 1000
+    widths = Counter(width for width, _ in font["hmtx"].metrics.values())
+    default_width = widths.most_common(1)[0][0] if widths else 0
+
+    def make_pen(name, width):
+        pen = T2CharStringPen(None if width == default_width else width, None)
+        return pen, Qu2CuPen(pen, max_err, all_cubic=True, reverse_direction=True)
+
+    charstrings = {name: pen.getCharString() for name, pen in draw_glyphs(font, make_pen).items()}
+
+    name_table = font["name"]
+    ps_name = name_table.getDebugName(6) or "Subset"
+    font_info = {
+        "FullName": name_table.getDebugName(4) or ps_name,
+        "FamilyName": name_table.getDebugName(1) or ps_name,
+    }
+    # TrueType的hinting指令对CFF轮廓没有意义
+    for tag in ("glyf", "loca", "fpgm", "prep", "cvt ", "gasp", "hdmx", "LTSH", "VDMX"):
+        if tag in font:
+            del font[tag]
+    builder = FontBuilder(font=font)
+    builder.isTTF = False
+    builder.setupCFF(ps_name.replace(" ", ""), font_info, charstrings,
+                     {"defaultWidthX": default_width, "nominalWidthX": 0})
+    builder.setupMaxp()
+    font["post"].formatType = 3.0
+
+    # 左侧距与CFF轮廓的xMin保持一致
+    cff = font["CFF "].cff
+    top_dict = cff[cff.fontNames[0]]
+    hmtx = font["hmtx"]
+    for name in font.getGlyphOrder():
+        bounds = top_dict.CharStrings[name].calcBounds(top_dict.CharStrings)
+        hmtx[name] = (hmtx[name][0], otRound(bounds[0]) if bounds else 0)
+
+
+def cff_to_truetype(font):
+    """把CFF轮廓就地转换为TrueType，三次曲线用cu2qu近似为二次曲线；转换后不保留字形名"""
+    from fontTools.fontBuilder import FontBuilder
+    from fontTools.pens.ttGlyphPen import TTGlyphPen
+    from fontTools.pens.cu2quPen import Cu2QuPen
+    check_static(font)
+    max_err = CURVE_MAX_ERR * font["head"].unitsPerEm / 1000
+
+    def make_pen(name, width):
+        pen = TTGlyphPen(None)
+        return pen, Cu2QuPen(pen, max_err, reverse_direction=True)
+
+    glyphs = {name: pen.glyph() for name, pen in draw_glyphs(font, make_pen).items()}
+    for tag in ("CFF ", "VORG"):
+        if tag in font:
+            del font[tag]
+    builder = FontBuilder(font=font)
+    builder.isTTF = True
+    font.sfntVersion = "\0\1\0\0"
+    builder.setupGlyf(glyphs)
+    builder.setupMaxp()
+    font["post"].formatType = 3.0
+    glyf = font["glyf"]
+    hmtx = font["hmtx"]
+    for name in font.getGlyphOrder():
+        glyph = glyf[name]
+        hmtx[name] = (hmtx[name][0], glyph.xMin if glyph.numberOfContours else 0)
+
+
+def outlines_filename(base_filename):
+    return f"{base_filename}-outlines.json"
+
+
+def save_outline_report(output, base_filename, report):
+    """把各轮廓格式的大小和耗时写入<字体名>-outlines.json，返回写入的位置"""
+    return output.write(outlines_filename(base_filename), json.dumps(report, ensure_ascii=False, indent=2))
+
+
+def save_font(font):
+    buffer = BytesIO()
+    font.save(buffer)
+    return buffer.getvalue()
+
+
+def convert_outline(data, outline):
+    """把sfnt数据转换为指定的轮廓格式，轮廓相同时原样返回同一个对象"""
+    from fontTools.ttLib import TTFont
+    font = TTFont(BytesIO(data))
+    try:
+        if font_outline(font) == outline:
+            return data
+        if outline == "CFF":
+            truetype_to_cff(font)
+        else:
+            cff_to_truetype(font)
+        return save_font(font)
+    finally:
+        font.close()
+
+
+def subroutinize_data(data):
+    """
+    提取CFF中重复的charstring片段为子程序，减小未压缩的OTF
+    WOFF2的brotli压缩本身会去除重复，提取子程序后反而略大，所以只用于OTF
+    没有安装cffsubr时原样返回
+    """
+    if not has_subroutinizer():
+        return data
+    import cffsubr
+    from fontTools.ttLib import TTFont
+    font = TTFont(BytesIO(data))
+    try:
+        cffsubr.subroutinize(font, keep_glyph_names=False)
+        return save_font(font)
+    finally:
+        font.close()
+
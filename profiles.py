@@ -0,0 +1,96 @@
+import os
+import json
+import copy
+import time
+
+# 子集化选项预设: 名称 -> (说明, 覆盖fontTools.subset.Options默认值的选项)
+SUBSET_PROFILES = {
+    "default": ("fontTools的默认选项", {}),
+    "web-min": (
+        "网页最小体积: 去掉hinting、字形名和.notdef轮廓，去掉分数、比例宽度等可选排版特性，只保留少量name记录，CFF去子程序以便WOFF2压缩",
+        {
+            'hinting': False,
+            'desubroutinize': True,
+            'glyph_names': False,
+            'notdef_outline': False,
+            'legacy_kern': False,
+            # 保留版权、字体族、子族、全名和PostScript名，去掉版本号和唯一标识等记录
+            'name_IDs': [0, 1, 2, 4, 6],
+            'name_languages': [0x409],
+            'drop_tables': ['JSTF', 'DSIG', 'EBDT', 'EBLC', 'EBSC', 'PCLT', 'LTSH', 'Feat', 'Glat', 'Gloc',
+                            'Silf', 'Sill', 'hdmx', 'VDMX'],
+        }
+    ),
+    "print-safe": (
+        "印刷安全: 保留hinting、全部排版特性、全部name记录、字形名、.notdef轮廓和旧版kern/cmap表",
+        {
+            'hinting': True,
+            'glyph_names': True,
+            'notdef_outline': True,
+            'legacy_kern': True,
+            'legacy_cmap': True,
+            'name_IDs': ['*'],
+            'name_legacy': True,
+            'name_languages': ['*'],
+            'layout_features': ['*'],
+        }
+    ),
+}
+
+# 各预设从fontTools默认保留的排版特性中去掉的可选特性
+# 默认列表包含各文字（印度系、阿拉伯、谚文字母等）整形所必需的特性，只去掉不影响文字正确显示的排版效果：
+# 分数、比例宽度和半宽间距、对齐和花饰替代
+DROPPED_LAYOUT_FEATURES = {
+    "web-min": ['frac', 'numr', 'dnom', 'palt', 'halt', 'vpal', 'vhal', 'valt', 'chws', 'vchw', 'cswh', 'jalt'],
+}
+
+DEFAULT_PROFILE = "default"
+
+
+def make_options(profile=DEFAULT_PROFILE):
+    """按预设创建fontTools.subset.Options，未知的预设名会抛出ValueError"""
+    from fontTools.subset import Options
+    if profile not in SUBSET_PROFILES:
+        raise ValueError(f"未知的子集化选项预设: {profile}，可选 {', '.join(SUBSET_PROFILES)}")
+    options = Options(**copy.deepcopy(SUBSET_PROFILES[profile][1]))
+    dropped = DROPPED_LAYOUT_FEATURES.get(profile)
+    if dropped:
+        options.layout_features = [tag for tag in options.layout_features if tag not in dropped]
+    return options
+
+
+def profiles_filename(base_filename):
+    return f"{base_filename}-profiles.json"
+
+
+def profiles_path(result_dir, base_filename):
+    return os.path.join(result_dir, profiles_filename(base_filename))
+
+
+def load_profile_results(result_dir, base_filename):
+    try:
+        with open(profiles_path(result_dir, base_filename), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def record_profile_result(output, base_filename, profile, sizes, events):
+    """
+    记录一个预设最近一次生成的各格式大小和耗时，同一结果目录下不同预设的结果可以直接对比
+    output: 输出位置(bundle中的DirectoryOutput等)，写入归档时没有之前的记录
+    sizes: {格式: 字节数}
+    events: 本次运行的阶段事件；命中缓存时没有编码耗时，保留上次记录的值
+    返回更新后的全部记录 {预设: 结果}
+    """
+    results = load_profile_results(output.result_dir, base_filename) if output.result_dir else {}
+    entry = results.setdefault(profile, {})
+    entry['sizes'] = sizes
+    entry['updated'] = time.strftime("%Y-%m-%d %H:%M:%S")
+    seconds = entry.setdefault('seconds', {})
+    for event in events:
+        if event.get('seconds') is not None and not event.get('error') and (
+                event['stage'] in ("subset", "save") or event['stage'].startswith("encode:")):
+            seconds[event['stage']] = event['seconds']
+    output.write(profiles_filename(base_filename), json.dumps(results, ensure_ascii=False, indent=2))
+    return results
@@ -0,0 +1,195 @@
+import time
+import logging
+import threading
+
+# 没有历史耗时记录时各阶段的相对权重，子集化和WOFF2压缩是大字体最耗时的两步
+DEFAULT_STAGE_WEIGHTS = {
+    "fetch": 2,
+    "scan": 5,
+    "digest": 1,
+    "coverage": 1,
+    "cache": 2,
+    "load": 2,
+    "populate": 2,
+    "subset": 30,
+    "save": 15,
+    "encode:TTF": 1,
+    "encode:OTF": 1,
+    "encode:WOFF": 6,
+    "encode:WOFF2": 35,
+    "encode:WOFF:CFF": 6,
+    "encode:WOFF2:CFF": 35,
+    "encode:WOFF:TrueType": 6,
+    "encode:WOFF2:TrueType": 35,
+    "outline:CFF": 10,
+    "outline:TrueType": 10,
+    "subroutinize": 10,
+    "slices": 40,
+    "instances": 40,
+    "budget": 60,
+    "html": 1,
+}
+
+
+class ConversionCancelled(Exception):
+    """用户取消了正在进行的转换"""
+
+
+class ProgressTracker:
+    """
+    按各阶段的实际开销分配进度
+    权重优先使用上次运行记录的各阶段耗时，没有记录时使用DEFAULT_STAGE_WEIGHTS；
+    对没有进度回调的长阶段，按上次的耗时在后台线程中推算阶段内的进度
+
+    callback: 进度回调，接收0-100的整数
+    history: 上次运行的各阶段耗时(秒) {阶段名: 秒数}
+    """
+
+    def __init__(self, callback=None, history=None):
+        self.callback = callback
+        self.history = {stage: seconds for stage, seconds in (history or {}).items() if seconds}
+        self.pending = []
+        self.done_weight = 0.0
+        self.current = None
+        self.current_weight = 0.0
+        self.fraction = 0.0
+        self.last_value = 0
+        self.lock = threading.Lock()
+        self.ticker = None
+
+    def weight(self, stage):
+        if self.history:
+            # 有历史记录时用秒数作为权重，没记录到的阶段按默认权重折算
+            default_total = sum(DEFAULT_STAGE_WEIGHTS.get(s, 1) for s in self.history)
+            scale = sum(self.history.values()) / default_total if default_total else 1
+            return self.history.get(stage, DEFAULT_STAGE_WEIGHTS.get(stage, 1) * scale)
+        return DEFAULT_STAGE_WEIGHTS.get(stage, 1)
+
+    def replan(self, stages):
+        """设置接下来还要执行的阶段，已完成阶段的进度保持不变"""
+        with self.lock:
+            self.pending = list(stages)
+        self.emit()
+
+    def begin(self, stage):
+        self.stop_ticker()
+        with self.lock:
+            if stage in self.pending:
+                self.pending.remove(stage)
+            self.current = stage
+            self.current_weight = self.weight(stage)
+            self.fraction = 0.0
+            expected = self.history.get(stage)
+        # 阶段内部没有进度回调时，按上次的耗时推算进度，最多推进到95%
+        if expected and expected > 0.5:
+            stop_event = threading.Event()
+            ticker = threading.Thread(target=self.tick, args=(stage, expected, stop_event), daemon=True)
+            self.ticker = (ticker, stop_event)
+            ticker.start()
+        self.emit()
+
+    def tick(self, stage, expected, stop_event):
+        start = time.perf_counter()
+        while not stop_event.wait(0.2):
+            self.update(min(0.95, (time.perf_counter() - start) / expected), stage)
+
+    def stop_ticker(self):
+        if self.ticker:
+            ticker, stop_event = self.ticker
+            self.ticker = None
+            stop_event.set()
+            ticker.join()
+
+    def update(self, fraction, stage=None):
+        """更新当前阶段内的进度(0-1)"""
+        with self.lock:
+            if stage is not None and stage != self.current:
+                return
+            self.fraction = max(self.fraction, min(fraction, 1.0))
+        self.emit()
+
+    def end(self):
+        self.stop_ticker()
+        with self.lock:
+            self.done_weight += self.current_weight
+            self.current = None
+            self.current_weight = 0.0
+            self.fraction = 0.0
+        self.emit()
+
+    def complete(self, stage):
+        """标记一个在别处执行完的阶段，例如子进程中完成的编码"""
+        with self.lock:
+            if stage in self.pending:
+                self.pending.remove(stage)
+            self.done_weight += self.weight(stage)
+        self.emit()
+
+    def finish(self):
+        self.stop_ticker()
+        self.last_value = 100
+        if self.callback:
+            self.callback(100)
+
+    def emit(self):
+        with self.lock:
+            done = self.done_weight + self.current_weight * self.fraction
+            total = self.done_weight + self.current_weight + sum(self.weight(stage) for stage in self.pending)
+            value = int(99 * done / total) if total else 0
+            # 重新规划后总量可能变小，进度只前进不后退
+            if value <= self.last_value:
+                return
+            self.last_value = value
+        if self.callback:
+            self.callback(value)
+
+
+class SubsetLogProgress(logging.Filter):
+    """
+    fontTools的Subsetter没有进度回调，但每加载、裁剪和子集化一个表都会输出INFO日志
+    作为fontTools.subset日志的过滤器统计这些日志，推算子集化阶段内的进度，并在其中检查是否已取消
+    只在这个日志没有打开INFO时才临时打开，为此多出的记录在过滤器中截下，不会传给应用配置的Handler
+    """
+
+    def __init__(self, expected_steps, progress_callback, cancel_event=None):
+        super().__init__()
+        self.expected_steps = max(1, expected_steps)
+        self.progress_callback = progress_callback
+        self.cancel_event = cancel_event
+        self.steps = 0
+        # 取消事件可能是Manager的代理，每条日志都查询一次就是一次进程间通信，由后台线程同步到本地
+        self.cancelled = False
+        self.stopped = threading.Event()
+
+    def filter(self, record):
+        # 过滤器中抛出的异常不会被logging吞掉，可以中断正在进行的子集化
+        if self.cancelled:
+            raise ConversionCancelled()
+        self.steps += 1
+        self.progress_callback(min(0.95, self.steps / self.expected_steps))
+        return record.levelno >= self.passthrough_level
+
+    def watch_cancel(self):
+        while not self.stopped.is_set():
+            if self.cancel_event.wait(0.1):
+                self.cancelled = True
+                return
+
+    def __enter__(self):
+        self.logger = logging.getLogger("fontTools.subset")
+        self.old_level = self.logger.level
+        self.passthrough_level = self.logger.getEffectiveLevel()
+        if not self.logger.isEnabledFor(logging.INFO):
+            self.logger.setLevel(logging.INFO)
+        self.logger.addFilter(self)
+        if self.cancel_event is not None:
+            self.cancelled = self.cancel_event.is_set()
+            threading.Thread(target=self.watch_cancel, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        # 后台线程最多0.1秒后自行退出，不在这里等待
+        self.stopped.set()
+        self.logger.removeFilter(self)
+        self.logger.setLevel(self.old_level)
+        return False
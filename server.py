@@ -0,0 +1,390 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from io import BytesIO
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ProcessPoolExecutor
+
+from converter import FLAVOR_MAP, collect_fonts, encode_output_format, read_font_names
+from subset_cache import SubsetCache, DEFAULT_CACHE_SIZE
+from charset import text_to_codepoints, parse_codepoints
+from profiles import make_options, SUBSET_PROFILES, DEFAULT_PROFILE
+from glyph_coverage import build_coverage_report
+
+DEFAULT_PORT = 8765
+# 所有工作进程合计的常驻源字体内存上限
+DEFAULT_MEMORY = 512 * 1024 * 1024
+
+CONTENT_TYPES = {
+    "TTF": "font/ttf",
+    "OTF": "font/otf",
+    "WOFF": "font/woff",
+    "WOFF2": "font/woff2"
+}
+
+EXTENSIONS = {
+    "TTF": ".ttf",
+    "OTF": ".otf",
+    "WOFF": ".woff",
+    "WOFF2": ".woff2"
+}
+
+
+def font_id_map(font_paths):
+    """字体ID为不含扩展名的文件名，同名的字体只保留第一个，返回({字体ID: 路径}, 被忽略的路径列表)"""
+    fonts = {}
+    ignored = []
+    for font_path in font_paths:
+        font_id = os.path.splitext(os.path.basename(font_path))[0]
+        if font_id in fonts:
+            ignored.append(font_path)
+        else:
+            fonts[font_id] = font_path
+    return fonts, ignored
+
+
+class SourceFont:
+    """
+    常驻内存的源字体：原始数据的摘要、解压后的sfnt数据和只读的已解析字体（cmap、名称）
+    Subsetter会就地修改字体，每次子集化都从内存中的数据重新惰性解析一份，只解析用到的表和字形
+    """
+
+    def __init__(self, path):
+        from fontTools.ttLib import TTFont
+        stat = os.stat(path)
+        self.path = path
+        self.signature = (stat.st_mtime_ns, stat.st_size)
+        with open(path, "rb") as f:
+            data = f.read()
+        # 与file_digest的结果相同，和界面、命令行共用子集结果缓存
+        self.digest = hashlib.sha256(data).hexdigest()
+        self.font = TTFont(BytesIO(data), lazy=True)
+        if self.font.flavor:
+            # WOFF/WOFF2源字体只解压一次，之后每次都从解压后的数据解析
+            self.font.flavor = None
+            buffer = BytesIO()
+            self.font.save(buffer)
+            data = buffer.getvalue()
+            self.font.close()
+            self.font = TTFont(BytesIO(data), lazy=True)
+        self.data = data
+        self.cmap = self.font.getBestCmap() or {}
+        self.num_glyphs = self.font['maxp'].numGlyphs
+        self.family_name, self.full_name = read_font_names(self.font, os.path.basename(path))
+        # 原始数据加上已解析的cmap，cmap每项约100字节
+        self.size = len(self.data) + 100 * len(self.cmap)
+
+    def open(self):
+        """返回一份可以就地子集化的字体"""
+        from fontTools.ttLib import TTFont
+        return TTFont(BytesIO(self.data), lazy=True)
+
+    def close(self):
+        self.font.close()
+
+
+class FontStore:
+    """
+    按字体ID加载源字体，已加载的字体按内存占用做LRU淘汰；源文件修改后下次访问时重新加载
+    fonts: {字体ID: 路径}
+    max_memory: 常驻源字体的内存上限（字节），最近使用的一个字体总是保留
+    """
+
+    def __init__(self, fonts, max_memory=DEFAULT_MEMORY):
+        self.fonts = fonts
+        self.max_memory = max_memory
+        self.entries = OrderedDict()
+        self.memory = 0
+        self.loads = 0
+
+    def get(self, font_id):
+        path = self.fonts[font_id]
+        entry = self.entries.get(font_id)
+        if entry is not None:
+            stat = os.stat(path)
+            if entry.signature == (stat.st_mtime_ns, stat.st_size):
+                self.entries.move_to_end(font_id)
+                return entry
+            self.remove(font_id)
+        entry = SourceFont(path)
+        self.loads += 1
+        self.entries[font_id] = entry
+        self.memory += entry.size
+        while self.memory > self.max_memory and len(self.entries) > 1:
+            self.remove(next(iter(self.entries)))
+        return entry
+
+    def remove(self, font_id):
+        entry = self.entries.pop(font_id)
+        self.memory -= entry.size
+        entry.close()
+
+
+# 工作进程中常驻的源字体和结果缓存，由进程池的initializer设置
+_font_store = None
+_subset_cache = None
+
+
+def _init_server_worker(fonts, max_memory, cache):
+    global _font_store, _subset_cache
+    _font_store = FontStore(fonts, max_memory)
+    _subset_cache = cache
+
+
+def store_result(cache, key, source, coverage, output_format, data):
+    """把一种格式的结果放入缓存，同一个键下已缓存的其他格式保留"""
+    meta = {'family_name': source.family_name, 'full_name': source.full_name, 'coverage': coverage}
+    files = {}
+    existing = cache.lookup(key, [])
+    if existing:
+        meta = {name: value for name, value in existing[0].items() if name != "files"}
+        entry_dir = cache.entry_dir(key)
+        files = {fmt: os.path.join(entry_dir, filename) for fmt, filename in existing[0].get("files", {}).items()}
+    base_filename = os.path.splitext(os.path.basename(source.path))[0]
+    files[output_format] = (f"{base_filename}-subset{EXTENSIONS[output_format]}", data)
+    cache.store(key, meta, files)
+
+
+def subset_request(font_id, codepoints, output_format, profile=DEFAULT_PROFILE):
+    """
+    在工作进程中处理一个子集请求
+    返回(字体数据, 信息)，信息包含是否命中缓存、缺少字形的字符数和耗时
+    """
+    from fontTools.subset import Subsetter
+    start = time.perf_counter()
+    loads = _font_store.loads
+    source = _font_store.get(font_id)
+    options = make_options(profile)
+    info = {
+        'font': font_id,
+        'format': output_format,
+        'profile': profile,
+        'missing': sum(1 for cp in codepoints if cp not in source.cmap),
+        'warm': _font_store.loads == loads,
+    }
+    key = None
+    if _subset_cache:
+        key = _subset_cache.make_key(source.digest, codepoints, options)
+        cached = _subset_cache.lookup(key, [output_format])
+        if cached:
+            with open(cached[1][output_format], "rb") as f:
+                data = f.read()
+            info.update(cache="hit", seconds=time.perf_counter() - start)
+            return data, info
+
+    font = source.open()
+    try:
+        subsetter = Subsetter(options=options)
+        subsetter.populate(unicodes=codepoints)
+        subsetter.subset(font)
+        glyphs = len(font.getGlyphOrder())
+        font.flavor = None
+        buffer = BytesIO()
+        font.save(buffer)
+        ttf_data = buffer.getvalue()
+    finally:
+        font.close()
+    data = encode_output_format(ttf_data, output_format)
+    if key:
+        coverage = build_coverage_report(source.cmap, codepoints, source.num_glyphs)
+        coverage['glyphs_after_closure'] = glyphs
+        store_result(_subset_cache, key, source, coverage, output_format, data)
+    info.update(cache="miss" if key else "off", seconds=time.perf_counter() - start)
+    return data, info
+
+
+def parse_subset_params(params, fonts):
+    """
+    检查子集请求的参数，返回(字体ID, 码位列表, 格式, 预设)
+    params: font、text、codepoints（整数列表或 U+4E00-4E10 形式的区间字符串）、format、profile
+    字体ID未知时抛出KeyError，其他参数错误时抛出ValueError
+    """
+    font_id = params.get("font")
+    if not font_id:
+        raise ValueError("缺少参数 font")
+    if font_id not in fonts:
+        raise KeyError(font_id)
+    codepoints = set(text_to_codepoints(params.get("text") or ""))
+    value = params.get("codepoints") or []
+    try:
+        if isinstance(value, str):
+            codepoints.update(parse_codepoints(value))
+        else:
+            codepoints.update(int(cp) for cp in value)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"无法解析码位: {value} ({e})")
+    invalid = sorted(cp for cp in codepoints if not 0 <= cp <= 0x10FFFF)
+    if invalid:
+        raise ValueError(f"码位超出Unicode范围(0-0x10FFFF): {', '.join(map(str, invalid[:10]))}")
+    if not codepoints:
+        raise ValueError("没有指定任何字符，请传入 text 或 codepoints")
+    output_format = str(params.get("format") or "WOFF2").upper()
+    if output_format not in FLAVOR_MAP:
+        raise ValueError(f"不支持的格式: {output_format}，可选 {', '.join(FLAVOR_MAP)}")
+    profile = params.get("profile") or DEFAULT_PROFILE
+    if profile not in SUBSET_PROFILES:
+        raise ValueError(f"未知的子集化选项预设: {profile}，可选 {', '.join(SUBSET_PROFILES)}")
+    return font_id, sorted(codepoints), output_format, profile
+
+
+class SubsetRequestHandler(BaseHTTPRequestHandler):
+    """
+    GET  /fonts    列出可用的字体ID
+    GET  /subset?font=ID&text=...&format=WOFF2&profile=default
+    POST /subset   JSON请求体，参数同上，codepoints可以是整数列表
+    成功时直接返回字体数据，出错时返回 {"error": 说明}
+    """
+
+    server_version = "thin-font"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/fonts":
+            self.send_json(200, {"fonts": sorted(self.server.fonts)})
+        elif url.path == "/subset":
+            self.handle_subset({name: values[-1] for name, values in parse_qs(url.query).items()})
+        else:
+            self.send_json(404, {"error": f"未知的路径: {url.path}"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != "/subset":
+            self.send_json(404, {"error": f"未知的路径: {url.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+        except ValueError:
+            length = -1
+        # 负数会让read一直读到连接关闭
+        if length < 0:
+            self.send_json(400, {"error": "Content-Length无效"})
+            return
+        body = self.rfile.read(length)
+        try:
+            params = json.loads(body or b"{}")
+        except ValueError:
+            self.send_json(400, {"error": "请求体不是有效的JSON"})
+            return
+        if not isinstance(params, dict):
+            self.send_json(400, {"error": "请求体应为JSON对象"})
+            return
+        self.handle_subset(params)
+
+    def handle_subset(self, params):
+        try:
+            font_id, codepoints, output_format, profile = parse_subset_params(params, self.server.fonts)
+        except KeyError as e:
+            self.send_json(404, {"error": f"未知的字体: {e.args[0]}"})
+            return
+        except ValueError as e:
+            self.send_json(400, {"error": str(e)})
+            return
+        try:
+            data, info = self.server.executor.submit(
+                subset_request, font_id, codepoints, output_format, profile
+            ).result()
+        except Exception as e:
+            self.send_json(500, {"error": f"子集化失败: {str(e)}"})
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPES[output_format])
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("X-Subset-Cache", info['cache'])
+        self.send_header("X-Subset-Warm", "1" if info['warm'] else "0")
+        self.send_header("X-Subset-Missing", str(info['missing']))
+        self.send_header("X-Subset-Seconds", f"{info['seconds']:.3f}")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_json(self, status, value):
+        data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+class SubsetServer(ThreadingHTTPServer):
+    """
+    每个请求在单独的线程中解析，子集化交给常驻的进程池；
+    工作进程只导入一次fontTools，源字体解析后常驻内存，各自按内存上限做LRU淘汰
+
+    fonts: {字体ID: 路径}
+    workers: 工作进程数
+    max_memory: 所有工作进程合计的常驻源字体内存上限（字节）
+    cache: 子集结果缓存(SubsetCache)，None表示不使用
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, fonts, workers=1, max_memory=DEFAULT_MEMORY, cache=None, quiet=False):
+        super().__init__(address, SubsetRequestHandler)
+        self.fonts = fonts
+        self.quiet = quiet
+        workers = max(1, workers)
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers,
+            initializer=_init_server_worker,
+            initargs=(fonts, max_memory // workers, cache)
+        )
+
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(cancel_futures=True)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="本地字体子集化服务：按字体ID、字符和格式返回子集字体")
+    parser.add_argument("inputs", nargs="+", help="字体源文件、目录或通配符，字体ID为不含扩展名的文件名")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址，默认 %(default)s")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="监听端口，默认 %(default)s")
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count() or 1,
+                        help="子集化工作进程数，默认为CPU核心数 (%(default)s)")
+    parser.add_argument("--memory", type=int, default=DEFAULT_MEMORY // (1024 * 1024),
+                        help="所有工作进程合计的常驻源字体内存上限(MB)，默认 %(default)s")
+    parser.add_argument("--cache-dir", help="子集结果缓存目录，默认 ~/.cache/thin-font/subsets")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+                        help="缓存容量上限(MB)，超出后按最近使用时间淘汰，默认 %(default)s")
+    parser.add_argument("--no-cache", action="store_true", help="不读取也不写入子集结果缓存")
+    parser.add_argument("-q", "--quiet", action="store_true", help="不输出每个请求的日志")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    fonts, ignored = font_id_map(collect_fonts(args.inputs))
+    if not fonts:
+        print("没有找到任何字体源文件。", file=sys.stderr)
+        return 2
+    for font_path in ignored:
+        print(f"字体ID重复，忽略: {font_path}", file=sys.stderr)
+
+    cache = None
+    if not args.no_cache:
+        cache = SubsetCache(args.cache_dir, args.cache_size * 1024 * 1024)
+
+    server = SubsetServer((args.host, args.port), fonts, args.workers, args.memory * 1024 * 1024, cache, args.quiet)
+    print(f"共 {len(fonts)} 个字体，{max(1, args.workers)} 个工作进程，"
+          f"监听 http://{args.host}:{server.server_address[1]}，按 Ctrl+C 退出")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("停止服务")
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+import os
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from fontTools.ttLib import TTFont
+from fontTools.subset import Subsetter
+
+from charset import format_codepoints, parse_codepoints
+from progress import ConversionCancelled
+from profiles import make_options, DEFAULT_PROFILE
+
+# 子进程中共享的字体数据，由进程池的initializer设置，避免每个分片都传一次字体
+_slice_font_source = None
+_slice_profile = DEFAULT_PROFILE
+
+
+def split_slices(codepoints, slice_count):
+    """把按使用频率排序的码位列表切分为slice_count片，靠前的分片是最常用的字符"""
+    slice_count = max(1, min(slice_count, len(codepoints)))
+    size, extra = divmod(len(codepoints), slice_count)
+    slices = []
+    start = 0
+    for i in range(slice_count):
+        end = start + size + (1 if i < extra else 0)
+        slices.append(codepoints[start:end])
+        start = end
+    return slices
+
+
+def _init_slice_worker(font_source, profile=DEFAULT_PROFILE):
+    global _slice_font_source, _slice_profile
+    _slice_font_source = font_source
+    _slice_profile = profile
+
+
+def encode_slice(codepoints, font_source=None):
+    """
+    对一个分片做子集化并压缩为WOFF2，返回字体数据
+    font_source可以是字体文件路径或内存中的TTF数据，为None时使用进程池初始化时传入的字体
+    """
+    font_source = font_source if font_source is not None else _slice_font_source
+    if isinstance(font_source, bytes):
+        font_source = BytesIO(font_source)
+    font = TTFont(font_source, lazy=True)
+    try:
+        subsetter = Subsetter(options=make_options(_slice_profile))
+        subsetter.populate(unicodes=codepoints)
+        subsetter.subset(font)
+        font.flavor = "woff2"
+        buffer = BytesIO()
+        font.save(buffer)
+        return buffer.getvalue()
+    finally:
+        font.close()
+
+
+def plan_incremental_slices(previous_slices, ordered_codepoints, result_dir):
+    """
+    字符只增不减且上次的分片文件都还在时，保留原有分片，只把新增字符并入最后一个分片重新生成，
+    分片数量保持不变；最后一个分片超过首个分片的两倍时不再增量更新，重新均匀切分
+    返回(保留的分片信息列表, 需要新生成的分片码位列表)，不能增量更新时返回None
+    """
+    if not previous_slices:
+        return None
+    old_codepoints = set()
+    for slice_file in previous_slices:
+        if not os.path.isfile(os.path.join(result_dir, slice_file['path'])):
+            return None
+        old_codepoints.update(parse_codepoints(slice_file['unicode_range']))
+    if not old_codepoints.issubset(ordered_codepoints):
+        return None
+    delta = [cp for cp in ordered_codepoints if cp not in old_codepoints]
+    if not delta:
+        return list(previous_slices), []
+    last = previous_slices[-1]
+    if last['count'] + len(delta) > 2 * max(1, previous_slices[0]['count']):
+        return None
+    return list(previous_slices[:-1]), [parse_codepoints(last['unicode_range']) + delta]
+
+
+def build_slices(font_source, ordered_codepoints, slice_count, output, base_filename, family_name,
+                 max_workers=None, status_callback=None, progress_callback=None, previous_slices=None,
+                 cancel_event=None, profile=DEFAULT_PROFILE):
+    """
+    生成按unicode-range分片的WOFF2字体和对应的CSS文件
+    浏览器只会下载页面上实际用到的字符所在的分片
+
+    font_source: 字体文件路径或内存中的TTF数据
+    output: 输出位置(bundle中的DirectoryOutput等)，只有结果目录支持增量更新
+    ordered_codepoints: 按使用频率排序的码位列表
+    previous_slices: 上次生成的分片信息，传入时尝试增量更新，只重新生成新增字符所在的最后一个分片
+    cancel_event: 设置后在下一个分片完成时放弃剩余分片，抛出ConversionCancelled
+    返回(CSS文件的位置, 分片信息列表)
+    """
+    result_dir = output.result_dir
+    plan = plan_incremental_slices(previous_slices, ordered_codepoints, result_dir) if result_dir else None
+    if plan:
+        slice_files, slices = plan
+        if status_callback:
+            status_callback(f"增量更新分片: 保留 {len(slice_files)} 个，重新生成 {len(slices)} 个")
+    else:
+        slice_files, slices = [], split_slices(ordered_codepoints, slice_count)
+    first_index = len(slice_files)
+    slice_files.extend([None] * len(slices))
+
+    if slices:
+        max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(slices)))
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_slice_worker,
+                                 initargs=(font_source, profile)) as executor:
+            futures = {
+                executor.submit(encode_slice, codepoints): first_index + i
+                for i, codepoints in enumerate(slices)
+            }
+            for done, future in enumerate(as_completed(futures), 1):
+                if cancel_event is not None and cancel_event.is_set():
+                    for pending in futures:
+                        pending.cancel()
+                    raise ConversionCancelled()
+                i = futures[future]
+                codepoints = slices[i - first_index]
+                filename = f"{base_filename}-slice{i:03d}.woff2"
+                data = future.result()
+                output.write(filename, data)
+                slice_files[i] = {
+                    'path': filename,
+                    'size': len(data),
+                    'count': len(codepoints),
+                    'unicode_range': format_codepoints(codepoints).replace(",", ", ")
+                }
+                if status_callback:
+                    status_callback(f"生成分片 {done}/{len(slices)}")
+                if progress_callback:
+                    progress_callback(done, len(slices))
+
+    # 重新切分后分片数量可能变少，删除上次遗留的多余分片
+    if result_dir:
+        slice_names = {slice_file['path'] for slice_file in slice_files}
+        for name in os.listdir(result_dir):
+            if name.startswith(f"{base_filename}-slice") and name.endswith(".woff2") and name not in slice_names:
+                os.remove(os.path.join(result_dir, name))
+
+    css = ""
+    for slice_file in slice_files:
+        css += f"""@font-face {{
+    font-family: '{family_name}';
+    src: url('./{slice_file['path']}') format('woff2');
+    font-weight: normal;
+    font-style: normal;
+    font-display: swap;
+    unicode-range: {slice_file['unicode_range']};
+}}
+"""
+    return output.write(f"{base_filename}-slices.css", css), slice_files
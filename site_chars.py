@@ -0,0 +1,223 @@
+import os
+import re
+import json
+import codecs
+import hashlib
+import tempfile
+import unicodedata
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from progress import ConversionCancelled
+
+# 扫描的网站内容文件
+SITE_EXTENSIONS = (".html", ".htm", ".json", ".md", ".markdown", ".js", ".mjs")
+
+# 扫描结果缓存目录，记录每个文件的修改时间、摘要和字符计数，下次只重新读取变化的文件
+DEFAULT_SITE_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "thin-font", "site-chars")
+
+# 每次读取的块大小，单个大文件也只占用固定的内存
+CHUNK_SIZE = 1024 * 1024
+
+# JSON/JS中的\uXXXX转义和HTML的数字字符引用，页面上显示的是转义后的字符
+ESCAPE_PATTERN = re.compile(r"\\u([0-9a-fA-F]{4})|&#[xX]([0-9a-fA-F]{1,6});|&#([0-9]{1,7});")
+# 最长的转义序列（&#1114111;），块末尾可能被截断的部分留到下一块
+MAX_ESCAPE_LENGTH = 10
+# 代理对的前半部分，和后半部分一起留到下一块才能合并
+HIGH_SURROGATE_ESCAPE = re.compile(r"\\u[dD][89abAB][0-9a-fA-F]{2}")
+
+# 遍历时跳过的目录，隐藏目录（如.git）也会跳过
+SKIP_DIRS = ("node_modules",)
+
+
+def iter_site_files(roots, extensions=SITE_EXTENSIONS):
+    """遍历目录树中的内容文件，跳过隐藏目录和node_modules，返回排序后的绝对路径列表"""
+    paths = []
+    for root in roots:
+        for directory, dirnames, filenames in os.walk(root):
+            dirnames[:] = [name for name in dirnames if not name.startswith(".") and name not in SKIP_DIRS]
+            for filename in filenames:
+                if filename.lower().endswith(extensions):
+                    paths.append(os.path.abspath(os.path.join(directory, filename)))
+    return sorted(set(paths))
+
+
+def count_escapes(text, counts):
+    """统计文本中转义序列表示的字符，相邻的UTF-16代理对合并为一个字符"""
+    pending_high = None
+    for match in ESCAPE_PATTERN.finditer(text):
+        hex_value = match.group(1) or match.group(2)
+        value = int(hex_value, 16) if hex_value else int(match.group(3))
+        if match.group(1) and 0xD800 <= value <= 0xDBFF:
+            pending_high = (value, match.end())
+            continue
+        if pending_high and match.group(1) and 0xDC00 <= value <= 0xDFFF and match.start() == pending_high[1]:
+            value = 0x10000 + ((pending_high[0] - 0xD800) << 10) + (value - 0xDC00)
+        pending_high = None
+        if value <= 0x10FFFF:
+            counts[value] += 1
+
+
+def count_file_chars(path, chunk_size=CHUNK_SIZE):
+    """
+    按块读取一个文件，统计其中每个字符（包括转义表示的字符）出现的次数
+    返回(sha256摘要, Counter{码位: 次数})
+    """
+    digest = hashlib.sha256()
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    chars = Counter()
+    counts = Counter()
+    carry = ""
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+            text = carry + decoder.decode(chunk)
+            # 末尾可能是被截断的转义序列，从最后一个\或&开始留到下一块
+            tail_start = max(len(text) - MAX_ESCAPE_LENGTH, 0)
+            marker = max(text.rfind("\\", tail_start), text.rfind("&", tail_start))
+            cut = marker if marker >= 0 else len(text)
+            if cut >= 6 and HIGH_SURROGATE_ESCAPE.fullmatch(text, cut - 6, cut):
+                cut -= 6
+            carry = text[cut:]
+            # Counter统计字符串时在C中逐个计数，比逐字符循环快得多
+            chars.update(text[:cut])
+            count_escapes(text[:cut], counts)
+        text = carry + decoder.decode(b"", final=True)
+        chars.update(text)
+        count_escapes(text, counts)
+    for char, count in chars.items():
+        counts[ord(char)] += count
+    counts.pop(0xFFFD, None)
+    return digest.hexdigest(), counts
+
+
+def file_sha256(path, chunk_size=CHUNK_SIZE):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def scan_file(path, known_digest=None):
+    """
+    在子进程中扫描一个文件
+    修改时间变化但之前扫描过时先只计算摘要，内容没有变化时不再统计字符
+    返回(路径, 摘要, {十六进制码位: 次数})，内容没有变化时计数为None
+    """
+    if known_digest is not None and file_sha256(path) == known_digest:
+        return path, known_digest, None
+    digest, counts = count_file_chars(path)
+    return path, digest, {f"{cp:x}": count for cp, count in counts.items()}
+
+
+def site_cache_path(roots, extensions, cache_dir=None):
+    """每组扫描目录和扩展名对应一个缓存文件"""
+    key = json.dumps([sorted(os.path.abspath(root) for root in roots), sorted(extensions)])
+    name = hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+    return os.path.join(cache_dir or DEFAULT_SITE_CACHE_DIR, f"{name}.json")
+
+
+def load_site_cache(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f).get("files", {})
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def save_site_cache(path, files):
+    """先写临时文件再改名，多个进程同时扫描同一组目录时不会写出残缺的缓存"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"files": files}, f)
+        os.replace(tmp_path, path)
+    except OSError:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+def scan_site(roots, extensions=SITE_EXTENSIONS, cache_dir=None, max_workers=None,
+              status_callback=None, progress_callback=None, cancel_event=None):
+    """
+    并行扫描网站内容目录，统计每个字符出现的次数
+    修改时间和大小都没有变化的文件直接使用上次的计数，只有变化或新增的文件才在子进程中重新读取
+
+    roots: 要扫描的目录列表
+    cache_dir: 扫描结果缓存目录，默认 ~/.cache/thin-font/site-chars
+    返回(Counter{码位: 次数}, 统计信息{files, read, unchanged})
+    """
+    paths = iter_site_files(roots, extensions)
+    cache_path = site_cache_path(roots, extensions, cache_dir)
+    previous = load_site_cache(cache_path)
+    files = {}
+    changed = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        entry = previous.get(path)
+        if entry and entry.get("mtime_ns") == stat.st_mtime_ns and entry.get("size") == stat.st_size:
+            files[path] = entry
+        else:
+            changed.append((path, stat, entry))
+    if status_callback:
+        status_callback(f"网站内容: 共 {len(files) + len(changed)} 个文件，其中 {len(changed)} 个需要重新读取")
+
+    unchanged = len(files)
+    if changed:
+        max_workers = max(1, min(max_workers or os.cpu_count() or 1, len(changed)))
+        stats = {path: (stat, entry) for path, stat, entry in changed}
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(
+                scan_file,
+                [path for path, _, _ in changed],
+                [entry.get("digest") if entry else None for _, _, entry in changed],
+                chunksize=max(1, min(64, len(changed) // (max_workers * 4)))
+            )
+            for done, (path, digest, counts) in enumerate(results, 1):
+                if cancel_event is not None and cancel_event.is_set():
+                    executor.shutdown(cancel_futures=True)
+                    raise ConversionCancelled()
+                stat, entry = stats[path]
+                if counts is None:
+                    # 只是修改时间变化（例如重新检出），内容相同
+                    counts = entry["counts"]
+                    unchanged += 1
+                files[path] = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "digest": digest, "counts": counts}
+                if progress_callback:
+                    progress_callback(done, len(changed))
+    # 删除的文件不再写入缓存
+    if changed or len(files) != len(previous):
+        save_site_cache(cache_path, files)
+
+    frequencies = Counter()
+    for entry in files.values():
+        for cp, count in entry["counts"].items():
+            frequencies[int(cp, 16)] += count
+    for cp in list(frequencies):
+        if unicodedata.category(chr(cp)) in ("Cc", "Cs"):
+            del frequencies[cp]
+    return frequencies, {"files": len(files), "read": len(files) - unchanged, "unchanged": unchanged}
+
+
+def frequency_order(frequencies):
+    """按出现次数从多到少排列码位，次数相同时按码位排列"""
+    return [cp for cp, _ in sorted(frequencies.items(), key=lambda item: (-item[1], item[0]))]
+
+
+def save_frequency_table(output, base_filename, frequencies, stats):
+    """把字符频率表写入<字体名>-site-chars.json，output为bundle中的DirectoryOutput等"""
+    table = {
+        "files": stats["files"],
+        "distinct": len(frequencies),
+        "total": sum(frequencies.values()),
+        # 按出现次数从多到少排列
+        "chars": {chr(cp): frequencies[cp] for cp in frequency_order(frequencies)}
+    }
+    return output.write(f"{base_filename}-site-chars.json", json.dumps(table, ensure_ascii=False, indent=2))
@@ -0,0 +1,165 @@
+import math
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+
+from progress import ConversionCancelled
+from profiles import make_options, DEFAULT_PROFILE
+from outlines import DEFAULT_OUTLINE_MODE
+
+# 子进程中共享的预子集化字体数据，由进程池的initializer设置
+_budget_font_data = None
+_budget_profile = DEFAULT_PROFILE
+_budget_outline_mode = DEFAULT_OUTLINE_MODE
+
+
+def _init_budget_worker(font_data, profile=DEFAULT_PROFILE, outline_mode=DEFAULT_OUTLINE_MODE):
+    global _budget_font_data, _budget_profile, _budget_outline_mode
+    _budget_font_data = font_data
+    _budget_profile = profile
+    _budget_outline_mode = outline_mode
+
+
+def measure_subset(codepoints, output_format, font_data=None):
+    """
+    对给定字符做子集化，再与实际输出一样转换轮廓并编码为output_format，返回字体数据的字节数
+    font_data为None时使用进程池初始化时传入的字体数据
+    """
+    from fontTools.ttLib import TTFont
+    from fontTools.subset import Subsetter
+    from converter import encode_smallest
+    font = TTFont(BytesIO(font_data if font_data is not None else _budget_font_data), lazy=True)
+    try:
+        subsetter = Subsetter(options=make_options(_budget_profile))
+        subsetter.populate(unicodes=codepoints)
+        subsetter.subset(font)
+        font.flavor = None
+        buffer = BytesIO()
+        font.save(buffer)
+    finally:
+        font.close()
+    return len(encode_smallest(buffer.getvalue(), output_format, _budget_outline_mode))
+
+
+def prepare_budget_font(font, ordered_codepoints, profile=DEFAULT_PROFILE):
+    """
+    先把源字体子集化到完整的候选字符集，后续每次试探都从这份小得多的TTF数据开始，
+    不需要在每个子进程中重新加载和裁剪源字体
+    font: 已加载的源字体(TTFont)，会被就地子集化
+    """
+    from fontTools.subset import Subsetter
+    subsetter = Subsetter(options=make_options(profile))
+    subsetter.populate(unicodes=ordered_codepoints)
+    subsetter.subset(font)
+    font.flavor = None
+    buffer = BytesIO()
+    font.save(buffer)
+    return buffer.getvalue()
+
+
+def cover_gaps(points, fits, too_big, allowed):
+    """在相邻的截断位置（包括区间两端）之间补点，使每段都不超过allowed"""
+    result = []
+    previous = fits
+    for point in sorted(set(points)) + [too_big]:
+        while point - previous > allowed:
+            previous += allowed
+            result.append(previous)
+        if point < too_big:
+            result.append(point)
+        previous = point
+    return result
+
+
+def next_candidates(measured, fits, too_big, budget, max_workers, allowed, low_moved=True):
+    """
+    选取下一轮要试的截断位置
+    字体大小基本与字符数成正比，两端的大小都已知时按线性插值估计预算对应的位置，在其附近取点；
+    无论哪个位置放得下，这一轮后的区间都不超过allowed（均匀取点在同样轮数后的区间长度），
+    所以最多和均匀取点用同样多的轮数，插值估计准确时会快得多
+    low_moved: 上一轮是否是下界移动，只有一个进程时据此把估计值向另一侧偏移，避免一端一直不动
+    """
+    span = too_big - fits
+    count = min(max_workers, span - 1)
+    allowed = max(1, allowed)
+    low_size = measured.get(fits, 0)
+    high_size = measured.get(too_big)
+    if high_size is not None and high_size > low_size:
+        estimate = fits + (budget - low_size) / (high_size - low_size) * span
+        # 插值点越多，留给补点的名额越少；补点后超出进程数时减少插值点
+        for cluster in range(count, 0, -1):
+            if cluster == 1:
+                # 只有一个点时把它收紧到两侧的区间都不超过allowed的范围内
+                point = estimate + (1 if low_moved else -1) * max(1.0, span / 64)
+                points = [min(max(point, too_big - allowed), fits + allowed)]
+            else:
+                # 估计值通常偏差不大，在其两侧按区间的一小部分展开
+                spread = max(1.0, span / (4 * (cluster + 1)))
+                points = [estimate + (i - (cluster - 1) / 2) * spread for i in range(cluster)]
+            points = [min(max(int(round(point)), fits + 1), too_big - 1) for point in points]
+            candidates = cover_gaps(points, fits, too_big, allowed)
+            if len(candidates) <= count:
+                return candidates
+    step = span / (count + 1)
+    return sorted({fits + int(round(step * i)) for i in range(1, count + 1)}) or [fits + span // 2]
+
+
+def find_budget_cutoff(font_data, ordered_codepoints, budget, output_format="WOFF2", max_workers=None,
+                       status_callback=None, progress_callback=None, cancel_event=None, profile=DEFAULT_PROFILE,
+                       outline_mode=DEFAULT_OUTLINE_MODE):
+    """
+    在按使用频率排序的字符列表中查找最大的截断位置，使前N个字符的子集不超过体积预算
+    每一轮在当前区间内选取多个截断位置，在子进程中并行试编码，再缩小到相邻的两个位置之间
+
+    font_data: prepare_budget_font生成的TTF数据
+    budget: 体积预算（字节）
+    output_format: 预算针对的输出格式，按outline_mode选择轮廓，与实际输出的编码方式相同
+    返回(截断位置N, 前N个字符子集的字节数)，一个字符都放不下时返回(0, None)
+    """
+    total = len(ordered_codepoints)
+    if not total:
+        return 0, None
+    max_workers = max(1, max_workers or 1)
+    # 已经试过的截断位置及其大小
+    measured = {}
+    fits, too_big = 0, total + 1
+    # 按均匀取点估计的最多轮数，仅用于进度显示
+    rounds = max(1, math.ceil(math.log(total + 1, max_workers + 1)))
+    done_rounds = 0
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_budget_worker,
+                             initargs=(font_data, profile, outline_mode)) as executor:
+        # 第一轮先试完整的字符集，全部放得下时不需要继续查找
+        candidates = [total]
+        allowed = None
+        while candidates:
+            if cancel_event is not None and cancel_event.is_set():
+                raise ConversionCancelled()
+            futures = {
+                cutoff: executor.submit(measure_subset, ordered_codepoints[:cutoff], output_format)
+                for cutoff in candidates
+            }
+            measured.update((cutoff, future.result()) for cutoff, future in futures.items())
+            previous_fits = fits
+            # 大小大致随字符数单调增长，个别不单调的位置以超出预算的最小位置为上界
+            too_big = min((cutoff for cutoff, size in measured.items() if size > budget), default=total + 1)
+            fits = max((cutoff for cutoff, size in measured.items() if size <= budget and cutoff < too_big), default=0)
+            done_rounds += 1
+            if status_callback:
+                status_callback(f"体积预算查找: 第 {done_rounds} 轮，前 {fits} 个字符不超过预算")
+            if progress_callback:
+                progress_callback(min(done_rounds, rounds), rounds)
+            if too_big - fits <= 1:
+                break
+            if allowed is None:
+                # 不小于区间长度的最小的(进程数+1)的幂，均匀取点正好用这么多轮；
+                # 区间长度不是整幂时多出的余量，以及插值猜中时多缩小的部分，都可以留给插值使用
+                allowed = 1
+                while allowed < too_big - fits:
+                    allowed *= max_workers + 1
+            # 这一轮之后区间不能超过的长度
+            allowed //= max_workers + 1
+            candidates = next_candidates(
+                measured, fits, too_big, budget, max_workers, allowed,
+                low_moved=fits != previous_fits
+            )
+    return fits, measured.get(fits)
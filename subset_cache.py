@@ -0,0 +1,154 @@
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+
+# 默认缓存目录和容量上限
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "thin-font", "subsets")
+DEFAULT_CACHE_SIZE = 1024 * 1024 * 1024
+
+META_FILENAME = "meta.json"
+
+
+def file_digest(file_path, chunk_size=1024 * 1024):
+    """分块计算文件的sha256，避免把大字体整个读进内存"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def options_fingerprint(options):
+    """把Subsetter的Options转换为稳定的字符串，集合按排序后输出"""
+    def normalize(value):
+        if isinstance(value, (set, frozenset)):
+            return sorted(normalize(v) for v in value)
+        if isinstance(value, (list, tuple)):
+            return [normalize(v) for v in value]
+        if isinstance(value, dict):
+            return {str(k): normalize(v) for k, v in value.items()}
+        if value is None or isinstance(value, (bool, int, float, str)):
+            return value
+        return repr(value)
+    return json.dumps(normalize(vars(options)), sort_keys=True)
+
+
+def link_or_copy(src, dst):
+    """优先使用硬链接，跨分区等无法链接时退回复制；目标已存在时先删除，不会写穿共享的文件"""
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+class SubsetCache:
+    """
+    按内容寻址的子集结果缓存
+    键由源字体摘要、去重排序后的码位集合、子集化选项和fontTools版本组成，
+    每个键对应缓存目录下的一个子目录，按最近使用时间做LRU淘汰
+
+    cache_dir: 缓存目录
+    max_size: 缓存容量上限（字节）
+    """
+
+    def __init__(self, cache_dir=None, max_size=DEFAULT_CACHE_SIZE):
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.max_size = max_size
+
+    def make_key(self, font_digest, codepoints, options, outline_mode="source"):
+        """outline_mode: WOFF/WOFF2使用的轮廓，见outlines.OUTLINE_MODES；OTF改为真正的CFF轮廓后旧的缓存键不再使用"""
+        import fontTools
+        digest = hashlib.sha256()
+        digest.update(fontTools.version.encode("ascii"))
+        digest.update(font_digest.encode("ascii"))
+        digest.update(",".join(f"{cp:x}" for cp in sorted(set(codepoints))).encode("ascii"))
+        digest.update(options_fingerprint(options).encode("utf-8"))
+        digest.update(f"outline={outline_mode}".encode("ascii"))
+        return digest.hexdigest()
+
+    def entry_dir(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def lookup(self, key, output_formats):
+        """
+        查找缓存，只有所有请求的格式都已缓存才算命中
+        返回(元数据, {格式: 缓存文件路径})，未命中返回None
+        """
+        entry_dir = self.entry_dir(key)
+        try:
+            with open(os.path.join(entry_dir, META_FILENAME), "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        files = {}
+        for output_format in output_formats:
+            filename = meta.get("files", {}).get(output_format)
+            if not filename or not os.path.isfile(os.path.join(entry_dir, filename)):
+                return None
+            files[output_format] = os.path.join(entry_dir, filename)
+        # 更新访问时间，供LRU淘汰使用
+        os.utime(entry_dir)
+        return meta, files
+
+    def store(self, key, meta, files):
+        """
+        把生成的文件放入缓存
+        meta: 额外的元数据（如字体名称），会写入meta.json
+        files: {格式: 输出文件路径}，没有写入磁盘的结果可以直接传入{格式: (文件名, 数据)}
+        """
+        entry_dir = self.entry_dir(key)
+        parent_dir = os.path.dirname(entry_dir)
+        os.makedirs(parent_dir, exist_ok=True)
+        # 先写入临时目录再整体改名，多个进程同时写同一个键时不会留下残缺的缓存
+        tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=parent_dir)
+        try:
+            cached_files = {}
+            for output_format, source in files.items():
+                if isinstance(source, tuple):
+                    filename, data = source
+                    with open(os.path.join(tmp_dir, filename), "wb") as f:
+                        f.write(data)
+                else:
+                    filename = os.path.basename(source)
+                    link_or_copy(source, os.path.join(tmp_dir, filename))
+                cached_files[output_format] = filename
+            with open(os.path.join(tmp_dir, META_FILENAME), "w", encoding="utf-8") as f:
+                json.dump(dict(meta, files=cached_files), f, ensure_ascii=False)
+            if os.path.isdir(entry_dir):
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return
+        self.evict()
+
+    def evict(self):
+        """缓存总大小超过上限时，按最近使用时间从旧到新删除缓存条目"""
+        entries = []
+        total_size = 0
+        if not os.path.isdir(self.cache_dir):
+            return
+        for prefix in os.listdir(self.cache_dir):
+            prefix_dir = os.path.join(self.cache_dir, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for name in os.listdir(prefix_dir):
+                if name.startswith(".tmp-"):
+                    continue
+                entry_dir = os.path.join(prefix_dir, name)
+                try:
+                    size = sum(entry.stat().st_size for entry in os.scandir(entry_dir) if entry.is_file())
+                    entries.append((os.path.getmtime(entry_dir), size, entry_dir))
+                except OSError:
+                    continue
+                total_size += size
+        entries.sort()
+        for _, size, entry_dir in entries:
+            if total_size <= self.max_size:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total_size -= size
@@ -0,0 +1,192 @@
+import os
+import sys
+import time
+import select
+import struct
+import threading
+
+# inotify事件掩码，编辑器保存文件时可能是原地写入，也可能是写临时文件再改名
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class InotifyBackend:
+    """
+    通过ctypes调用Linux的inotify，不需要额外的依赖
+    监视文件所在的目录而不是文件本身，文件被改名替换后也能继续收到事件
+    """
+
+    name = "inotify"
+
+    def __init__(self, paths):
+        import ctypes
+        import ctypes.util
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        self.paths = set(paths)
+        self.dirs = {}
+        for directory in {os.path.dirname(path) for path in self.paths}:
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                os.close(self.fd)
+                raise OSError(ctypes.get_errno(), f"无法监视目录 {directory}")
+            self.dirs[wd] = directory
+
+    def wait(self, timeout):
+        """等待最多timeout秒，返回其间发生变化的被监视文件集合"""
+        changed = set()
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return changed
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, _, _, name_length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + name_length].rstrip(b"\0")
+            offset += name_length
+            if wd in self.dirs and name:
+                path = os.path.join(self.dirs[wd], os.fsdecode(name))
+                if path in self.paths:
+                    changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingBackend:
+    """定时比较文件的修改时间和大小，用于没有inotify的平台"""
+
+    name = "polling"
+
+    def __init__(self, paths, interval=1.0):
+        self.paths = set(paths)
+        self.interval = interval
+        self.snapshot = {path: self.stat(path) for path in self.paths}
+
+    @staticmethod
+    def stat(path):
+        try:
+            st = os.stat(path)
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def wait(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        changed = set()
+        for path in self.paths:
+            state = self.stat(path)
+            if state != self.snapshot[path]:
+                self.snapshot[path] = state
+                changed.add(path)
+        return changed
+
+    def close(self):
+        pass
+
+
+class FileWatcher:
+    """
+    在后台线程中监视一组文件，变化停止debounce秒后把这段时间内变化的文件一起交给回调
+    Linux上使用inotify，不可用时退回轮询
+
+    paths: 要监视的文件路径
+    callback: 回调，接收变化的文件路径列表，在监视线程中调用
+    debounce: 合并连续变化的等待时间（秒）
+    poll_interval: 轮询模式下检查文件的间隔（秒）
+    """
+
+    def __init__(self, paths, callback, debounce=0.3, poll_interval=1.0):
+        self.paths = sorted({os.path.abspath(path) for path in paths if path})
+        self.callback = callback
+        self.debounce = debounce
+        self.backend = None
+        if sys.platform.startswith("linux"):
+            try:
+                self.backend = InotifyBackend(self.paths)
+            except (OSError, AttributeError):
+                self.backend = None
+        if self.backend is None:
+            self.backend = PollingBackend(self.paths, poll_interval)
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join()
+
+    def run(self):
+        pending = set()
+        last_change = 0.0
+        try:
+            while not self.stop_event.is_set():
+                changed = self.backend.wait(self.debounce if pending else 0.5)
+                if changed:
+                    pending.update(changed)
+                    last_change = time.monotonic()
+                elif pending and time.monotonic() - last_change >= self.debounce:
+                    self.callback(sorted(pending))
+                    pending = set()
+        finally:
+            self.backend.close()
+
+
+class RebuildWorker:
+    """
+    在后台线程中串行执行重建，重建期间收到的变化合并为下一次重建
+    build: 重建函数，接收变化的文件路径列表
+    """
+
+    def __init__(self, build):
+        self.build = build
+        self.pending = set()
+        self.condition = threading.Condition()
+        self.stopped = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def request(self, paths):
+        with self.condition:
+            self.pending.update(paths)
+            self.condition.notify()
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        self.thread.join()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.stopped:
+                    self.condition.wait()
+                if self.stopped:
+                    return
+                changed = sorted(self.pending)
+                self.pending = set()
+            self.build(changed)